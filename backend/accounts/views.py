@@ -5,10 +5,12 @@ import secrets
 import string
 from django.contrib.auth import get_user_model
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from catalog.throttling import SignupRateThrottle, SignupTotalRateThrottle, limit_concurrency
+
 User = get_user_model()
 
 
@@ -26,11 +28,15 @@ def _generate_random_username(prefix: str = "admin") -> str:
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([SignupRateThrottle, SignupTotalRateThrottle])
+@limit_concurrency("signup")
 def admin_signup(request):
     """
     Create a new superuser with random credentials.
     Returns: { "username": "...", "password": "..." }
     Use these credentials to sign in via /api/auth/login/ to get JWT tokens.
+    Rate limited per client and overall (429); password hashing is CPU-bound,
+    so at most CATALOG_CONCURRENCY_LIMITS["signup"] run at once (503).
     """
     # Generate random credentials
     username = _generate_random_username()
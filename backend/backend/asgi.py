@@ -0,0 +1,19 @@
+"""
+ASGI config for backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Set CATALOG_ASYNC_VIEWS=True to serve the hot catalog reads from async views.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Async requests run in threads that never reuse persistent connections
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
@@ -37,6 +37,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # CORS Middleware must be placed at the very top
     'corsheaders.middleware.CorsMiddleware',
+    # Request timing (Server-Timing header and /metrics); wraps the rest of the stack
+    'catalog.metrics.RequestMetricsMiddleware',
+    # Before anything that reads the database: tracks writes and routes reads (catalog.routers)
+    'catalog.routers.PrimaryPinningMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -97,6 +101,49 @@ else:
         }
     }
 
+# Connection management. Connections are kept open for DB_CONN_MAX_AGE seconds and
+# reused by later requests of the same worker (0 closes them after every request;
+# the default under ASGI, see backend/asgi.py), and checked with a cheap query before reuse when DB_CONN_HEALTH_CHECKS is on.
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# PostgreSQL only: DB_POOL=True hands connections to a per-process pool
+# (catalog.pool) instead of closing them, e.g. for threaded or ASGI workers,
+# where persistent connections are not reused. Pool stats are on /metrics.
+if not USE_SQLITE and config('DB_POOL', default=False, cast=bool):
+    DATABASES['default'].update({
+        'ENGINE': 'catalog.backends.postgresql',
+        # Django "closes" the connection after each request, returning it to the pool
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            # Seconds a request waits for a connection when max_size are in use
+            'timeout': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            # Seconds before idle connections beyond min_size are closed
+            'max_idle': config('DB_POOL_MAX_IDLE', default=300.0, cast=float),
+        },
+    })
+
+# Read replicas (catalog.routers): safe-method product and category requests read from
+# one of them. SQLITE_REPLICAS lists database files (e.g. for local testing),
+# DB_REPLICA_HOSTS lists host[:port] servers sharing the primary's name and credentials.
+if USE_SQLITE:
+    REPLICA_OVERRIDES = [{'NAME': name} for name in config('SQLITE_REPLICAS', default='').split(',') if name]
+else:
+    REPLICA_OVERRIDES = [
+        dict(zip(('HOST', 'PORT'), host.split(':', 1)))
+        for host in config('DB_REPLICA_HOSTS', default='').split(',') if host
+    ]
+DATABASE_REPLICAS = []
+for index, overrides in enumerate(REPLICA_OVERRIDES, 1):
+    # Tests read replicas through the primary's test database
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], **overrides, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['catalog.routers.PrimaryReplicaRouter']
+# Seconds a client that wrote keeps reading from the primary (read-your-writes)
+CATALOG_REPLICA_PIN_SECONDS = config('CATALOG_REPLICA_PIN_SECONDS', default=10, cast=int)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -134,28 +181,136 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ----------------------------------------------------------------------
+# FAST SERIALIZATION
+# ----------------------------------------------------------------------
+# Render API responses with orjson (catalog.renderers); the output is identical
+CATALOG_FAST_JSON = config('CATALOG_FAST_JSON', default=False, cast=bool)
+# Serialize product list pages from values() rows instead of model instances
+CATALOG_FAST_LIST = config('CATALOG_FAST_LIST', default=False, cast=bool)
+
+# ----------------------------------------------------------------------
+# RATE LIMITING AND LOAD SHEDDING
+# ----------------------------------------------------------------------
+# Sliding-window limits as "<requests>/<second|minute|hour|day>", counted in the
+# catalog cache (shared by all workers when it is); empty disables a limit
+CATALOG_SIGNUP_RATE = config('CATALOG_SIGNUP_RATE', default='5/hour')  # per client IP
+CATALOG_SIGNUP_TOTAL_RATE = config('CATALOG_SIGNUP_TOTAL_RATE', default='100/hour')  # all clients together
+CATALOG_REVIEW_RATE = config('CATALOG_REVIEW_RATE', default='30/hour')  # per user, or IP when anonymous
+CATALOG_CHECKOUT_RATE = config('CATALOG_CHECKOUT_RATE', default='20/hour')  # per user
+CATALOG_EXPORT_RATE = config('CATALOG_EXPORT_RATE', default='10/hour')  # per user
+# Expensive requests running at once across all workers before others get a 503; 0 disables
+CATALOG_CONCURRENCY_LIMITS = {
+    'signup': config('CATALOG_SIGNUP_CONCURRENCY', default=2, cast=int),
+    'reviews': config('CATALOG_REVIEW_CONCURRENCY', default=16, cast=int),
+    'export': config('CATALOG_EXPORT_CONCURRENCY', default=2, cast=int),
+}
+# Seconds after which the slot of a request that never finished (e.g. a killed worker) is freed
+CATALOG_CONCURRENCY_LEASE_SECONDS = config('CATALOG_CONCURRENCY_LEASE_SECONDS', default=30, cast=int)
+# The same for exports, which hold their slot for as long as the client reads the stream
+CATALOG_EXPORT_LEASE_SECONDS = config('CATALOG_EXPORT_LEASE_SECONDS', default=900, cast=int)
+
 # ----------------------------------------------------------------------
 # DJANGO REST FRAMEWORK (DRF) CONFIGURATION
 # ----------------------------------------------------------------------
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    # Limit/offset with cached (and, on PostgreSQL, estimated) result counts
+    'DEFAULT_PAGINATION_CLASS': 'catalog.pagination.CachedCountLimitOffsetPagination',
     'PAGE_SIZE': 20,  # Default page size for catalog listings
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'catalog.renderers.ORJSONRenderer' if CATALOG_FAST_JSON else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
     # Use JWT as the primary authentication mechanism, with session auth for browsable API
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'catalog.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # Scopes of the catalog.throttling classes
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': CATALOG_SIGNUP_RATE or None,
+        'signup_total': CATALOG_SIGNUP_TOTAL_RATE or None,
+        'reviews': CATALOG_REVIEW_RATE or None,
+        'checkout': CATALOG_CHECKOUT_RATE or None,
+        'export': CATALOG_EXPORT_RATE or None,
+    },
+}
+
+SIMPLE_JWT = {
+    # Embeds the claims CachedJWTAuthentication can trust into the tokens issued at login
+    'TOKEN_OBTAIN_SERIALIZER': 'catalog.authentication.ClaimsTokenObtainPairSerializer',
+}
+
+# ----------------------------------------------------------------------
+# AUTHENTICATION CACHING
+# ----------------------------------------------------------------------
+# Seconds a JWT user stays in the per-process user cache (entries are also
+# invalidated when the user is saved); 0 loads the user on every request
+CATALOG_AUTH_USER_CACHE_TIMEOUT = config('CATALOG_AUTH_USER_CACHE_TIMEOUT', default=30, cast=int)
+# Maximum number of users held by each process
+CATALOG_AUTH_USER_CACHE_SIZE = config('CATALOG_AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+# Build the user of catalog reads from the token claims, without any database access
+CATALOG_AUTH_TRUST_CLAIMS = config('CATALOG_AUTH_TRUST_CLAIMS', default=False, cast=bool)
+
+# ----------------------------------------------------------------------
+# CATALOG CACHING
+# ----------------------------------------------------------------------
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared cache
+# (e.g. django.core.cache.backends.redis.RedisCache, redis://...) in production
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='catalog'),
+    }
 }
 
+# Cache alias used for derived catalog data (responses, result counts, facets, ...)
+CATALOG_CACHE_ALIAS = config('CATALOG_CACHE_ALIAS', default='default')
+# Seconds a paginated result count stays cached (entries are also invalidated on writes)
+CATALOG_COUNT_CACHE_TIMEOUT = config('CATALOG_COUNT_CACHE_TIMEOUT', default=300, cast=int)
+# PostgreSQL only: results estimated above this many rows report the planner
+# estimate instead of running COUNT(*). Set to 0 to always count exactly.
+CATALOG_COUNT_ESTIMATE_THRESHOLD = config('CATALOG_COUNT_ESTIMATE_THRESHOLD', default=10000, cast=int)
+# Seconds a rendered catalog read stays cached (entries are also invalidated on writes); 0 disables
+CATALOG_RESPONSE_CACHE_TIMEOUT = config('CATALOG_RESPONSE_CACHE_TIMEOUT', default=60, cast=int)
+# Seconds the facet counts of a filter combination stay cached
+CATALOG_FACET_CACHE_TIMEOUT = config('CATALOG_FACET_CACHE_TIMEOUT', default=300, cast=int)
+# Maximum number of rows accepted by POST /api/products/bulk/
+CATALOG_BULK_MAX_ROWS = config('CATALOG_BULK_MAX_ROWS', default=5000, cast=int)
+# Maximum number of ids accepted by GET /api/products/batch/
+CATALOG_BATCH_MAX_IDS = config('CATALOG_BATCH_MAX_IDS', default=250, cast=int)
+
+# ----------------------------------------------------------------------
+# STOCK RESERVATIONS
+# ----------------------------------------------------------------------
+# Seconds a reservation holds its stock before release_expired_reservations gives it back
+CATALOG_RESERVATION_TTL = config('CATALOG_RESERVATION_TTL', default=900, cast=int)
+# Maximum number of items in one reservation
+CATALOG_RESERVATION_MAX_ITEMS = config('CATALOG_RESERVATION_MAX_ITEMS', default=100, cast=int)
+# Maximum quantity of one product in a cart
+CATALOG_CART_MAX_QUANTITY = config('CATALOG_CART_MAX_QUANTITY', default=100, cast=int)
+
+# ----------------------------------------------------------------------
+# ASYNC SERVING
+# ----------------------------------------------------------------------
+# Serve product list/detail, reviews and category reads from async views.
+# Only worthwhile under ASGI (backend.asgi, e.g. uvicorn); keep it off for WSGI workers.
+CATALOG_ASYNC_VIEWS = config('CATALOG_ASYNC_VIEWS', default=False, cast=bool)
+
+# ----------------------------------------------------------------------
+# REQUEST METRICS
+# ----------------------------------------------------------------------
+# Adds a Server-Timing header (db, serialize, render, total) to every response.
+# It exposes query counts, so keep it off in production unless it is wanted there.
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=DEBUG, cast=bool)
+# /metrics requires "Authorization: Bearer <token>"; without a token it is only served with DEBUG
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # ----------------------------------------------------------------------
 # CORS HEADERS CONFIGURATION
 # ----------------------------------------------------------------------
@@ -0,0 +1,21 @@
+"""
+Settings for the test runner (manage.py test uses them by default).
+
+The regular settings plus a second SQLite database, "replica", which the
+read-replica tests route reads to by overriding DATABASE_REPLICAS. Other
+tests leave DATABASE_REPLICAS alone, so every read goes to the primary.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+TEST_REPLICA_ALIAS = 'replica'
+
+# A database of its own (in memory under the test runner), not a test mirror,
+# so it only holds what a test writes to it, like a replica lagging behind
+DATABASES[TEST_REPLICA_ALIAS] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db-replica.sqlite3',
+}
+
+# Fast hashing for the users tests create and sign in
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
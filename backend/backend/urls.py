@@ -9,6 +9,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from catalog.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="E-Commerce API",
@@ -36,6 +38,9 @@ urlpatterns = [
     # API Documentation
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='swagger'),
     path('api/docs/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='redoc'),
+
+    # Prometheus metrics (request timings, per worker process)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Review
+from .models import Category, Product, Review, StockReservation, StockReservationItem
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -18,9 +18,14 @@ class ProductAdmin(admin.ModelAdmin):
     """
     list_display = ['name', 'category', 'price', 'stock_quantity', 'is_available', 'created_at']
     list_filter = ['is_available', 'category']
-    search_fields = ['name', 'description']
+    search_fields = ['name', 'sku', 'description']
     list_editable = ['price', 'stock_quantity', 'is_available']
     list_per_page = 20
+    # Review aggregates are maintained automatically from the Review table
+    readonly_fields = [
+        'review_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count',
+    ]
 
     # Ensure related objects are fetched efficiently when viewing the list
     def get_queryset(self, request):
@@ -37,3 +42,27 @@ class ReviewAdmin(admin.ModelAdmin):
     list_per_page = 20
     # Ensure related product data is fetched efficiently
     raw_id_fields = ('product',)
+
+
+class StockReservationItemInline(admin.TabularInline):
+    model = StockReservationItem
+    raw_id_fields = ('product',)
+    extra = 0
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for stock reservations.
+    Read-only: stock is only moved by catalog.reservations.
+    """
+    list_display = ['id', 'user', 'status', 'expires_at', 'created_at']
+    list_filter = ['status']
+    inlines = [StockReservationItemInline]
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
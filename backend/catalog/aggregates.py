@@ -0,0 +1,72 @@
+"""
+Helpers for the denormalized review aggregates stored on Product.
+
+Reviews adjust the counters incrementally with F() expressions, so concurrent
+writers never overwrite each other. rebuild_rating_aggregates() recomputes
+everything from the review table when the counters need to be repaired.
+"""
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Now
+
+from .models import Product, Review
+
+RATING_COUNT_FIELDS = {star: f'rating_{star}_count' for star in range(1, 6)}
+AGGREGATE_FIELDS = ['review_count', 'rating_sum', *RATING_COUNT_FIELDS.values()]
+
+
+def apply_review_delta(product_id, rating, sign, using='default'):
+    """
+    Add (sign=1) or remove (sign=-1) a single review from the product aggregates.
+    """
+    if product_id is None or rating not in RATING_COUNT_FIELDS:
+        return
+    star_field = RATING_COUNT_FIELDS[rating]
+    Product.objects.using(using).filter(pk=product_id).update(**{
+        'review_count': F('review_count') + sign,
+        'rating_sum': F('rating_sum') + sign * rating,
+        star_field: F(star_field) + sign,
+        # The product representation changed, which Last-Modified has to reflect
+        'updated_at': Now(),
+    })
+
+
+def rebuild_rating_aggregates(batch_size=1000, using='default'):
+    """
+    Recompute the aggregates of every product from its reviews.
+    Products are processed in primary-key batches to keep memory flat.
+    Returns the number of products updated.
+    """
+    annotations = {
+        'review_count': Count('id'),
+        'rating_sum': Sum('rating'),
+        **{field: Count('id', filter=Q(rating=star)) for star, field in RATING_COUNT_FIELDS.items()},
+    }
+    updated = 0
+    last_pk = 0
+    while True:
+        products = list(
+            Product.objects.using(using)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', *AGGREGATE_FIELDS)[:batch_size]
+        )
+        if not products:
+            break
+        last_pk = products[-1].pk
+
+        rows = (
+            Review.objects.using(using)
+            .filter(product_id__in=[p.pk for p in products])
+            .order_by()
+            .values('product_id')
+            .annotate(**annotations)
+        )
+        totals = {row.pop('product_id'): row for row in rows}
+        for product in products:
+            row = totals.get(product.pk, {})
+            for field in AGGREGATE_FIELDS:
+                setattr(product, field, row.get(field) or 0)
+
+        Product.objects.using(using).bulk_update(products, AGGREGATE_FIELDS)
+        updated += len(products)
+    return updated
@@ -6,3 +6,10 @@ class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
     verbose_name = 'E-commerce Product Catalog'
+
+    def ready(self):
+        # Register signal handlers for the denormalized catalog data
+        from django.db.models.signals import post_migrate
+        from . import signals
+
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
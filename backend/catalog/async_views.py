@@ -0,0 +1,174 @@
+"""
+Async versions of the hot catalog reads, for ASGI deployments.
+
+Enabled with CATALOG_ASYNC_VIEWS (see catalog.urls), they serve GET and HEAD
+for the product list and detail, product reviews and the category list.
+They reuse the viewsets' querysets, filters, pagination and serializers and
+only swap the database and cache reads for their async counterparts, so
+responses, cache entries and ETags are the same as the sync views'. The
+viewsets' authentication, permission and throttle checks (initial()) run
+first, in a thread, as they read the database and the cache. Other methods
+on the same URLs (writes, OPTIONS) go to the regular DRF views.
+
+Note that Django runs async ORM queries in a thread per request: the gain
+is that connections waiting on the network, the cache or a client do not
+hold a worker, not that the queries themselves are faster. Compare both
+setups with the benchmark_concurrency command.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .cache import acached_response
+from .facets import acategory_stats
+from .models import Product
+from .pagination import KeysetPagination
+from .routers import cache_variant
+from .serializers import ReviewSerializer
+from .views import CategoryViewSet, ProductViewSet, filter_reviews
+
+# Same messages as DRF's get_object_or_404 in the sync views
+NOT_FOUND = f'No {Product._meta.object_name} matches the given query.'
+
+# The regular views, for everything but reads
+product_list_sync = ProductViewSet.as_view({'get': 'list', 'post': 'create'})
+product_detail_sync = ProductViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+)
+# With the action's own settings (its throttle), as the router would
+product_reviews_sync = ProductViewSet.as_view(
+    {'get': 'reviews', 'post': 'reviews'}, detail=True, **ProductViewSet.reviews.kwargs
+)
+category_list_sync = CategoryViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+def _renderer():
+    return api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+
+def _viewset(viewset_class, request, action, **kwargs):
+    """A viewset instance set up as as_view() would, to reuse its queryset, filters and serializers."""
+    # Per-action settings of @action (e.g. throttle_classes), as the router passes them
+    initkwargs = getattr(getattr(viewset_class, action), 'kwargs', {})
+    view = viewset_class(
+        action_map={'get': action}, args=(), kwargs=kwargs, format_kwarg=None, headers={}, **initkwargs
+    )
+    view.request = view.initialize_request(request, **kwargs)
+    view.action = action
+    return view
+
+
+def _error_response(view, exc, renderer):
+    """The API error response of `exc`, with its headers (e.g. Retry-After), as the sync views render it."""
+    response = exception_handler(exc, {'view': view, 'request': view.request})
+    if response is None:
+        raise exc
+    error = HttpResponse(renderer.render(response.data), status=response.status_code, content_type=renderer.media_type)
+    for header, value in response.headers.items():
+        if header != 'Content-Type':
+            error[header] = value
+    return error
+
+
+async def _respond(view, build, get_last_modified=None, cache=True):
+    """
+    Runs the view's checks, then renders the data returned by the `build`
+    coroutine function, or the API error it raised, through the response
+    cache when `cache` is set.
+    """
+    renderer = _renderer()
+    try:
+        # Authentication, permissions and throttles, before any cached response is served;
+        # ReplicaReadMixin.initial() then sends the reads to a replica
+        await sync_to_async(view.initial)(view.request, **view.kwargs)
+    except Exception as exc:
+        return _error_response(view, exc, renderer)
+
+    async def render():
+        try:
+            data = await build()
+        except Exception as exc:
+            return _error_response(view, exc, renderer)
+        return HttpResponse(renderer.render(data), content_type=renderer.media_type)
+
+    if not cache:
+        return await render()
+    return await acached_response(view.request, renderer.media_type, render, get_last_modified, cache_variant())
+
+
+async def _paginated_list(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    paginator = view.paginator
+    page = await paginator.apaginate_queryset(queryset, view.request, view=view)
+    return paginator.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+
+@csrf_exempt
+async def product_list(request):
+    if request.method not in SAFE_METHODS:
+        return await sync_to_async(product_list_sync)(request)
+    view = _viewset(ProductViewSet, request, 'list')
+    return await _respond(view, lambda: _paginated_list(view))
+
+
+@csrf_exempt
+async def product_detail(request, pk):
+    if request.method not in SAFE_METHODS:
+        return await sync_to_async(product_detail_sync)(request, pk=pk)
+    view = _viewset(ProductViewSet, request, 'retrieve', pk=pk)
+
+    async def build():
+        try:
+            product = await view.filter_queryset(view.get_queryset()).aget(pk=pk)
+        except Product.DoesNotExist:
+            raise Http404(NOT_FOUND)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        return view.get_serializer(product).data
+
+    async def last_modified():
+        try:
+            return await Product.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+        except (ValueError, DjangoValidationError):
+            return None
+
+    return await _respond(view, build, last_modified)
+
+
+@csrf_exempt
+async def product_reviews(request, pk):
+    if request.method not in SAFE_METHODS:
+        return await sync_to_async(product_reviews_sync)(request, pk=pk)
+    view = _viewset(ProductViewSet, request, 'reviews', pk=pk)
+
+    async def build():
+        try:
+            exists = await Product.objects.filter(pk=pk).aexists()
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        if not exists:
+            raise Http404(NOT_FOUND)
+        reviews = filter_reviews(pk, view.request.query_params)
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(reviews, view.request, view=view)
+        return paginator.get_paginated_response(ReviewSerializer(page, many=True).data).data
+
+    # Like the sync action, review pages are not response cached
+    return await _respond(view, build, cache=False)
+
+
+@csrf_exempt
+async def category_list(request):
+    if request.method not in SAFE_METHODS:
+        return await sync_to_async(category_list_sync)(request)
+    view = _viewset(CategoryViewSet, request, 'list')
+
+    async def build():
+        view.preloaded_stats = await acategory_stats()
+        return await _paginated_list(view)
+
+    return await _respond(view, build)
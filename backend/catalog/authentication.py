@@ -0,0 +1,187 @@
+"""
+JWT authentication without a user query on every request.
+
+simplejwt's JWTAuthentication loads the user row for each authenticated
+request, catalog reads included. CachedJWTAuthentication keeps resolved
+users in a small per-process LRU for CATALOG_AUTH_USER_CACHE_TIMEOUT
+seconds, keyed by user id and the user's auth version.
+
+The auth version is a per-user version in the catalog cache (see
+catalog.cache.get_version). Saving or deleting a user bumps it (see
+catalog.signals), so every process stops using its cached copy, whatever
+changed: profile, is_active or password. Writes that skip signals, like
+QuerySet.update(), are picked up when the cached entry expires.
+
+Access tokens issued at login (ClaimsTokenObtainPairSerializer) also carry
+the username, the staff flags and the auth version. With
+CATALOG_AUTH_TRUST_CLAIMS, safe-method requests on views that set
+`trust_token_claims` get a stateless TokenUser built from those claims
+instead, without any database access, as long as the token's version is
+still the user's current one. Only opt views in whose reads need nothing
+else from the user (no permissions, no relations).
+"""
+import copy
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import bump_version, get_version
+from .metrics import registry
+
+VERSION_CLAIM = 'auth_version'
+# Claims read by rest_framework_simplejwt.models.TokenUser
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser')
+
+
+def _namespace(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_version(user_id):
+    """The current auth version of a user."""
+    return get_version(_namespace(user_id))
+
+
+def invalidate_user(user_id):
+    """Expires the cached copies of a user and the claims of their tokens."""
+    bump_version(_namespace(user_id))
+    _users.discard(user_id)
+
+
+class UserCache:
+    """Thread-safe LRU of resolved users whose entries expire after a timeout."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (user id, version) -> (user, expires at)
+        self.stats = dict.fromkeys(('hit', 'miss', 'claims'), 0)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > monotonic():
+                self.entries.move_to_end(key)
+                self.stats['hit'] += 1
+                # Each request gets its own copy to modify
+                return copy.copy(entry[0])
+            if entry is not None:
+                del self.entries[key]
+            self.stats['miss'] += 1
+            return None
+
+    def set(self, key, user, timeout, max_size):
+        with self.lock:
+            self.entries[key] = (copy.copy(user), monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == str(user_id)]:
+                del self.entries[key]
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_users = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication resolving users from the per-process user cache or trusted claims."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS and self.trusts_claims(request):
+            user = self.get_claims_user(validated_token)
+            if user is not None:
+                return user, validated_token
+        return self.get_user(validated_token), validated_token
+
+    def trusts_claims(self, request):
+        view = request.parser_context.get('view') if request.parser_context else None
+        return getattr(settings, 'CATALOG_AUTH_TRUST_CLAIMS', False) and getattr(view, 'trust_token_claims', False)
+
+    def get_claims_user(self, validated_token):
+        """A TokenUser for tokens carrying the user's current auth version, else None."""
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(VERSION_CLAIM)
+        if user_id is None or version is None or version != user_version(user_id):
+            return None
+        _users.count('claims')
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    def get_user(self, validated_token):
+        timeout = getattr(settings, 'CATALOG_AUTH_USER_CACHE_TIMEOUT', 30)
+        if timeout <= 0:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+
+        key = (str(user_id), user_version(user_id))
+        user = _users.get(key)
+        if user is None:
+            # Raises for unknown and inactive users, which are never cached
+            user = super().get_user(validated_token)
+            _users.set(key, user, timeout, getattr(settings, 'CATALOG_AUTH_USER_CACHE_SIZE', 1024))
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login serializer embedding the claims CachedJWTAuthentication can trust."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        # Copied into the access tokens obtained with this refresh token
+        token[VERSION_CLAIM] = user_version(user.pk)
+        return token
+
+
+def auth_metrics():
+    """Metric lines of the user cache of this process, in the Prometheus text format."""
+    with _users.lock:
+        stats, size = dict(_users.stats), len(_users.entries)
+    if not any(stats.values()):
+        return []
+    name = 'auth_user_lookups_total'
+    lines = [
+        f'# HELP {name} JWT users resolved from the user cache (hit), the database (miss) or token claims.',
+        f'# TYPE {name} counter',
+    ]
+    lines += [f'{name}{{result="{result}"}} {count}' for result, count in stats.items()]
+    lines += ['# HELP auth_user_cache_entries Users held by the user cache.', '# TYPE auth_user_cache_entries gauge']
+    lines.append(f'auth_user_cache_entries {size}')
+    return lines
+
+
+registry.add_collector(auth_metrics)
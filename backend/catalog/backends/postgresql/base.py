@@ -0,0 +1,53 @@
+"""
+PostgreSQL backend taking its connections from a per-process pool.
+
+Set ENGINE to 'catalog.backends.postgresql' and describe the pool in the
+database's POOL setting (min_size, max_size, timeout, max_idle); see
+catalog.pool. Health checks before reuse follow CONN_HEALTH_CHECKS.
+Connections are handed back when Django closes them, so CONN_MAX_AGE
+should be 0.
+"""
+from django.db.backends.postgresql import base
+
+from catalog.pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            check=self._check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+            **self.settings_dict.get('POOL', {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # Connections that saw errors or are closed inside a transaction are not reused
+        reusable = not connection.closed and not self.errors_occurred and not self.in_atomic_block
+        if reusable:
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        with self.wrap_database_errors:
+            self.pool.putconn(connection, reusable=reusable)
+
+    def _check_connection(self, connection):
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
@@ -0,0 +1,144 @@
+"""
+Bulk product upserts for catalog sync jobs.
+
+A batch is validated row by row with one serializer instance, resolves all
+categories and existing products with a handful of IN queries, and writes
+with bulk_create/bulk_update in chunks inside a single transaction. Rows that
+fail validation are reported and skipped; the rest of the batch is applied.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Category, Product
+from .reservations import forget_sold_out
+from .serializers import ProductBulkRowSerializer
+from .signals import bulk_products_changed
+
+WRITE_BATCH_SIZE = 500
+# Model fields a row may set, besides the category
+VALUE_FIELDS = ['sku', 'name', 'description', 'price', 'stock_quantity', 'image_url', 'is_available']
+CREATE_REQUIRED = ['name', 'description', 'price']
+
+
+def _resolve_categories(rows):
+    """Maps every category id and slug referenced by the rows in one query."""
+    ids = {row['category'] for row in rows if 'category' in row}
+    slugs = {row['category_slug'] for row in rows if 'category_slug' in row}
+    if not ids and not slugs:
+        return set(), {}
+    found = Category.objects.filter(Q(pk__in=ids) | Q(slug__in=slugs)).values_list('pk', 'slug')
+    known_ids, by_slug = set(), {}
+    for pk, slug in found:
+        known_ids.add(pk)
+        by_slug[slug] = pk
+    return known_ids, by_slug
+
+
+def bulk_upsert_products(rows):
+    """
+    Creates or updates products from a list of row dicts.
+    Returns {'created': n, 'updated': n, 'errors': n, 'results': [...]}, with
+    one {'index', 'status', 'id' | 'errors'} entry per input row.
+    """
+    row_serializer = ProductBulkRowSerializer()
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, row_serializer.run_validation(row)))
+        except ValidationError as exc:
+            results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+
+    category_ids, category_slugs = _resolve_categories([data for _, data in valid])
+    existing_by_id = Product.objects.only('id', 'sku').in_bulk(
+        [data['id'] for _, data in valid if 'id' in data]
+    )
+    existing_by_sku = Product.objects.only('id', 'sku').in_bulk(
+        [data['sku'] for _, data in valid if 'sku' in data and 'id' not in data], field_name='sku'
+    )
+
+    now = timezone.now()
+    to_create = []                 # (index, Product)
+    to_update = defaultdict(list)  # frozenset(fields) -> [(index, Product)]
+    seen = set()
+
+    for index, data in valid:
+        def fail(errors):
+            results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+        if 'category_slug' in data:
+            if data['category_slug'] not in category_slugs:
+                fail({'category_slug': ['Unknown category.']})
+                continue
+            data['category_id'] = category_slugs[data.pop('category_slug')]
+        elif 'category' in data:
+            if data['category'] not in category_ids:
+                fail({'category': ['Unknown category.']})
+                continue
+            data['category_id'] = data.pop('category')
+
+        if 'id' in data:
+            product = existing_by_id.get(data['id'])
+            if product is None:
+                fail({'id': ['Product not found.']})
+                continue
+        else:
+            product = existing_by_sku.get(data['sku']) if 'sku' in data else None
+
+        identity = ('id', product.pk) if product else ('sku', data.get('sku'))
+        if product or 'sku' in data:
+            if identity in seen:
+                fail({'non_field_errors': ['Duplicate row for the same product in this batch.']})
+                continue
+            seen.add(identity)
+
+        fields = [name for name in VALUE_FIELDS + ['category_id'] if name in data]
+        if product is None:
+            missing = [name for name in CREATE_REQUIRED if name not in data]
+            if 'category_id' not in data:
+                missing.append('category')
+            if missing:
+                fail({name: ['This field is required to create a product.'] for name in missing})
+                continue
+            to_create.append((index, Product(**{name: data[name] for name in fields})))
+        else:
+            for name in fields:
+                setattr(product, name, data[name])
+            product.updated_at = now
+            to_update[frozenset(fields + ['updated_at'])].append((index, product))
+
+    with transaction.atomic():
+        if to_create:
+            Product.objects.bulk_create([product for _, product in to_create], batch_size=WRITE_BATCH_SIZE)
+        for fields, entries in to_update.items():
+            Product.objects.bulk_update(
+                [product for _, product in entries], sorted(fields), batch_size=WRITE_BATCH_SIZE
+            )
+        # Products the feed marks unavailable stay so when reserved stock is returned
+        disabled = [
+            product.pk for fields, entries in to_update.items() if 'is_available' in fields
+            for _, product in entries if not product.is_available
+        ]
+        if disabled:
+            forget_sold_out(disabled)
+        if to_create or to_update:
+            bulk_products_changed()
+
+    for index, product in to_create:
+        results[index] = {'index': index, 'status': 'created', 'id': product.pk}
+    updated = 0
+    for entries in to_update.values():
+        for index, product in entries:
+            results[index] = {'index': index, 'status': 'updated', 'id': product.pk}
+            updated += 1
+
+    return {
+        'created': len(to_create),
+        'updated': updated,
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results,
+    }
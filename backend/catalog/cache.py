@@ -0,0 +1,222 @@
+"""
+Helpers for caching derived catalog data in the Django cache.
+
+Cached entries embed a namespace version in their key. Bumping the version
+(from the signal handlers in catalog.signals) invalidates every entry of the
+namespace at once, without having to find or delete the stale keys.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+RESPONSE_CACHE_NAMESPACE = 'responses'
+
+# Query parameters that change how a result set is presented, not which rows it holds
+PRESENTATION_PARAMS = {'limit', 'offset', 'ordering', 'cursor', 'pagination', 'fields', 'expand', 'format'}
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'catalog:version:{namespace}'
+
+
+def get_version(namespace):
+    """
+    Returns the current version of a cache namespace.
+    Missing versions start from the current time in milliseconds, so a
+    version evicted from the cache never comes back to an older value.
+    """
+    cache = get_cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+async def aget_version(namespace):
+    """get_version() for async views."""
+    cache = get_cache()
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        version = await cache.aget(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    """Invalidates every cached entry of the namespace."""
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), int(time.time() * 1000), timeout=None)
+
+
+def filter_signature(request, ignore=PRESENTATION_PARAMS):
+    """
+    Normalizes the filtering query parameters of a request into a short hash.
+    Parameter order, blank values and presentation-only parameters are ignored.
+    """
+    items = sorted(
+        (key, value.strip())
+        for key, values in request.query_params.lists()
+        if key not in ignore
+        for value in values
+        if value.strip()
+    )
+    raw = '&'.join(f'{key}={value}' for key, value in items)
+    return hashlib.sha1(f'{request.path}?{raw}'.encode()).hexdigest()
+
+
+def cached_many(prefix, ids, load, timeout):
+    """
+    Returns {id: value} for the ids found in the cache under `prefix`, plus
+    whatever load(missing_ids) returns for the others, which is then cached.
+    One get_many and at most one set_many, however many ids are asked for.
+    """
+    cache = get_cache()
+    keys = {f'{prefix}:{pk}': pk for pk in ids}
+    found = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        loaded = load(missing)
+        if loaded:
+            cache.set_many({f'{prefix}:{pk}': value for pk, value in loaded.items()}, timeout)
+        found.update(loaded)
+    return found
+
+
+def variant_key(version, variant):
+    """A namespace version qualified by the cache variant of the request (see catalog.routers.cache_variant)."""
+    return f'{version}:{variant}' if variant else str(version)
+
+
+def response_cache_key(request, media_type, version, variant=''):
+    """Cache key of a rendered read response; shared by the sync and async views."""
+    return 'catalog:response:{}:{}:{}'.format(
+        variant_key(version, variant), media_type, filter_signature(request, ignore=()),
+    )
+
+
+def content_etag(content):
+    return quote_etag(hashlib.sha1(content).hexdigest())
+
+
+def conditional_response(request, response, last_modified):
+    """
+    Sets the ETag, derived from the rendered content, and Last-Modified of a
+    catalog response, and turns it into a 304 when the client's copy matches.
+    """
+    etag = content_etag(response.content)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+
+
+async def acached_response(request, media_type, build, get_last_modified=None, variant=''):
+    """
+    CachedResponseMixin.cached_response() for async views, sharing its cache
+    entries. `build` and `get_last_modified` are coroutine functions; the
+    HttpResponse returned by `build` is cached when successful. A `variant`
+    of None bypasses the cache.
+    """
+    timeout = getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 60)
+    if not timeout or variant is None:
+        return await build()
+
+    key = response_cache_key(request, media_type, await aget_version(RESPONSE_CACHE_NAMESPACE), variant)
+    cached = await get_cache().aget(key)
+    if cached is not None:
+        content, content_type, last_modified = cached
+        return conditional_response(request, HttpResponse(content, content_type=content_type), last_modified)
+
+    modified = await get_last_modified() if get_last_modified else None
+    last_modified = int(modified.timestamp()) if modified else None
+    if last_modified:
+        not_modified = get_conditional_response(request, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+    response = await build()
+    if response.status_code != 200:
+        return response
+    await get_cache().aset(key, (response.content, response['Content-Type'], last_modified), timeout)
+    return conditional_response(request, response, last_modified)
+
+
+def invalidate_responses():
+    """Bumps the catalog version, expiring every cached response and ETag."""
+    bump_version(RESPONSE_CACHE_NAMESPACE)
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching the rendered responses of read actions.
+
+    Entries are keyed by the catalog version, the request path, all query
+    parameters and the negotiated media type. The ETag is a hash of the
+    rendered content, so a client revalidating with If-None-Match against a
+    cached entry gets a 304 without any query or serialization, and changes
+    that do not bump the version (like stock moved by catalog.reservations)
+    show up once the entry expires. Views may also provide
+    get_last_modified() to support If-Modified-Since.
+    """
+    cached_actions = ('list', 'retrieve')
+
+    def get_last_modified(self):
+        """Returns the datetime the requested resource last changed, or None."""
+        return None
+
+    def response_cache_variant(self):
+        """The partition of the response cache this request uses; None bypasses the cache."""
+        return ''
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 60)
+        variant = self.response_cache_variant()
+        if self.action not in self.cached_actions or not timeout or variant is None:
+            return handler(request, *args, **kwargs)
+
+        key = response_cache_key(
+            request, request.accepted_renderer.media_type, get_version(RESPONSE_CACHE_NAMESPACE), variant,
+        )
+        cached = get_cache().get(key)
+        if cached is not None:
+            content, content_type, last_modified = cached
+            return conditional_response(request, HttpResponse(content, content_type=content_type), last_modified)
+
+        modified = self.get_last_modified()
+        last_modified = int(modified.timestamp()) if modified else None
+        if last_modified:
+            not_modified = get_conditional_response(request, last_modified=last_modified)
+            if not_modified is not None:
+                return not_modified
+        # Rendered, stored and given its ETag in finalize_response, once the renderer is known
+        self._response_cache_entry = (key, last_modified, timeout)
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        entry = getattr(self, '_response_cache_entry', None)
+        if entry and isinstance(response, Response) and response.status_code == 200:
+            key, last_modified, timeout = entry
+            response.render()
+            get_cache().set(key, (response.content, response['Content-Type'], last_modified), timeout)
+            response = conditional_response(request, response, last_modified)
+        return response
@@ -0,0 +1,208 @@
+"""
+Server-side carts: ownership, item updates and batch pricing.
+
+A cart belongs to the signed-in user (JWT or session authentication) or,
+for anonymous visitors, to their Django session. Every priced response
+resolves all of the cart's products, with their current price and stock,
+in a single in_bulk query, however many items the cart holds.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Cart, CartItem, Product
+
+# Product columns needed to price and validate a cart
+PRICING_FIELDS = ['id', 'name', 'price', 'stock_quantity', 'is_available', 'image_url']
+
+# Problems that block checkout; a price change is only reported
+BLOCKING_PROBLEMS = {'unavailable', 'insufficient_stock'}
+
+
+class QuantityLimitExceeded(Exception):
+    """Raised when items would exceed CATALOG_CART_MAX_QUANTITY of some products."""
+
+    def __init__(self, product_ids, limit):
+        super().__init__(f'At most {limit} of a product per cart: {product_ids}')
+        self.product_ids = product_ids
+        self.limit = limit
+
+
+def max_quantity():
+    return getattr(settings, 'CATALOG_CART_MAX_QUANTITY', 100)
+
+
+def get_cart(request, create=False):
+    """
+    Returns the cart of the request's user or session, or None when there is
+    none and `create` is false. An anonymous session cart is merged into the
+    user's cart on the first request after signing in.
+    """
+    user = request.user if request.user.is_authenticated else None
+    session_key = request.session.session_key
+
+    if user is None:
+        if session_key is None:
+            if not create:
+                return None
+            request.session.save()
+            session_key = request.session.session_key
+        if not create:
+            return Cart.objects.filter(session_key=session_key).first()
+        return _get_or_create(session_key=session_key)
+
+    cart = Cart.objects.filter(user=user).first()
+    if session_key is not None:
+        anonymous = Cart.objects.filter(session_key=session_key).first()
+        if anonymous is not None:
+            if cart is None:
+                # Adopt the anonymous cart as it is
+                anonymous.user, anonymous.session_key = user, None
+                anonymous.save(update_fields=['user', 'session_key', 'updated_at'])
+                return anonymous
+            _merge(anonymous, cart)
+    if cart is None and create:
+        cart = _get_or_create(user=user)
+    return cart
+
+
+def _get_or_create(**owner):
+    try:
+        with transaction.atomic():
+            return Cart.objects.get_or_create(**owner)[0]
+    except IntegrityError:
+        # Created by a concurrent request of the same owner
+        return Cart.objects.get(**owner)
+
+
+def _lock(cart):
+    """Locks the cart row until the end of the transaction, so changes to the cart apply one at a time."""
+    return Cart.objects.select_for_update().filter(pk=cart.pk).values_list('pk', flat=True).first() is not None
+
+
+def _merge(source, target):
+    """
+    Moves the items of `source` into `target`, adding up quantities (up to
+    CATALOG_CART_MAX_QUANTITY), then deletes `source`.
+    """
+    with transaction.atomic():
+        _lock(target)
+        if not _lock(source):
+            # Merged by a concurrent request
+            return
+        existing = {item.product_id: item for item in target.items.all()}
+        moved = list(source.items.all())
+        for item in moved:
+            if item.product_id in existing:
+                existing[item.product_id].quantity = min(existing[item.product_id].quantity + item.quantity, max_quantity())
+        CartItem.objects.bulk_update(
+            [existing[item.product_id] for item in moved if item.product_id in existing], ['quantity'],
+        )
+        source.items.exclude(product_id__in=existing).update(cart=target)
+        source.delete()
+
+
+def _load_products(product_ids):
+    """Current price and stock of every product, in one query."""
+    return Product.objects.only(*PRICING_FIELDS).in_bulk(list(product_ids))
+
+
+def update_items(cart, quantities, replace=False):
+    """
+    Adds {product_id: quantity} to the cart, on top of what it holds, or with
+    `replace` sets those quantities, where 0 removes the product.
+    Returns (products, unknown product ids); nothing is written when some
+    products do not exist. `products` can be passed on to price_cart.
+    Raises QuantityLimitExceeded, writing nothing, when a product would go
+    over CATALOG_CART_MAX_QUANTITY.
+
+    The cart row is locked while its items are read and written, so
+    concurrent updates of the same cart neither lose quantities nor collide
+    on a new item.
+    """
+    removed = [product_id for product_id, quantity in quantities.items() if replace and not quantity]
+    kept = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    with transaction.atomic():
+        _lock(cart)
+        items = {item.product_id: item for item in cart.items.all()}
+        products = _load_products(set(items) | set(kept))
+        unknown = sorted(set(kept) - set(products))
+        if unknown:
+            return products, unknown
+
+        created, updated = [], []
+        for product_id, quantity in kept.items():
+            item = items.get(product_id)
+            if item is None:
+                created.append(CartItem(
+                    cart=cart, product_id=product_id, quantity=quantity, added_price=products[product_id].price,
+                ))
+            else:
+                item.quantity = quantity if replace else item.quantity + quantity
+                updated.append(item)
+        too_many = sorted(item.product_id for item in created + updated if item.quantity > max_quantity())
+        if too_many:
+            raise QuantityLimitExceeded(too_many, max_quantity())
+
+        if removed:
+            cart.items.filter(product_id__in=removed).delete()
+        CartItem.objects.bulk_create(created)
+        CartItem.objects.bulk_update(updated, ['quantity'])
+        cart.save(update_fields=['updated_at'])
+    return products, []
+
+
+def price_cart(cart, products=None):
+    """
+    Prices every line of the cart at the current product prices and reports
+    availability problems:
+
+    - unavailable: the product cannot be purchased;
+    - insufficient_stock: fewer units in stock than in the cart;
+    - price_changed: the price differs from when it was added.
+
+    `products` may hold products already loaded with PRICING_FIELDS;
+    otherwise they are fetched with one in_bulk query.
+    """
+    if cart is None:
+        return {'id': None, 'items': [], 'item_count': 0, 'subtotal': '0.00', 'checkout_ready': False}
+    items = list(cart.items.all())
+    if products is None or not {item.product_id for item in items} <= set(products):
+        products = _load_products(item.product_id for item in items)
+
+    lines, subtotal, blocked = [], Decimal('0.00'), False
+    for item in items:
+        product = products.get(item.product_id)
+        if product is None:
+            # Deleted since the items were read; its cart item is gone too
+            continue
+        problems = []
+        if not product.is_available:
+            problems.append({'code': 'unavailable'})
+        elif product.stock_quantity < item.quantity:
+            problems.append({'code': 'insufficient_stock', 'available': product.stock_quantity})
+        if product.price != item.added_price:
+            problems.append({'code': 'price_changed', 'previous_price': str(item.added_price)})
+        blocked = blocked or any(problem['code'] in BLOCKING_PROBLEMS for problem in problems)
+
+        line_total = product.price * item.quantity
+        subtotal += line_total
+        lines.append({
+            'product': product.pk,
+            'name': product.name,
+            'image_url': product.image_url,
+            'quantity': item.quantity,
+            'unit_price': str(product.price),
+            'line_total': str(line_total),
+            'stock_quantity': product.stock_quantity,
+            'problems': problems,
+        })
+
+    return {
+        'id': cart.pk,
+        'items': lines,
+        'item_count': sum(line['quantity'] for line in lines),
+        'subtotal': str(subtotal),
+        'checkout_ready': bool(lines) and not blocked,
+    }
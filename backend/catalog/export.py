@@ -0,0 +1,136 @@
+"""
+Streaming product exports (NDJSON and CSV).
+
+Rows are read with values_list() through a chunked iterator and written out
+as they arrive, so memory use stays flat however large the catalog is. No
+model instances, serializers or count queries are involved. Used by the
+/api/products/export/ endpoint and the export_catalog command.
+"""
+import csv
+import io
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Rows fetched per database round trip
+EXPORT_CHUNK_SIZE = 2000
+# Rows per chunk of output text handed to the response or file
+ROWS_PER_WRITE = 500
+
+# Exportable columns and the lookups they are read from
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'sku': 'sku',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'stock_quantity': 'stock_quantity',
+    'image_url': 'image_url',
+    'is_available': 'is_available',
+    'category': 'category_id',
+    'category_slug': 'category__slug',
+    'category_title': 'category__title',
+    'review_count': 'review_count',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+def _average_rating(rating_sum, review_count):
+    return round(rating_sum / review_count, 2) if review_count else 0
+
+
+# Columns computed from other lookups while streaming
+DERIVED_COLUMNS = {
+    'average_rating': (('rating_sum', 'review_count'), _average_rating),
+}
+
+DEFAULT_COLUMNS = [
+    'id', 'sku', 'name', 'description', 'price', 'stock_quantity', 'image_url',
+    'is_available', 'category_slug', 'average_rating', 'review_count', 'created_at', 'updated_at',
+]
+
+
+def resolve_columns(names):
+    """
+    Validates the requested column names, keeping their order.
+    An empty selection means DEFAULT_COLUMNS. Raises ValueError for unknown names.
+    """
+    if not names:
+        return list(DEFAULT_COLUMNS)
+    unknown = [name for name in names if name not in EXPORT_COLUMNS and name not in DERIVED_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}.")
+    return list(dict.fromkeys(names))
+
+
+def export_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields one tuple of column values per product of the queryset."""
+    lookups = []
+    for column in columns:
+        lookups.extend(DERIVED_COLUMNS[column][0] if column in DERIVED_COLUMNS else [EXPORT_COLUMNS[column]])
+    lookups = list(dict.fromkeys(lookups))
+    position = {lookup: index for index, lookup in enumerate(lookups)}
+
+    getters = []
+    for column in columns:
+        if column in DERIVED_COLUMNS:
+            sources, compute = DERIVED_COLUMNS[column]
+            indexes = [position[source] for source in sources]
+            getters.append(lambda row, indexes=indexes, compute=compute: compute(*(row[i] for i in indexes)))
+        else:
+            index = position[EXPORT_COLUMNS[column]]
+            getters.append(lambda row, index=index: row[index])
+
+    for row in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield tuple(getter(row) for getter in getters)
+
+
+def ndjson_chunks(rows, columns):
+    """Encodes rows as newline-delimited JSON objects."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(columns, row))))
+        if len(lines) >= ROWS_PER_WRITE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(rows, columns):
+    """Encodes rows as CSV with a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % ROWS_PER_WRITE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Output format -> (encoder, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_chunks, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_chunks, 'text/csv', 'csv'),
+}
+
+
+def stream_export(queryset, columns, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Returns an iterator of text chunks encoding the queryset in the given format."""
+    encode = EXPORT_FORMATS[export_format][0]
+    return encode(export_rows(queryset, columns, chunk_size), columns)
@@ -0,0 +1,169 @@
+"""
+Facet counts for the product filter sidebar.
+
+Facets are "disjunctive": each facet is counted with every active filter
+except its own, so selecting a category still shows the counts of the other
+categories. All counts come from two queries (one conditional aggregate and
+one GROUP BY category) and are cached per normalized filter signature until
+the catalog or its reviews change.
+
+The category stats shown next to each category (product and available
+counts, price range, average rating) are cached the same way, for all
+categories at once.
+"""
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from .cache import aget_version, bump_version, filter_signature, get_cache, get_version, variant_key
+from .models import Product
+from .routers import cache_variant
+from .search import search_products
+
+FACET_CACHE_NAMESPACE = 'facets'
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = [25, 50, 100, 250, 500, 1000]
+RATING_BANDS = [4, 3, 2, 1]
+
+
+def invalidate_facets():
+    bump_version(FACET_CACHE_NAMESPACE)
+
+
+def _price_buckets():
+    lower = 0
+    for upper in PRICE_BUCKET_EDGES:
+        yield lower, upper
+        lower = upper
+    yield lower, None
+
+
+def _facet_conditions(data):
+    """Builds one Q per facet dimension from cleaned ProductFilter data."""
+    category = Q(category__slug=data['category_slug']) if data.get('category_slug') else Q()
+    price = Q()
+    if data.get('min_price') is not None:
+        price &= Q(price__gte=data['min_price'])
+    if data.get('max_price') is not None:
+        price &= Q(price__lte=data['max_price'])
+    availability = Q(is_available=data['is_available']) if data.get('is_available') is not None else Q()
+    return category, price, availability
+
+
+def compute_facets(queryset, data, search_term=''):
+    """
+    Returns the facet counts for a product queryset.
+    `data` is the cleaned data of a ProductFilter form.
+    """
+    if data.get('search_term'):
+        queryset = search_products(queryset, data['search_term'])
+    if search_term:
+        queryset = search_products(queryset, search_term)
+    queryset = queryset.order_by()
+
+    category, price, availability = _facet_conditions(data)
+
+    aggregates = {'count': Count('id', filter=category & price & availability)}
+    for index, (lower, upper) in enumerate(_price_buckets()):
+        bucket = Q(price__gte=lower) & (Q(price__lt=upper) if upper is not None else Q())
+        aggregates[f'price_{index}'] = Count('id', filter=bucket & category & availability)
+    aggregates['available'] = Count('id', filter=Q(is_available=True) & category & price)
+    aggregates['unavailable'] = Count('id', filter=Q(is_available=False) & category & price)
+    for band in RATING_BANDS:
+        # average >= band  <=>  rating_sum >= band * review_count
+        rated = Q(review_count__gt=0, rating_sum__gte=F('review_count') * band)
+        aggregates[f'rating_{band}'] = Count('id', filter=rated & category & price & availability)
+    totals = queryset.aggregate(**aggregates)
+
+    category_rows = (
+        queryset.filter(price & availability)
+        .values('category__slug', 'category__title')
+        .annotate(count=Count('id'))
+        .order_by('category__title')
+    )
+
+    return {
+        'count': totals['count'],
+        'categories': [
+            {'slug': row['category__slug'], 'title': row['category__title'], 'count': row['count']}
+            for row in category_rows
+        ],
+        'price_ranges': [
+            {'min': lower, 'max': upper, 'count': totals[f'price_{index}']}
+            for index, (lower, upper) in enumerate(_price_buckets())
+        ],
+        'availability': {'available': totals['available'], 'unavailable': totals['unavailable']},
+        'ratings': [{'min_rating': band, 'count': totals[f'rating_{band}']} for band in RATING_BANDS],
+    }
+
+
+def cached_facets(request, queryset, data, search_term=''):
+    """compute_facets() behind the cache, keyed by the request's filter signature."""
+    variant = cache_variant()
+    if variant is None:
+        return compute_facets(queryset, data, search_term)
+    cache = get_cache()
+    key = 'catalog:facets:{}:{}'.format(variant_key(get_version(FACET_CACHE_NAMESPACE), variant), filter_signature(request))
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, data, search_term)
+        cache.set(key, facets, getattr(settings, 'CATALOG_FACET_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def _category_stats_rows():
+    # One GROUP BY over the products, with the average from the stored review aggregates
+    return (
+        Product.objects.order_by()
+        .values('category_id')
+        .annotate(
+            product_count=Count('id'),
+            available_count=Count('id', filter=Q(is_available=True)),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            review_count=Sum('review_count'),
+            rating_sum=Sum('rating_sum'),
+        )
+    )
+
+
+def _category_stats(rows):
+    stats = {}
+    for row in rows:
+        review_count = row.pop('review_count')
+        rating_sum = row.pop('rating_sum')
+        row['average_rating'] = round(rating_sum / review_count, 2) if review_count else 0
+        stats[row.pop('category_id')] = row
+    return stats
+
+
+def _category_stats_key(version, variant):
+    return f'catalog:category-stats:{variant_key(version, variant)}'
+
+
+def category_stats():
+    """Stats of every category with products, keyed by category id, behind the cache."""
+    variant = cache_variant()
+    if variant is None:
+        return _category_stats(_category_stats_rows())
+    cache = get_cache()
+    key = _category_stats_key(get_version(FACET_CACHE_NAMESPACE), variant)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _category_stats(_category_stats_rows())
+        cache.set(key, stats, getattr(settings, 'CATALOG_FACET_CACHE_TIMEOUT', 300))
+    return stats
+
+
+async def acategory_stats():
+    """category_stats() for async views."""
+    variant = cache_variant()
+    if variant is None:
+        return _category_stats([row async for row in _category_stats_rows()])
+    cache = get_cache()
+    key = _category_stats_key(await aget_version(FACET_CACHE_NAMESPACE), variant)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = _category_stats([row async for row in _category_stats_rows()])
+        await cache.aset(key, stats, getattr(settings, 'CATALOG_FACET_CACHE_TIMEOUT', 300))
+    return stats
@@ -1,5 +1,8 @@
 import django_filters
+from rest_framework.filters import SearchFilter
+
 from .models import Product, Category
+from .search import search_products
 
 class ProductFilter(django_filters.FilterSet):
     """
@@ -17,11 +20,10 @@ class ProductFilter(django_filters.FilterSet):
         help_text="Filter products by category slug."
     )
     
-    # Filter by name or description (optional full text search setup)
+    # Full-text search over name, category title and description
     search_term = django_filters.CharFilter(
-        field_name='name', 
-        lookup_expr='icontains',
-        help_text="Filter products whose name contains the search term (case-insensitive)."
+        method='filter_search_term',
+        help_text="Filter products matching the search term, ordered by relevance."
     )
     
     # Filter by availability
@@ -33,3 +35,17 @@ class ProductFilter(django_filters.FilterSet):
     class Meta:
         model = Product
         fields = ['category_slug', 'is_available', 'min_price', 'max_price', 'search_term']
+
+    def filter_search_term(self, queryset, name, value):
+        return search_products(queryset, value)
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter backed by the full-text index
+    in catalog.search. Keeps the ?search= parameter; matches come back in
+    relevance order unless the client also passes ?ordering=.
+    """
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').replace('\x00', '')
+        return search_products(queryset, term)
@@ -0,0 +1,238 @@
+"""
+High-throughput product imports from CSV or NDJSON files.
+
+Records are streamed from the input, checked with a light-weight parser
+instead of a serializer per row, and loaded in chunks:
+
+- PostgreSQL: each chunk is COPY'd into a temporary staging table and merged
+  into catalog_product with one INSERT ... ON CONFLICT (sku) statement.
+- Other databases: bulk_create with update_conflicts (INSERT ... ON
+  CONFLICT), or bulk_create/bulk_update where upserts are unsupported.
+
+Rows with a sku are upserted, so re-importing a chunk is harmless; rows
+without one are always inserted. The columns match catalog.export, so an
+export can be loaded back as is.
+"""
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.utils import timezone
+
+from .models import Category, Product
+from .reservations import forget_sold_out
+
+IMPORT_CHUNK_SIZE = 5000
+
+# Columns written by an import, in staging table order
+IMPORT_FIELDS = ['sku', 'name', 'description', 'price', 'stock_quantity', 'image_url', 'is_available', 'category_id']
+# Columns replaced when a row matches an existing sku
+UPSERT_FIELDS = [field for field in IMPORT_FIELDS if field != 'sku'] + ['updated_at']
+# Model fields without a database default that an INSERT has to fill
+ZERO_FIELDS = ['review_count', 'rating_sum'] + [f'rating_{star}_count' for star in range(1, 6)]
+
+MAX_PRICE = Decimal('99999999.99')
+TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+FALSE_VALUES = {'false', '0', 'no', 'n', 'f'}
+
+_validate_url = URLValidator()
+
+
+def detect_format(path):
+    name = path.lower().removesuffix('.gz')
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def read_records(path, import_format):
+    """
+    Streams (line number, record) pairs from a CSV or NDJSON file, which may
+    be gzip-compressed. Records that cannot be decoded come back as strings.
+    """
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as stream:
+        if import_format == 'csv':
+            reader = csv.DictReader(stream)
+            line = 1
+            for record in reader:
+                yield line + 1, record
+                line = reader.line_num
+        else:
+            for line, text in enumerate(stream, 1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except ValueError as exc:
+                    yield line, f'Invalid JSON: {exc}'
+                    continue
+                yield line, record if isinstance(record, dict) else 'Expected a JSON object.'
+
+
+def load_categories(using='default'):
+    """Maps every category slug to its id with a single query."""
+    return dict(Category.objects.using(using).values_list('slug', 'pk'))
+
+
+def _text(record, name):
+    value = record.get(name)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def parse_record(record, categories):
+    """
+    Validates one input record.
+    Returns (values, None) with the IMPORT_FIELDS values, or (None, errors).
+    """
+    if not isinstance(record, dict):
+        return None, {'record': record}
+    errors = {}
+
+    name = _text(record, 'name')
+    if not name:
+        errors['name'] = 'This field is required.'
+    elif len(name) > 255:
+        errors['name'] = 'At most 255 characters.'
+
+    sku = _text(record, 'sku') or None
+    if sku and len(sku) > 64:
+        errors['sku'] = 'At most 64 characters.'
+
+    price = None
+    try:
+        price = Decimal(_text(record, 'price')).quantize(Decimal('0.01'))
+        if not Decimal('0.01') <= price <= MAX_PRICE:
+            errors['price'] = 'Must be between 0.01 and 99999999.99.'
+    except (InvalidOperation, ValueError):
+        errors['price'] = 'A valid number is required.'
+
+    stock = 0
+    if _text(record, 'stock_quantity'):
+        try:
+            stock = int(_text(record, 'stock_quantity'))
+            if stock < 0:
+                errors['stock_quantity'] = 'Must not be negative.'
+        except ValueError:
+            errors['stock_quantity'] = 'A valid integer is required.'
+
+    image_url = _text(record, 'image_url') or None
+    if image_url:
+        try:
+            _validate_url(image_url)
+            if len(image_url) > 2000:
+                raise ValidationError('too long')
+        except ValidationError:
+            errors['image_url'] = 'Enter a valid URL of at most 2000 characters.'
+
+    is_available = True
+    flag = _text(record, 'is_available').lower()
+    if flag in FALSE_VALUES:
+        is_available = False
+    elif flag and flag not in TRUE_VALUES:
+        errors['is_available'] = 'Must be a boolean.'
+
+    slug = _text(record, 'category_slug')
+    category_id = categories.get(slug)
+    if category_id is None:
+        errors['category_slug'] = 'Unknown category.' if slug else 'This field is required.'
+
+    if errors:
+        return None, errors
+    return [sku, name, _text(record, 'description'), price, stock, image_url, is_available, category_id], None
+
+
+def load_chunk(rows, connection):
+    """
+    Writes one chunk of parsed rows. Rows must not repeat a sku.
+    Returns (created, updated). Call inside a transaction.
+    """
+    if connection.vendor == 'postgresql':
+        counts = _copy_chunk(rows, connection)
+    else:
+        counts = _orm_chunk(rows, connection)
+    # Products the file marks unavailable stay so when reserved stock is returned
+    disabled = [row[0] for row in rows if row[0] and not row[IMPORT_FIELDS.index('is_available')]]
+    if disabled:
+        forget_sold_out(
+            Product.objects.using(connection.alias).filter(sku__in=disabled).values('pk'), using=connection.alias,
+        )
+    return counts
+
+
+def _orm_chunk(rows, connection):
+    manager = Product.objects.using(connection.alias)
+    skus = [row[0] for row in rows if row[0]]
+    existing = set(manager.filter(sku__in=skus).values_list('sku', flat=True)) if skus else set()
+    products = [Product(**dict(zip(IMPORT_FIELDS, row))) for row in rows]
+
+    if connection.features.supports_update_conflicts_with_target:
+        # INSERT ... ON CONFLICT (sku) DO UPDATE stays linear, unlike bulk_update's CASE
+        manager.bulk_create(
+            [product for product in products if product.sku],
+            update_conflicts=True, unique_fields=['sku'], update_fields=UPSERT_FIELDS,
+        )
+        manager.bulk_create([product for product in products if not product.sku])
+    else:
+        to_update = [product for product in products if product.sku in existing]
+        pks = dict(manager.filter(sku__in=existing).values_list('sku', 'pk'))
+        # bulk_update skips auto_now; readers such as autocomplete rely on updated_at
+        now = timezone.now()
+        for product in to_update:
+            product.pk, product.updated_at = pks[product.sku], now
+        manager.bulk_create([product for product in products if product.sku not in existing])
+        manager.bulk_update(to_update, UPSERT_FIELDS, batch_size=500)
+    return len(rows) - len(existing), len(existing)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Loads rows into a PostgreSQL table with COPY FROM STDIN (CSV format).
+    Works with psycopg2 and psycopg 3 cursors; None values become NULL.
+    """
+    buffer = io.StringIO()
+    # Strings are quoted, so "" stays an empty string and a bare empty field is NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy_expert'):
+        raw_cursor.copy_expert(copy_sql, buffer)  # psycopg2
+    else:
+        with raw_cursor.copy(copy_sql) as copy:  # psycopg 3
+            copy.write(buffer.getvalue())
+
+
+def _copy_chunk(rows, connection):
+    table = Product._meta.db_table
+    columns = ', '.join(IMPORT_FIELDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE catalog_import_staging (
+                sku varchar(64), name varchar(255) NOT NULL, description text NOT NULL,
+                price numeric(10, 2) NOT NULL, stock_quantity integer NOT NULL,
+                image_url varchar(2000), is_available boolean NOT NULL, category_id bigint NOT NULL
+            ) ON COMMIT DROP
+        """)
+        copy_rows(cursor, 'catalog_import_staging', IMPORT_FIELDS, rows)
+
+        updates = ', '.join(f'{field} = EXCLUDED.{field}' for field in UPSERT_FIELDS)
+        cursor.execute(f"""
+            INSERT INTO {table} ({columns}, created_at, updated_at, {', '.join(ZERO_FIELDS)})
+            SELECT {columns}, now(), now(), {', '.join('0' for _ in ZERO_FIELDS)}
+            FROM catalog_import_staging
+            ON CONFLICT (sku) DO UPDATE SET {updates}
+            RETURNING (xmax = 0)
+        """)
+        inserted = [row[0] for row in cursor.fetchall()]
+    created = sum(inserted)
+    return created, len(inserted) - created
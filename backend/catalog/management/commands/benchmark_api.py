@@ -0,0 +1,271 @@
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from catalog.cache import invalidate_responses
+from catalog.facets import invalidate_facets
+from catalog.models import Category, Product
+from catalog.pagination import invalidate_counts
+
+# (name, URL template, maximum SQL queries per request)
+# Templates are filled from the dataset: {product_id}, {hot_product_id}, {deep_offset}, {category_slug}
+SCENARIOS = [
+    ('products_list', '/api/products/', 2),
+    ('products_filtered', '/api/products/?category_slug={category_slug}&min_price=50&max_price=500&is_available=true', 2),
+    ('products_search', '/api/products/?search=wireless', 2),
+    ('products_ordered', '/api/products/?ordering=-price', 2),
+    ('products_deep_offset', '/api/products/?offset={deep_offset}&limit=20', 2),
+    ('products_cursor', '/api/products/?pagination=cursor&ordering=price', 1),
+    ('product_detail', '/api/products/{product_id}/', 2),
+    ('product_reviews', '/api/products/{hot_product_id}/reviews/', 2),
+    ('product_reviews_by_rating', '/api/products/{hot_product_id}/reviews/?rating=5&ordering=-created_at', 2),
+    ('product_facets', '/api/products/facets/?category_slug={category_slug}', 2),
+    ('categories', '/api/categories/', 3),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def scenario_context(products):
+    """Values for the SCENARIOS URL templates, picked from the current data."""
+    return {
+        'product_id': Product.objects.order_by('pk').values_list('pk', flat=True)[products // 2],
+        'hot_product_id': Product.objects.order_by('-review_count', 'pk').values_list('pk', flat=True)[0],
+        'deep_offset': max(0, int(products * 0.9)),
+        'category_slug': Category.objects.order_by('pk').values_list('slug', flat=True)[0],
+    }
+
+
+def count_queries(call):
+    """Runs call(); returns its result and the number of SQL queries it ran on every database alias."""
+    with ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        result = call()
+    return result, sum(len(queries) for queries in captured)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the catalog API in-process: seeds datasets of the given sizes '
+        '(replacing the catalog), measures p50/p95/p99 latency and throughput per '
+        'endpoint, enforces SQL query budgets and writes the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10000,100000,1000000',
+            help='Comma separated product counts to seed and benchmark.',
+        )
+        parser.add_argument(
+            '--existing',
+            action='store_true',
+            help='Benchmark the current data once instead of seeding datasets.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Measured requests per endpoint.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Unmeasured requests per endpoint before measuring.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Seed passed to seed_data, so every run benchmarks the same data.',
+        )
+        parser.add_argument(
+            '--reviews-per-product',
+            default='longtail:1.2:5000',
+            help='Review distribution passed to seed_data.',
+        )
+        parser.add_argument(
+            '--with-response-cache',
+            action='store_true',
+            help='Keep the response cache on; by default every request reaches the database.',
+        )
+        parser.add_argument(
+            '--only',
+            default='',
+            help='Comma separated scenario names to run (default: all).',
+        )
+        parser.add_argument(
+            '--output',
+            help='JSON results file (default: benchmark-<timestamp>.json).',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Earlier JSON results to compare p95 latencies against.',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Do not ask before replacing the catalog.',
+        )
+
+    def handle(self, *args, **options):
+        only = {name.strip() for name in options['only'].split(',') if name.strip()}
+        unknown = only - {name for name, _, _ in SCENARIOS}
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+        scenarios = [scenario for scenario in SCENARIOS if not only or scenario[0] in only]
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive.')
+
+        if options['existing']:
+            sizes = [None]
+        else:
+            try:
+                sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+            except ValueError:
+                raise CommandError('--sizes must be comma separated integers.')
+            if options['interactive']:
+                answer = input(
+                    f'This replaces the catalog in "{connection.settings_dict["NAME"]}" with seeded data. '
+                    "Type 'yes' to continue: "
+                )
+                if answer != 'yes':
+                    raise CommandError('Benchmark cancelled.')
+
+        # DEBUG would log every query and slow down the measured requests
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_response_cache']:
+            overrides['CATALOG_RESPONSE_CACHE_TIMEOUT'] = 0
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'requests': options['requests'],
+            'response_cache': options['with_response_cache'],
+            'datasets': [],
+        }
+        violations = []
+        with override_settings(**overrides):
+            for size in sizes:
+                if size is not None:
+                    self.stdout.write(f"Seeding {size} products...")
+                    started = time.monotonic()
+                    call_command(
+                        'seed_data', items=size, seed=options['seed'],
+                        reviews_per_product=options['reviews_per_product'], stdout=io.StringIO(),
+                    )
+                    self.stdout.write(f"  seeded in {time.monotonic() - started:.1f}s")
+                dataset = self.run_dataset(scenarios, options)
+                results['datasets'].append(dataset)
+                violations += [
+                    f"{dataset['products']} products / {row['name']}: {row['queries']} queries (budget {row['query_budget']})"
+                    for row in dataset['scenarios'] if row['queries'] > row['query_budget']
+                ]
+
+        output = options['output'] or f"benchmark-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(f"Results written to {output}")
+
+        if options['baseline']:
+            self.compare(results, options['baseline'])
+        if violations:
+            raise CommandError('SQL query budget exceeded:\n  ' + '\n  '.join(violations))
+
+    def run_dataset(self, scenarios, options):
+        products = Product.objects.count()
+        if not products:
+            raise CommandError('There are no products to benchmark; seed the database first.')
+        context = scenario_context(products)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{products} products ({connection.vendor})"))
+        self.stdout.write(f"  {'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+
+        client = Client()
+        rows = []
+        for name, template, budget in scenarios:
+            url = template.format(**context)
+            for _ in range(options['warmup']):
+                client.get(url)
+            # Queries are counted on a separate request, with cold caches, as the budgets
+            # hold for cache misses; debug cursors would skew timings
+            invalidate_responses()
+            invalidate_counts()
+            invalidate_facets()
+            response, query_count = count_queries(lambda: client.get(url))
+            if response.status_code != 200:
+                raise CommandError(f'{name}: GET {url} returned {response.status_code}.')
+
+            timings = []
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - request_started) * 1000)
+            total = time.perf_counter() - started
+            timings.sort()
+
+            row = {
+                'name': name,
+                'url': url,
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+                'requests_per_second': round(len(timings) / total, 1),
+                'queries': query_count,
+                'query_budget': budget,
+            }
+            rows.append(row)
+            style = self.style.ERROR if row['queries'] > budget else (lambda text: text)
+            self.stdout.write(style(
+                f"  {name:<28}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+                f"{row['requests_per_second']:>9.1f}{row['queries']:>6}/{budget}"
+            ))
+        return {'products': products, 'scenarios': rows}
+
+    def compare(self, results, baseline_path):
+        with open(baseline_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        previous = {
+            (dataset['products'], row['name']): row['p95_ms']
+            for dataset in baseline['datasets'] for row in dataset['scenarios']
+        }
+        self.stdout.write(f"p95 compared to {baseline_path} ({baseline.get('revision') or 'unknown revision'}):")
+        for dataset in results['datasets']:
+            for row in dataset['scenarios']:
+                before = previous.get((dataset['products'], row['name']))
+                if before:
+                    change = (row['p95_ms'] - before) / before * 100
+                    self.stdout.write(f"  {dataset['products']:>8} {row['name']:<28}{before:>9.2f} -> {row['p95_ms']:>9.2f} ({change:+.1f}%)")
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from catalog.management.commands.benchmark_api import SCENARIOS, git_revision, percentile, scenario_context
+from catalog.models import Product
+
+# The reads that have async views (see catalog.async_views)
+DEFAULT_SCENARIOS = 'products_list,product_detail,product_reviews,categories'
+
+# How each setup is served: the gunicorn command and its environment
+SERVERS = {
+    'wsgi': (
+        ['-m', 'gunicorn', 'backend.wsgi:application', '--bind', '{host}:{port}',
+         '--workers', '{workers}', '--log-level', 'warning'],
+        {'CATALOG_ASYNC_VIEWS': 'False'},
+    ),
+    'asgi': (
+        ['-m', 'gunicorn', 'backend.asgi:application', '--bind', '{host}:{port}',
+         '--workers', '{workers}', '--worker-class', 'uvicorn_worker.UvicornWorker', '--log-level', 'warning'],
+        # Persistent connections are not reused under ASGI
+        {'CATALOG_ASYNC_VIEWS': 'True', 'DB_CONN_MAX_AGE': '0'},
+    ),
+}
+
+
+async def _read_response(reader):
+    """Reads one HTTP/1.1 response; returns (status, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _connection(host, port, paths, offset, deadline, timings, errors):
+    """One keep-alive client connection sending requests, round robin over `paths`, until `deadline`."""
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n'.encode())
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(host, port, paths, connections, duration):
+    timings, errors = [], {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(host, port, paths, offset, deadline, timings, errors) for offset in range(connections)
+    ))
+    return timings, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares concurrent-connection throughput of the WSGI (gunicorn, sync views) '
+        'and ASGI (gunicorn with uvicorn workers, CATALOG_ASYNC_VIEWS) setups on the current data: starts '
+        'each server, drives it with keep-alive connections at every concurrency '
+        'level and reports req/s, p50/p95/p99 latency and errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servers',
+            default='wsgi,asgi',
+            help=f"Comma separated setups to benchmark ({', '.join(SERVERS)}).",
+        )
+        parser.add_argument(
+            '--connections',
+            default='1,10,50,100',
+            help='Comma separated numbers of concurrent connections.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds of load per concurrency level.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=2,
+            help='Seconds of unmeasured load before each server is measured.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Server worker processes.',
+        )
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+        )
+        parser.add_argument(
+            '--only',
+            default=DEFAULT_SCENARIOS,
+            help='Comma separated benchmark_api scenarios whose URLs are requested in turn.',
+        )
+        parser.add_argument(
+            '--with-response-cache',
+            action='store_true',
+            help='Keep the response cache on; by default every request reaches the database.',
+        )
+        parser.add_argument(
+            '--output',
+            help='JSON results file (default: benchmark-concurrency-<timestamp>.json).',
+        )
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}.")
+        try:
+            levels = [int(level) for level in options['connections'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--connections must be comma separated integers.')
+        if not levels or min(levels) < 1:
+            raise CommandError('--connections must be positive.')
+        only = {name.strip() for name in options['only'].split(',') if name.strip()}
+        unknown = only - {name for name, _, _ in SCENARIOS}
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+
+        products = Product.objects.count()
+        if not products:
+            raise CommandError('There are no products to benchmark; seed the database first.')
+        context = scenario_context(products)
+        paths = [template.format(**context) for name, template, _ in SCENARIOS if name in only]
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'revision': git_revision(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'products': products,
+            'workers': options['workers'],
+            'duration': options['duration'],
+            'response_cache': options['with_response_cache'],
+            'paths': paths,
+            'servers': [],
+        }
+        for name in servers:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({options['workers']} workers)"))
+            self.stdout.write(f"  {'connections':<14}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+            with self.server(name, options):
+                asyncio.run(_load(options['host'], options['port'], paths, max(levels), options['warmup']))
+                rows = [self.run_level(level, paths, options) for level in levels]
+            results['servers'].append({'name': name, 'levels': rows})
+
+        output = options['output'] or f"benchmark-concurrency-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(f"Results written to {output}")
+
+    def run_level(self, connections, paths, options):
+        timings, errors, elapsed = asyncio.run(
+            _load(options['host'], options['port'], paths, connections, options['duration'])
+        )
+        timings.sort()
+        row = {
+            'connections': connections,
+            'requests': len(timings),
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+            'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+            'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+            'errors': errors,
+        }
+        error_count = sum(errors.values())
+        style = self.style.ERROR if error_count else (lambda text: text)
+        latencies = ''.join(f"{row[key] or 0:>9.2f}" for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+        self.stdout.write(style(
+            f"  {connections:<14}{row['requests_per_second']:>9.1f}{latencies}{error_count:>9}"
+        ))
+        return row
+
+    def server(self, name, options):
+        arguments, server_env = SERVERS[name]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'),
+            # DEBUG would log every query and slow down the measured requests
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': ','.join({*settings.ALLOWED_HOSTS, options['host']}),
+            **server_env,
+        }
+        if not options['with_response_cache']:
+            env['CATALOG_RESPONSE_CACHE_TIMEOUT'] = '0'
+        command = [sys.executable] + [
+            argument.format(host=options['host'], port=options['port'], workers=options['workers'])
+            for argument in arguments
+        ]
+        return _Server(name, command, env, settings.BASE_DIR, options['host'], options['port'])
+
+
+class _Server:
+    """Runs a server process for the duration of a with block, once it accepts requests."""
+
+    def __init__(self, name, command, env, cwd, host, port, timeout=30):
+        self.name, self.command, self.env, self.cwd = name, command, env, cwd
+        self.host, self.port, self.timeout = host, port, timeout
+
+    def __enter__(self):
+        try:
+            self.process = subprocess.Popen(self.command, env=self.env, cwd=self.cwd)
+        except OSError as exc:
+            raise CommandError(f'Could not start the {self.name} server: {exc}')
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f'the {self.name} server exited with status {self.process.returncode}.')
+            try:
+                with socket.create_connection((self.host, self.port), timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError(f'the {self.name} server did not accept connections within {self.timeout}s.')
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+
+from catalog.management.commands.benchmark_api import percentile
+from catalog.models import Category, Product
+from catalog.reservations import InsufficientStock, reserve_stock
+
+BENCHMARK_CATEGORY_SLUG = 'benchmark-reservations'
+
+
+def naive_reserve(items):
+    """The read-modify-write the reservation engine replaces, for comparison."""
+    with transaction.atomic():
+        for product_id, quantity in sorted(items):
+            product = Product.objects.get(pk=product_id)
+            if product.stock_quantity < quantity:
+                raise InsufficientStock([product_id])
+            product.stock_quantity -= quantity
+            product.is_available = product.stock_quantity > 0
+            product.save(update_fields=['stock_quantity', 'is_available', 'updated_at'])
+
+
+STRATEGIES = {
+    'conditional': lambda items: reserve_stock(items),
+    'naive': naive_reserve,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures reservation throughput while many concurrent buyers (threads, '
+        'each with its own database connection) compete for one hot product '
+        'until it sells out, and checks that it was never oversold. Uses '
+        'temporary products, which are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--buyers',
+            type=int,
+            default=32,
+            help='Concurrent buyers.',
+        )
+        parser.add_argument(
+            '--stock',
+            type=int,
+            default=1000,
+            help='Initial stock of the hot product.',
+        )
+        parser.add_argument(
+            '--quantity',
+            type=int,
+            default=1,
+            help='Units of the hot product per order.',
+        )
+        parser.add_argument(
+            '--cart-size',
+            type=int,
+            default=1,
+            help='Products per order: the hot product plus CART_SIZE-1 others, shuffled per order.',
+        )
+        parser.add_argument(
+            '--compare-naive',
+            action='store_true',
+            help='Also run a read-modify-write implementation to compare against.',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['buyers'], options['stock'], options['quantity'], options['cart_size']) < 1:
+            raise CommandError('--buyers, --stock, --quantity and --cart-size must be positive.')
+
+        category, created = Category.objects.get_or_create(
+            slug=BENCHMARK_CATEGORY_SLUG, defaults={'title': 'Benchmark Reservations'},
+        )
+        strategies = ['conditional', 'naive'] if options['compare_naive'] else ['conditional']
+        self.stdout.write(
+            f"{options['buyers']} buyers, {options['stock']} units, {options['quantity']} per order, "
+            f"{options['cart_size']} products per order ({connection.vendor})"
+        )
+        self.stdout.write(
+            f"  {'strategy':<13}{'orders':>8}{'orders/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'errors':>8}{'stock':>7}{'oversold':>10}"
+        )
+        failures = []
+        try:
+            for strategy in strategies:
+                result = self.run(strategy, category, options)
+                # No oversell, and is_available cleared exactly when the stock ran out
+                consistent = not result['oversold'] and result['available'] == (result['final_stock'] > 0)
+                if strategy == 'conditional' and not consistent:
+                    failures.append(result)
+        finally:
+            # Deleting the products also deletes their reservations
+            for product in Product.objects.filter(category=category):
+                product.delete()
+            if created:
+                category.delete()
+        if failures:
+            raise CommandError(f'Stock invariant violated: {failures}')
+
+    def run(self, strategy, category, options):
+        reserve = STRATEGIES[strategy]
+        hot = Product.objects.create(
+            name=f'Benchmark hot product ({strategy})', description='Reservation benchmark product.',
+            price='9.99', stock_quantity=options['stock'], category=category,
+        )
+        others = [
+            Product.objects.create(
+                name=f'Benchmark product {number} ({strategy})', description='Reservation benchmark product.',
+                price='9.99', stock_quantity=options['stock'] * options['buyers'], category=category,
+            ).pk
+            for number in range(options['cart_size'] - 1)
+        ]
+
+        barrier = threading.Barrier(options['buyers'] + 1)
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def buyer(number):
+            rng = random.Random(number)
+            own_latencies, own_errors, consecutive_errors = [], 0, 0
+            try:
+                barrier.wait()
+                while consecutive_errors < 100:
+                    items = [(hot.pk, options['quantity'])] + [(pk, 1) for pk in others]
+                    rng.shuffle(items)
+                    started = time.perf_counter()
+                    try:
+                        reserve(items)
+                    except InsufficientStock:
+                        break
+                    except DatabaseError:
+                        # e.g. "database is locked" on SQLite, serialization failures
+                        own_errors += 1
+                        consecutive_errors += 1
+                        continue
+                    own_latencies.append((time.perf_counter() - started) * 1000)
+                    consecutive_errors = 0
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(own_latencies)
+                    errors[0] += own_errors
+
+        threads = [threading.Thread(target=buyer, args=(number,)) for number in range(options['buyers'])]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        hot.refresh_from_db()
+        orders = len(latencies)
+        latencies.sort()
+        result = {
+            'strategy': strategy,
+            'orders': orders,
+            'orders_per_second': round(orders / elapsed, 1) if elapsed else 0,
+            'errors': errors[0],
+            'final_stock': hot.stock_quantity,
+            'available': hot.is_available,
+            # Units sold beyond what the stock could supply (lost updates)
+            'oversold': orders * options['quantity'] - (options['stock'] - hot.stock_quantity),
+        }
+        p50, p95, p99 = (percentile(latencies, pct) if latencies else 0 for pct in (50, 95, 99))
+        self.stdout.write(
+            f"  {strategy:<13}{orders:>8}{result['orders_per_second']:>10.1f}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}"
+            f"{result['errors']:>8}{hot.stock_quantity:>7}{result['oversold']:>10}"
+        )
+        return result
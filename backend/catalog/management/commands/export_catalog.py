@@ -0,0 +1,95 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from catalog.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_rows, resolve_columns
+from catalog.filters import ProductFilter
+from catalog.models import Product
+from catalog.search import search_products
+
+
+class Command(BaseCommand):
+    help = 'Streams the product catalog to NDJSON or CSV in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='export_format',
+            choices=sorted(EXPORT_FORMATS),
+            default='ndjson',
+            help='Output format.',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write to; "-" writes to stdout.',
+        )
+        parser.add_argument(
+            '--fields',
+            default='',
+            help='Comma separated columns to export (default: the standard column set).',
+        )
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='NAME=VALUE',
+            help='A product list filter, e.g. --filter category_slug=electronics. Repeatable.',
+        )
+        parser.add_argument(
+            '--search',
+            default='',
+            help='Full-text search term, as ?search= on the list endpoint.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Rows fetched from the database per round trip.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to export from.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            columns = resolve_columns([name.strip() for name in options['fields'].split(',') if name.strip()])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        filters = {}
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Filters must look like NAME=VALUE, got "{item}".')
+            filters[name.strip()] = value.strip()
+        unknown = set(filters) - set(ProductFilter.base_filters)
+        if unknown:
+            raise CommandError(f"Unknown filters: {', '.join(sorted(unknown))}.")
+
+        filterset = ProductFilter(filters, queryset=Product.objects.using(options['database']))
+        if not filterset.is_valid():
+            raise CommandError(f'Invalid filters: {filterset.errors.as_json()}')
+        queryset = search_products(filterset.qs, options['search'])
+
+        exported = 0
+
+        def counted(rows):
+            nonlocal exported
+            for row in rows:
+                exported += 1
+                yield row
+
+        encode = EXPORT_FORMATS[options['export_format']][0]
+        chunks = encode(counted(export_rows(queryset, columns, options['chunk_size'])), columns)
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {exported} products to {options['output']}."))
@@ -0,0 +1,158 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from catalog.importer import (
+    IMPORT_CHUNK_SIZE, detect_format, load_categories, load_chunk, parse_record, read_records,
+)
+from catalog.signals import bulk_products_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports products from a CSV or NDJSON file (optionally .gz) in chunks. '
+        'Rows with a sku are upserted; each chunk commits on its own, so an '
+        'interrupted import can be resumed with --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument(
+            '--format',
+            dest='import_format',
+            choices=['csv', 'ndjson'],
+            help='Input format (default: from the file extension).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Rows written and committed per chunk.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the records already committed by a previous run (see --checkpoint).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file updated after every chunk (default: <path>.checkpoint).',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='CSV report of rejected records (default: <path>.rejects.csv).',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to import into.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        import_format = options['import_format'] or detect_format(path)
+        if import_format is None:
+            raise CommandError('Cannot tell the input format from the file name; pass --format.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        self.connection = connections[options['database']]
+        self.checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        rejects_path = options['rejects'] or f'{path}.rejects.csv'
+        skip, rejects_offset = self.read_checkpoint(path) if options['resume'] else (0, 0)
+
+        self.stats = {'created': 0, 'updated': 0, 'rejected': 0}
+        self.started = time.monotonic()
+        categories = load_categories(options['database'])
+        self.stdout.write(f"Importing {path} ({import_format}, {self.connection.vendor}, chunks of {options['chunk_size']})...")
+        if skip:
+            self.stdout.write(f"Resuming after {skip} records.")
+
+        resume_rejects = skip and os.path.exists(rejects_path)
+        with open(rejects_path, 'r+' if resume_rejects else 'w', encoding='utf-8', newline='') as rejects_file:
+            if resume_rejects:
+                # Records after the checkpoint are read again, so drop what they wrote last time
+                if rejects_offset is None:
+                    rejects_file.seek(0, os.SEEK_END)
+                else:
+                    rejects_file.seek(rejects_offset)
+                    rejects_file.truncate()
+            self.rejects_file = rejects_file
+            self.rejects = csv.writer(rejects_file)
+            if not rejects_file.tell():
+                self.rejects.writerow(['line', 'errors', 'record'])
+            try:
+                self.run(path, import_format, categories, skip, options['chunk_size'])
+            finally:
+                # bulk writes send no model signals
+                if self.stats['created'] or self.stats['updated']:
+                    bulk_products_changed(using=self.connection.alias)
+
+        # Finished: a later --resume must not skip anything
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Import complete: {self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['rejected']} rejected (see {rejects_path})."
+        ))
+
+    def run(self, path, import_format, categories, skip, chunk_size):
+        by_sku, without_sku = {}, []
+        position = 0
+        for position, (line, record) in enumerate(read_records(path, import_format), 1):
+            if position <= skip:
+                continue
+            values, errors = parse_record(record, categories)
+            if errors:
+                self.reject(line, errors, record)
+            elif values[0]:
+                # A later row for the same sku wins, as it would across chunks
+                by_sku[values[0]] = values
+            else:
+                without_sku.append(values)
+            if len(by_sku) + len(without_sku) >= chunk_size:
+                self.flush(path, position, [*by_sku.values(), *without_sku])
+                by_sku, without_sku = {}, []
+        if position > skip:
+            self.flush(path, position, [*by_sku.values(), *without_sku])
+
+    def flush(self, path, position, rows):
+        """Commits one chunk, then records how far the input has been consumed."""
+        if rows:
+            with transaction.atomic(using=self.connection.alias):
+                created, updated = load_chunk(rows, self.connection)
+            self.stats['created'] += created
+            self.stats['updated'] += updated
+        # The rejects of the consumed records are on disk before the checkpoint says so
+        self.rejects_file.flush()
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump(
+                {'path': os.path.abspath(path), 'records': position, 'rejects': self.rejects_file.tell()}, checkpoint,
+            )
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f"  {position} records read: {self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['rejected']} rejected ({position / elapsed if elapsed else 0:.0f} records/s)"
+        )
+
+    def reject(self, line, errors, record):
+        self.stats['rejected'] += 1
+        self.rejects.writerow([line, json.dumps(errors), json.dumps(record, default=str)])
+
+    def read_checkpoint(self, path):
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as checkpoint:
+                state = json.load(checkpoint)
+        except FileNotFoundError:
+            raise CommandError(f'No checkpoint at {self.checkpoint_path}; nothing to resume.')
+        if state.get('path') != os.path.abspath(path):
+            raise CommandError(f"The checkpoint belongs to {state.get('path')}, not {path}.")
+        # Checkpoints written before rejects were tracked resume them at the end
+        return state['records'], state.get('rejects')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.aggregates import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored review count, rating sum and star histogram of every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of products to recompute per query.',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding product rating aggregates...")
+        updated = rebuild_rating_aggregates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt aggregates for {updated} products."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from catalog.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-creates the full-text search triggers and re-indexes every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to rebuild the search index on.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        self.stdout.write(f"Rebuilding the product search index ({connection.vendor})...")
+        with transaction.atomic(using=connection.alias):
+            install_search_index(connection)
+            rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
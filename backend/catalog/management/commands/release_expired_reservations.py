@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from catalog.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Gives the stock of expired pending reservations back to their products. '
+        'Run it from cron, or keep it running with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and sweep every INTERVAL seconds (default: sweep once).',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=1000,
+            help='Maximum reservations expired per sweep.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to sweep.',
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] < 0 or options['limit'] < 1:
+            raise CommandError('--interval must not be negative and --limit must be positive.')
+        while True:
+            expired = release_expired_reservations(limit=options['limit'], using=options['database'])
+            if expired or not options['interval']:
+                self.stdout.write(f"Expired {expired} reservations.")
+            if not options['interval']:
+                return
+            # A full sweep means more are waiting; go again right away
+            if expired < options['limit']:
+                time.sleep(options['interval'])
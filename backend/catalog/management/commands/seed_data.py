@@ -1,38 +1,37 @@
+import os
 import random
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
-from catalog.models import Category, Product, Review
-
-# --- Product names mapped to their category (for realistic seed data) ---
-# Each product is assigned to the category that best matches its type.
-
-PRODUCTS_BY_CATEGORY = {
-    "Electronics": [
-        "Wireless Mechanical Keyboard", "1TB NVMe SSD", "Noise Cancelling Headphones",
-        "4K Curved Monitor", "Smart Home Hub", "Portable Power Bank",
-        "Digital Drawing Tablet", "Professional DSLR Camera", "Bluetooth Speaker",
-    ],
-    "Home & Kitchen": [
-        "Ergonomic Office Chair", "High-Speed Blender", "Stainless Steel Water Bottle",
-    ],
-    "Fashion": [
-        "Organic Cotton T-Shirt", "Minimalist Leather Wallet",
-    ],
-    "Outdoors": [
-        "Hiking Backpack 50L",
-    ],
-}
-
-def generate_description(name):
-    """Generates a semi-realistic product description."""
-    return f"Experience the ultimate performance with the new {name}. Featuring cutting-edge technology and a sleek, durable design, it's perfect for both professional use and everyday tasks. Get yours today!"
+from catalog.importer import copy_rows
+from catalog.models import CartItem, Category, Product, Review, StockReservation, StockReservationItem
+from catalog.seeding import (
+    DEFAULT_REVIEW_DISTRIBUTION, PRODUCTS_BY_CATEGORY, generate_chunk, parse_distribution, review_comment,
+)
+from catalog.signals import bulk_products_changed
+from catalog.suggest import products_removed
+
+PRODUCT_COLUMNS = [
+    'id', 'name', 'description', 'price', 'stock_quantity', 'category_id', 'image_url', 'is_available',
+    'review_count', 'rating_sum', *(f'rating_{star}_count' for star in range(1, 6)), 'created_at', 'updated_at',
+]
+REVIEW_COLUMNS = ['product_id', 'name', 'rating', 'comment', 'created_at']
 
 # --- Command Implementation ---
 
 class Command(BaseCommand):
-    help = 'Seeds the database with initial categories, products, and reviews.'
+    help = (
+        'Seeds the database with categories, products, and reviews. Rows are '
+        'generated in parallel worker processes and written batch by batch '
+        '(COPY on PostgreSQL), so millions of products are practical.'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -41,95 +40,176 @@ class Command(BaseCommand):
             default=50,
             help='Number of products to create in total.',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Products generated and committed per batch.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed; the same seed always produces the same catalog, whatever the batch size.',
+        )
+        parser.add_argument(
+            '--reviews-per-product',
+            default=DEFAULT_REVIEW_DISTRIBUTION,
+            help=(
+                'Review count distribution: uniform:MIN-MAX, fixed:N, poisson:MEAN or '
+                'longtail:ALPHA:MAX (a few hot products with up to MAX reviews).'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Processes generating rows; 1 generates in the main process.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use bulk_create instead of COPY on PostgreSQL.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to seed.',
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
-        self.stdout.write("--- Starting Database Seeding ---")
-
         total_items = options['items']
+        batch_size = options['batch_size']
+        if total_items < 0 or batch_size < 1 or options['workers'] < 1:
+            raise CommandError('--items must not be negative; --batch-size and --workers must be positive.')
+        try:
+            parse_distribution(options['reviews_per_product'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        seed = options['seed']
+        if seed is None:
+            seed = random.SystemRandom().randrange(2 ** 32)
+        self.connection = connections[options['database']]
+        self.use_copy = self.connection.vendor == 'postgresql' and not options['no_copy']
+        self.stdout.write(f"--- Starting Database Seeding (seed {seed}) ---")
 
         # 1. Clear Existing Data (Optional but useful for development)
         self.stdout.write("Cleaning up existing data...")
-        Review.objects.all().delete()
-        Product.objects.all().delete()
-        Category.objects.all().delete()
-        
+        self.clear_catalog()
+
         # 2. Create Categories
         self.stdout.write("Creating categories...")
-        category_objects = []
-        for title in PRODUCTS_BY_CATEGORY.keys():
-            category_objects.append(
-                Category(title=title, slug=slugify(title))
+        with transaction.atomic(using=self.connection.alias):
+            Category.objects.using(self.connection.alias).bulk_create(
+                [Category(title=title, slug=slugify(title)) for title in PRODUCTS_BY_CATEGORY]
             )
-        
-        Category.objects.bulk_create(category_objects)
-        categories = {cat.title: cat for cat in Category.objects.all()}
-
-        self.stdout.write(self.style.SUCCESS(f"Created {len(categories)} categories."))
-
-        # Build flat list of (product_name, category) for sampling
-        product_category_pairs = [
-            (name, categories[cat_title])
-            for cat_title, names in PRODUCTS_BY_CATEGORY.items()
-            for name in names
+        slugs = dict(Category.objects.using(self.connection.alias).values_list('slug', 'pk'))
+        self.category_ids = [slugs[slugify(title)] for title in PRODUCTS_BY_CATEGORY]
+        self.stdout.write(self.style.SUCCESS(f"Created {len(self.category_ids)} categories."))
+
+        # 3. Create Products and Reviews, one committed batch at a time
+        self.stdout.write(
+            f"Creating {total_items} products in batches of {batch_size} "
+            f"({options['workers']} workers, {'COPY' if self.use_copy else 'bulk_create'})..."
+        )
+        tasks = [
+            (seed, start + 1, min(batch_size, total_items - start), options['reviews_per_product'])
+            for start in range(0, total_items, batch_size)
         ]
-
-        # 3. Create Products (each product assigned to its matching category)
-        self.stdout.write(f"Creating {total_items} products...")
-        product_objects = []
-        for i in range(total_items):
-            base_name, category = random.choice(product_category_pairs)
-            name = base_name + f" #{i + 1}"
-            price = round(random.uniform(9.99, 999.99), 2)
-            stock = random.randint(0, 500)
-            
-            # Simple placeholder image URL
-            image_url = f"https://placehold.co/400x300/{random.choice(['000', '333', '666'])}/white?text={name.replace(' ', '+')}"
-
-            product_objects.append(
-                Product(
-                    name=name,
-                    description=generate_description(name),
-                    price=price,
-                    stock_quantity=stock,
-                    category=category,
-                    image_url=image_url,
-                    is_available=stock > 0
+        started = time.monotonic()
+        created_products = created_reviews = 0
+        try:
+            for products, reviews in self.generate(tasks, options['workers']):
+                with transaction.atomic(using=self.connection.alias):
+                    product_ids = self.write_products(products)
+                    self.write_reviews(product_ids, reviews)
+                created_products += len(products)
+                created_reviews += len(reviews)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  {created_products} products, {created_reviews} reviews "
+                    f"({created_products / elapsed if elapsed else 0:.0f} products/s)"
                 )
-            )
-
-        Product.objects.bulk_create(product_objects)
-        products = list(Product.objects.all())
-        self.stdout.write(self.style.SUCCESS(f"Created {len(products)} products."))
+        finally:
+            # bulk writes send no model signals
+            bulk_products_changed(using=self.connection.alias)
+            products_removed()
 
+        self.stdout.write(self.style.SUCCESS(f"Created {created_products} products and {created_reviews} reviews."))
+        self.stdout.write("--- Database Seeding Complete! ---")
 
-        # 4. Create Reviews
-        self.stdout.write("Creating reviews...")
-        review_objects = []
+    def clear_catalog(self):
+        tables = [
+            StockReservationItem._meta.db_table, StockReservation._meta.db_table, CartItem._meta.db_table,
+            Review._meta.db_table, Product._meta.db_table, Category._meta.db_table,
+        ]
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            if self.connection.vendor == 'postgresql':
+                cursor.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+            else:
+                # Raw deletes: the ORM would load every row to send delete signals
+                for table in tables:
+                    cursor.execute(f"DELETE FROM {table}")
+
+    def generate(self, tasks, workers):
+        """
+        Yields generated chunks in task order. At most two chunks per worker
+        are in flight, so memory stays bounded when writing is the bottleneck.
+        """
+        if workers == 1 or len(tasks) <= 1:
+            yield from map(generate_chunk, tasks)
+            return
+        pending_tasks = iter(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque(pool.submit(generate_chunk, task) for task in islice(pending_tasks, workers * 2))
+            while pending:
+                result = pending.popleft().result()
+                task = next(pending_tasks, None)
+                if task is not None:
+                    pending.append(pool.submit(generate_chunk, task))
+                yield result
+
+    def write_products(self, products):
+        """Inserts one batch of products and returns their ids, in order."""
         for product in products:
-            num_reviews = random.randint(0, 5)
-            for j in range(num_reviews):
-                rating = random.randint(1, 5)
-                name = f"User{j + 1}_{product.id}"
-                comment = ""
-                
-                if rating >= 4:
-                    comment = "Excellent product, highly recommend!"
-                elif rating == 3:
-                    comment = "It's decent, met expectations."
-                else:
-                    comment = "Needs improvement, especially in features."
-
-                review_objects.append(
-                    Review(
-                        product=product,
-                        name=name,
-                        rating=rating,
-                        comment=comment,
-                    )
-                )
-
-        Review.objects.bulk_create(review_objects)
-        self.stdout.write(self.style.SUCCESS(f"Created {len(review_objects)} reviews."))
-
-        self.stdout.write("--- Database Seeding Complete! ---")
+            product['category_id'] = self.category_ids[product.pop('category_index')]
+
+        if not self.use_copy:
+            objects = [Product(**product) for product in products]
+            # Ids come back from the INSERT (RETURNING), so the table is never re-read
+            Product.objects.using(self.connection.alias).bulk_create(objects)
+            return [obj.pk for obj in objects]
+
+        now = timezone.now()
+        table = Product._meta.db_table
+        with self.connection.cursor() as cursor:
+            # Reserve the ids up front so reviews can reference them without a round trip
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(products)],
+            )
+            product_ids = [row[0] for row in cursor.fetchall()]
+            rows = []
+            for product_id, product in zip(product_ids, products):
+                product.update(id=product_id, created_at=now, updated_at=now)
+                rows.append([product[column] for column in PRODUCT_COLUMNS])
+            copy_rows(cursor, table, PRODUCT_COLUMNS, rows)
+        return product_ids
+
+    def write_reviews(self, product_ids, reviews):
+        def review_values(offset, number, rating):
+            product_id = product_ids[offset]
+            return product_id, f"User{number}_{product_id}", rating, review_comment(rating)
+
+        if not self.use_copy:
+            Review.objects.using(self.connection.alias).bulk_create([
+                Review(product_id=product_id, name=name, rating=rating, comment=comment)
+                for product_id, name, rating, comment in (review_values(*review) for review in reviews)
+            ])
+            return
+
+        now = timezone.now()
+        with self.connection.cursor() as cursor:
+            copy_rows(cursor, Review._meta.db_table, REVIEW_COLUMNS, [
+                (*review_values(*review), now) for review in reviews
+            ])
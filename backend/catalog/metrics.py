@@ -0,0 +1,272 @@
+"""
+Per-request timing instrumentation and a Prometheus metrics endpoint.
+
+RequestMetricsMiddleware splits every request into:
+
+- db: time spent executing SQL, and the number of queries (measured with
+  an execute wrapper on every connection, so no debug cursor is involved),
+  also counted per database alias (primary and read replicas);
+- serialize: time until the view returned, outside the database, which
+  for DRF read views is dominated by the serializers;
+- render: turning the response into bytes (DRF renderers);
+- total.
+
+The numbers are added to in-process histograms, labelled by URL name and
+HTTP method, and optionally sent back in a Server-Timing header
+(SERVER_TIMING_ENABLED). metrics_view serves the histograms in the
+Prometheus text format. Each worker process keeps its own histograms, so
+Prometheus should scrape every worker (or run a single worker per target).
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (help text, buckets)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Total time to handle a request.', DURATION_BUCKETS),
+    'http_request_db_seconds': ('Time spent executing SQL queries per request.', DURATION_BUCKETS),
+    'http_request_db_queries': ('SQL queries executed per request.', QUERY_BUCKETS),
+    'http_request_serialize_seconds': ('Time in the view outside the database (mostly serialization).', DURATION_BUCKETS),
+    'http_request_render_seconds': ('Time spent rendering the response body.', DURATION_BUCKETS),
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def histogram_lines(name, labels, counts, total, count, buckets):
+    """Exposition lines of one histogram series; `labels` is the preformatted label list."""
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {_format_number(total)}')
+    lines.append(f'{name}_count{{{labels}}} {count}')
+    return lines
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process store of request histograms and counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (metric name, labels) -> Histogram
+        self.requests = {}    # labels + status -> count
+        self.databases = {}   # labels + database alias -> [queries, seconds]
+        self.collectors = []  # callables returning extra exposition lines (see add_collector)
+
+    def add_collector(self, collector):
+        """Registers a callable returning more metric lines, e.g. connection pool stats."""
+        self.collectors.append(collector)
+
+    def observe(self, labels, samples, status, databases=None):
+        with self.lock:
+            for name, value in samples.items():
+                key = (name, labels)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(HISTOGRAMS[name][1])
+                histogram.observe(value)
+            key = (*labels, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for alias, (queries, seconds) in (databases or {}).items():
+                totals = self.databases.setdefault((*labels, alias), [0, 0.0])
+                totals[0] += queries
+                totals[1] += seconds
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        with self.lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self.histograms.items()}
+            requests = dict(self.requests)
+            databases = {key: tuple(totals) for key, totals in self.databases.items()}
+
+        lines = [
+            '# HELP http_requests_total Requests handled, by view, method and status code.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(requests.items()):
+            lines.append(
+                f'http_requests_total{{view="{_label_value(view)}",method="{method}",status="{status}"}} {count}'
+            )
+        for index, (name, help_text) in enumerate((
+            ('db_queries_total', 'SQL queries executed, by view, method and database alias.'),
+            ('db_query_seconds_total', 'Time spent executing SQL, by view, method and database alias.'),
+        )):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method, alias), totals in sorted(databases.items()):
+                lines.append(
+                    f'{name}{{view="{_label_value(view)}",method="{method}",database="{_label_value(alias)}"}} '
+                    f'{_format_number(totals[index])}'
+                )
+        for name, (help_text, _) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (metric, (view, method)), (counts, total, count, buckets) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                labels = f'view="{_label_value(view)}",method="{method}"'
+                lines += histogram_lines(name, labels, counts, total, count, buckets)
+        for collector in self.collectors:
+            lines += collector()
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class _RequestTimings:
+    __slots__ = ('db_time', 'queries', 'databases', 'view_finished')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.databases = {}  # alias -> [queries, seconds]
+        self.view_finished = None
+
+
+# Timings of the request being handled. Context variables follow a request
+# into the threads running its sync code and async ORM queries.
+_current = ContextVar('catalog_request_timings', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        timings.db_time += elapsed
+        timings.queries += 1
+        database = timings.databases.setdefault(context['connection'].alias, [0, 0.0])
+        database[0] += 1
+        database[1] += elapsed
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Installed once per connection: per request wrappers would only reach
+    # the connections of the thread that installed them
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, DB, serialization and render time for every request.
+    Place it near the top of MIDDLEWARE so the totals cover the whole stack.
+    Works under WSGI and ASGI without forcing async requests into a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = _RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = _RequestTimings()
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, timings, started)
+
+    def record(self, request, response, timings, started):
+        finished = perf_counter()
+        # Without a template response (e.g. cached or async views) nothing is rendered after the view
+        view_finished = timings.view_finished or finished
+        samples = {
+            'http_request_duration_seconds': finished - started,
+            'http_request_db_seconds': timings.db_time,
+            'http_request_db_queries': timings.queries,
+            'http_request_serialize_seconds': max(0.0, view_finished - started - timings.db_time),
+            'http_request_render_seconds': finished - view_finished,
+        }
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.route) if match else 'unresolved'
+        registry.observe((view, request.method), samples, response.status_code, timings.databases)
+
+        if getattr(settings, 'SERVER_TIMING_ENABLED', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries"',
+                f"serialize;dur={samples['http_request_serialize_seconds'] * 1000:.2f}",
+                f"render;dur={samples['http_request_render_seconds'] * 1000:.2f}",
+                f"total;dur={samples['http_request_duration_seconds'] * 1000:.2f}",
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # Called once the view has returned and before the response is rendered
+        timings = _current.get()
+        if timings is not None:
+            timings.view_finished = perf_counter()
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requests must send METRICS_TOKEN as a bearer
+    token; without a token it is only served in DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        return HttpResponse('Forbidden: set METRICS_TOKEN', status=403, content_type='text/plain')
+    if token:
+        provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not constant_time_compare(provided, token):
+            return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='catalog_pro_price_2d2a4c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='catalog_pro_created_92b554_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='catalog_pro_name_192a7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='catalog_pro_price_01671e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock_quantity', 'id'], name='catalog_pro_stock_q_92baca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='catalog_pro_created_da1d60_idx'),
+        ),
+    ]
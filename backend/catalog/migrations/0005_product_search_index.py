@@ -0,0 +1,129 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The search index as of this migration, frozen here: catalog.search may change later
+
+POSTGRES_INSTALL_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT title FROM catalog_category WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product",
+    """
+    CREATE TRIGGER catalog_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION catalog_category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        -- Touching name re-runs the product trigger with the new category title
+        UPDATE catalog_product SET name = name WHERE category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS catalog_category_search_vector_trigger ON catalog_category",
+    """
+    CREATE TRIGGER catalog_category_search_vector_trigger
+    AFTER UPDATE OF title ON catalog_category
+    FOR EACH ROW WHEN (OLD.title IS DISTINCT FROM NEW.title)
+    EXECUTE FUNCTION catalog_category_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS catalog_product_search_gin ON catalog_product USING gin (search_vector)",
+    # Fires the BEFORE UPDATE trigger for every existing row
+    "UPDATE catalog_product SET name = name",
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS catalog_product_search_gin",
+    "DROP TRIGGER IF EXISTS catalog_category_search_vector_trigger ON catalog_category",
+    "DROP FUNCTION IF EXISTS catalog_category_search_vector_update()",
+    "DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product",
+    "DROP FUNCTION IF EXISTS catalog_product_search_vector_update()",
+]
+
+SQLITE_INSTALL_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS catalog_product_fts
+    USING fts5(name, category_title, description, tokenize = 'porter unicode61')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_insert AFTER INSERT ON catalog_product BEGIN
+        INSERT INTO catalog_product_fts(rowid, name, category_title, description)
+        VALUES (new.id, new.name, (SELECT title FROM catalog_category WHERE id = new.category_id), new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_update
+    AFTER UPDATE OF name, description, category_id ON catalog_product BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id;
+        INSERT INTO catalog_product_fts(rowid, name, category_title, description)
+        VALUES (new.id, new.name, (SELECT title FROM catalog_category WHERE id = new.category_id), new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_delete AFTER DELETE ON catalog_product BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_category_fts_update AFTER UPDATE OF title ON catalog_category BEGIN
+        UPDATE catalog_product_fts SET category_title = new.title
+        WHERE rowid IN (SELECT id FROM catalog_product WHERE category_id = new.id);
+    END
+    """,
+    # Indexes the existing rows
+    "DELETE FROM catalog_product_fts",
+    """
+    INSERT INTO catalog_product_fts(rowid, name, category_title, description)
+    SELECT p.id, p.name, c.title, p.description
+    FROM catalog_product p JOIN catalog_category c ON c.id = p.category_id
+    """,
+]
+
+SQLITE_UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS catalog_category_fts_update",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_delete",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_update",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_insert",
+    "DROP TABLE IF EXISTS catalog_product_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+create_search_index = _run({'postgresql': POSTGRES_INSTALL_SQL, 'sqlite': SQLITE_INSTALL_SQL})
+drop_search_index = _run({'postgresql': POSTGRES_UNINSTALL_SQL, 'sqlite': SQLITE_UNINSTALL_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Triggers, GIN index (PostgreSQL) or FTS5 table (SQLite); see catalog.search
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:27
+
+from django.db import migrations, models
+
+# SQLite rebuilds catalog_product to alter it and cannot rename the rebuilt
+# table while this trigger (from 0005) refers to it, so it is dropped around
+# the change. Frozen here: catalog.search may change later.
+SQLITE_CATEGORY_TRIGGER_SQL = """
+    CREATE TRIGGER IF NOT EXISTS catalog_category_fts_update AFTER UPDATE OF title ON catalog_category BEGIN
+        UPDATE catalog_product_fts SET category_title = new.title
+        WHERE rowid IN (SELECT id FROM catalog_product WHERE category_id = new.id);
+    END
+"""
+
+
+def release_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TRIGGER IF EXISTS catalog_category_fts_update")
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CATEGORY_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_review_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_search_triggers, restore_search_triggers),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='External stock keeping unit used by supplier feeds.', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(restore_search_triggers, release_search_triggers),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def configure_search_rank(apps, schema_editor):
+    # The hidden rank column of the FTS5 table then returns bm25 with the
+    # (name, category_title, description) weights; frozen here, as catalog.search may change
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "INSERT INTO catalog_product_fts(catalog_product_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='catalog.product')),
+                ('name', models.TextField()),
+                ('category_title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', models.TextField(db_column='catalog_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'catalog_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(configure_search_rank, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_stock_reservation_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockreservationitem',
+            name='sold_out',
+            field=models.BooleanField(default=False, help_text="Whether reserving it took the product's last unit, making the product unavailable."),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -26,6 +30,13 @@ class Product(models.Model):
     Model representing a single product in the catalog.
     """
     name = models.CharField(max_length=255, help_text="The full name of the product.")
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="External stock keeping unit used by supplier feeds."
+    )
     description = models.TextField(help_text="Detailed description of the product.")
     
     # Financial fields
@@ -60,13 +71,28 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized review aggregates (maintained by catalog.signals)
+    review_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of reviews for the product.")
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, help_text="Sum of all review ratings.")
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 1-star reviews.")
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 2-star reviews.")
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 3-star reviews.")
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 4-star reviews.")
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of 5-star reviews.")
+
+    # Weighted full-text document, filled by a database trigger on PostgreSQL (see catalog.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['name']
         indexes = [
             models.Index(fields=['is_available']),
-            models.Index(fields=['price']),
-            models.Index(fields=['created_at']),
             models.Index(fields=['category', 'price']),
+            # Keyset pagination seeks on (ordering field, id) for every ordering option
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['stock_quantity', 'id']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
@@ -74,15 +100,15 @@ class Product(models.Model):
     
     @property
     def average_rating(self):
-        """Calculates the average rating from all associated reviews."""
-        if not hasattr(self, '_average_rating'):
-            # This is optimized to work with prefetch_related for reviews in views
-            reviews = self.reviews.all()
-            if reviews:
-                self._average_rating = sum(r.rating for r in reviews) / len(reviews)
-            else:
-                self._average_rating = 0
-        return self._average_rating
+        """Calculates the average rating from the stored review aggregates."""
+        if not self.review_count:
+            return 0
+        return self.rating_sum / self.review_count
+
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating, keyed 1 to 5."""
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
 
 
 class Review(models.Model):
@@ -105,9 +131,146 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginated review listing: newest first, optionally filtered or ordered by rating
+            models.Index(fields=['product', '-created_at', '-id']),
+            models.Index(fields=['product', 'rating', 'created_at', 'id']),
+        ]
         # Ensures a user (identified by name) can only leave one review per product
         # NOTE: In a real app, this would be based on an authenticated user ID.
         unique_together = ('product', 'name',) 
 
     def __str__(self):
         return f'Review by {self.name} for {self.product.name}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so edits can adjust the product aggregates
+        instance._persisted = (instance.__dict__.get('product_id'), instance.__dict__.get('rating'))
+        return instance
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for an order until it is confirmed at checkout, released, or
+    expires. Product stock is decremented when the reservation is made (see
+    catalog.reservations), so confirming it only changes the status.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        CONFIRMED = 'confirmed', 'Confirmed'
+        RELEASED = 'released', 'Released'
+        EXPIRED = 'expired', 'Expired'
+
+    # Random ids: the id is the client's handle on its reservation
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Only the owner (or staff) may see, confirm or release it
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations',
+    )
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    expires_at = models.DateTimeField(help_text="Pending reservations past this time give their stock back.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Expiry sweep: pending reservations ordered by expiry
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f'Reservation {self.pk} ({self.status})'
+
+
+class StockReservationItem(models.Model):
+    """
+    Quantity of one product held by a reservation.
+    """
+    reservation = models.ForeignKey(StockReservation, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservation_items')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    sold_out = models.BooleanField(
+        default=False,
+        help_text="Whether reserving it took the product's last unit, making the product unavailable.",
+    )
+
+    class Meta:
+        unique_together = ('reservation', 'product')
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id}'
+
+
+class Cart(models.Model):
+    """
+    Server-side shopping cart, owned by a user or, for anonymous visitors,
+    by their session. Anonymous carts are merged into the user's cart once
+    the visitor signs in (see catalog.carts).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='cart',
+    )
+    session_key = models.CharField(max_length=40, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Cart {self.pk}'
+
+
+class CartItem(models.Model):
+    """
+    Quantity of one product in a cart, with the price it was added at so
+    price changes can be reported before checkout.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    added_price = models.DecimalField(max_digits=10, decimal_places=2)
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['added_at', 'id']
+        unique_together = ('cart', 'product')
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id}'
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Read-only mapping of the SQLite FTS5 table behind product search (see
+    catalog.search), so a search can join, filter and rank in one query.
+    The table only exists on SQLite and is maintained by triggers.
+    """
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_document',
+    )
+    name = models.TextField()
+    category_title = models.TextField()
+    description = models.TextField()
+    # FTS5 hidden columns: the MATCH target named after the table, and the
+    # rank of the current match (bm25 with the configured column weights)
+    document = models.TextField(db_column='catalog_product_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'catalog_product_fts'
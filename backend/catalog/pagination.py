@@ -0,0 +1,377 @@
+"""
+Pagination classes for the catalog API.
+
+KeysetPagination pages through results with opaque cursors built from the
+ordering values of the last row ("seek" pagination). Every page is an index
+range scan, so deep pages cost the same as the first one and no COUNT(*) runs.
+CatalogPagination keeps the configured limit/offset style as the default and
+switches to keyset pagination when the client opts in.
+CachedCountLimitOffsetPagination is the project-wide limit/offset style; it
+caches result counts and uses planner estimates for very large results.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import aget_version, bump_version, filter_signature, get_cache, get_version, variant_key
+from .routers import cache_variant
+
+COUNT_CACHE_NAMESPACE = 'counts'
+
+
+def estimate_count(queryset):
+    """
+    Returns the PostgreSQL planner's row estimate for a queryset, or None on
+    other databases. Unfiltered querysets read the table statistics directly.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 for tables that were never analyzed
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def invalidate_counts():
+    """Drops every cached result count (called when catalog rows change)."""
+    bump_version(COUNT_CACHE_NAMESPACE)
+
+
+class CachedCountLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that avoids a COUNT(*) on most requests.
+    Counts are cached per normalized filter signature until the catalog
+    changes (see catalog.routers.cache_variant for replicas). On PostgreSQL, results the planner expects to be larger than
+    CATALOG_COUNT_ESTIMATE_THRESHOLD use its estimate instead of counting,
+    and the response sets count_is_approximate.
+    """
+    count_is_approximate = False
+
+    def _count_key(self, queryset, version, variant):
+        return 'catalog:count:{}:{}:{}'.format(
+            variant_key(version, variant), queryset.model._meta.label_lower, filter_signature(self.request),
+        )
+
+    def get_count(self, queryset):
+        if not hasattr(queryset, 'query'):
+            return super().get_count(queryset)
+
+        cache = get_cache()
+        variant = cache_variant()
+        key = self._count_key(queryset, get_version(COUNT_CACHE_NAMESPACE), variant)
+        cached = cache.get(key) if variant is not None else None
+        if cached is not None:
+            count, self.count_is_approximate = cached
+            return count
+
+        threshold = getattr(settings, 'CATALOG_COUNT_ESTIMATE_THRESHOLD', 10000)
+        estimate = estimate_count(queryset) if threshold else None
+        if estimate is not None and estimate >= threshold:
+            count, self.count_is_approximate = estimate, True
+        else:
+            count = super().get_count(queryset.order_by())
+        if variant is not None:
+            cache.set(key, (count, self.count_is_approximate), getattr(settings, 'CATALOG_COUNT_CACHE_TIMEOUT', 300))
+        return count
+
+    async def aget_count(self, queryset):
+        """get_count() for async views, counting with the async ORM."""
+        cache = get_cache()
+        variant = cache_variant()
+        key = self._count_key(queryset, await aget_version(COUNT_CACHE_NAMESPACE), variant)
+        cached = await cache.aget(key) if variant is not None else None
+        if cached is not None:
+            count, self.count_is_approximate = cached
+            return count
+
+        threshold = getattr(settings, 'CATALOG_COUNT_ESTIMATE_THRESHOLD', 10000)
+        estimate = None
+        if threshold and connections[queryset.db].vendor == 'postgresql':
+            estimate = await sync_to_async(estimate_count)(queryset)
+        if estimate is not None and estimate >= threshold:
+            count, self.count_is_approximate = estimate, True
+        else:
+            count = await queryset.order_by().acount()
+        if variant is not None:
+            await cache.aset(key, (count, self.count_is_approximate), getattr(settings, 'CATALOG_COUNT_CACHE_TIMEOUT', 300))
+        return count
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await self.aget_count(queryset)
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [obj async for obj in queryset[self.offset:self.offset + self.limit]]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_approximate': self.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {'type': 'boolean', 'example': False}
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that works with any ordering applied by OrderingFilter.
+    The primary key is appended as a tiebreaker so the ordering is total.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self._page_queryset(queryset, request)
+        return self._finish_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views."""
+        queryset, cursor = self._page_queryset(queryset, request)
+        return self._finish_page([obj async for obj in queryset], cursor)
+
+    def _page_queryset(self, queryset, request):
+        """Returns the queryset of the requested page (plus one row) and the decoded cursor."""
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['r'])
+
+        ordering = [(name, not desc) if self.reverse else (name, desc) for name, desc in self.ordering]
+        queryset = queryset.order_by(*[f'-{name}' if desc else name for name, desc in ordering])
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(ordering, cursor['v']))
+        # Fetch one extra row to learn whether another page exists
+        return queryset[:self.page_size + 1], cursor
+
+    def _finish_page(self, results, cursor):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+        self.first_values = self._values_for(results[0]) if results else None
+        self.last_values = self._values_for(results[-1]) if results else None
+        if not results and cursor:
+            # Empty page past either end: link back towards the cursor position
+            self.first_values = self.last_values = cursor['v']
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """
+        Returns [(field_name, descending), ...] from the queryset ordering,
+        always ending with the primary key.
+        """
+        opts = queryset.model._meta
+        ordering = []
+        for item in queryset.query.order_by or opts.ordering:
+            if not isinstance(item, str):
+                # Expression orderings (e.g. F('x').desc()) expose their target by name
+                name = getattr(getattr(item, 'expression', None), 'name', None)
+                if name is None:
+                    raise NotFound('Ordering is not supported by cursor pagination.')
+                item = f'-{name}' if item.descending else name
+            desc = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = opts.pk.name
+            ordering.append((name, desc))
+            if name == opts.pk.name:
+                return ordering
+        ordering.append((opts.pk.name, ordering[-1][1] if ordering else False))
+        return ordering
+
+    def _seek_filter(self, ordering, values):
+        """
+        Builds the lexicographic "row comes after the cursor" predicate:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        if len(values) != len(ordering):
+            raise ParseError(self.invalid_cursor_message)
+        clauses = []
+        for index, (name, desc) in enumerate(ordering):
+            equal = {ordering[i][0]: values[i] for i in range(index)}
+            lookup = 'lt' if desc else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': values[index]}))
+        return reduce(or_, clauses)
+
+    def _values_for(self, instance):
+        if isinstance(instance, dict):
+            # values() rows (see ProductListValuesSerializer)
+            return [instance[name] for name, _ in self.ordering]
+        return [getattr(instance, name) for name, _ in self.ordering]
+
+    # --- Cursor encoding ---
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': [self._dump_value(v) for v in values], 'r': int(reverse)}
+        token = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode('ascii')))
+            values = [
+                self._load_value(name, value)
+                for (name, _), value in zip(self.ordering, payload['v'], strict=True)
+            ]
+            return {'v': values, 'r': bool(payload['r'])}
+        except (TypeError, ValueError, KeyError, ValidationError):
+            # Tampered or stale cursors are the client's error (400)
+            raise ParseError(self.invalid_cursor_message)
+
+    def _dump_value(self, value):
+        if isinstance(value, (int, float, str, bool)) or value is None:
+            return value
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return force_str(value)
+
+    def _load_value(self, name, value):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. relevance scores) are stored as plain JSON numbers
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValidationError('Invalid cursor value.')
+            return value
+        value = field.to_python(value)
+        if value is None:
+            # Ordering fields are not nullable, and seeking past NULL is not a filter
+            raise ValidationError('Invalid cursor value.')
+        return value
+
+    # --- Response ---
+
+    def get_next_link(self):
+        if not self.has_next or self.last_values is None:
+            return None
+        return self.encode_cursor(self.last_values, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_values is None:
+            return None
+        return self.encode_cursor(self.first_values, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CatalogPagination(BasePagination):
+    """
+    Uses the project's DEFAULT_PAGINATION_CLASS (limit/offset) unless the
+    client opts into keyset pagination with ?pagination=cursor. Next and
+    previous links carry a ?cursor= value, which also selects keyset mode.
+    """
+    keyset_class = KeysetPagination
+    mode_query_param = 'pagination'
+
+    def get_delegate(self, request):
+        if request.query_params.get(self.mode_query_param) == 'cursor' or \
+                self.keyset_class.cursor_query_param in request.query_params:
+            return self.keyset_class()
+        return api_settings.DEFAULT_PAGINATION_CLASS()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.delegate = self.get_delegate(request)
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views."""
+        self.delegate = self.get_delegate(request)
+        return await self.delegate.apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return api_settings.DEFAULT_PAGINATION_CLASS().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return api_settings.DEFAULT_PAGINATION_CLASS().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination without a total count.',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': KeysetPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor returned in the next/previous links.',
+                'schema': {'type': 'string'},
+            },
+        ]
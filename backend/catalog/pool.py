@@ -0,0 +1,203 @@
+"""
+Per-process database connection pools (used by catalog.backends.postgresql).
+
+Django closes its connection at the end of every request when CONN_MAX_AGE
+is 0, and always under ASGI. With DB_POOL on, "closing" hands the open
+connection back to a pool owned by the worker process instead, and the
+next connection is taken from it, so requests skip the TCP and
+authentication handshake. Pools are lazily created per database alias and
+process (never shared across fork), and are thread-safe for threaded and
+ASGI workers.
+
+- At most max_size connections are open. When all are in use, a request
+  waits up to `timeout` seconds for one to be returned, then fails.
+- Idle connections beyond min_size are closed after max_idle seconds.
+- With `check`, a connection is health-checked before it is handed out and
+  discarded (and replaced) if the check fails.
+
+Wait times, saturation and connection churn are exported on /metrics.
+"""
+import os
+import threading
+from collections import deque
+from time import monotonic, perf_counter
+
+from .metrics import DURATION_BUCKETS, Histogram, histogram_lines, registry
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+
+    def __init__(self, alias, min_size=1, max_size=10, timeout=10.0, max_idle=300.0, check=None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.')
+        self.alias = alias
+        self.min_size, self.max_size = min_size, max_size
+        self.timeout, self.max_idle = timeout, max_idle
+        self.check = check
+        self.condition = threading.Condition()
+        self.idle = deque()  # (connection, returned at); the right end is the most recently used
+        self.size = 0        # open connections, idle or in use
+        self.waiting = 0
+        # Counters for /metrics
+        self.wait_histogram = Histogram(DURATION_BUCKETS)
+        self.stats = dict.fromkeys(('checkouts', 'created', 'closed', 'failed_checks', 'timeouts'), 0)
+
+    @property
+    def in_use(self):
+        return self.size - len(self.idle)
+
+    def getconn(self, connect):
+        """
+        Returns an idle connection or opens one with connect(); waits for a
+        returned connection when max_size are in use. Raises PoolTimeout.
+        """
+        started = perf_counter()
+        deadline = monotonic() + self.timeout
+        while True:
+            connection = None
+            with self.condition:
+                self._close_expired()
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No connection to "{self.alias}" available within {self.timeout}s '
+                            f'({self.max_size} in use).'
+                        )
+                    self.waiting += 1
+                    try:
+                        self.condition.wait(remaining)
+                    finally:
+                        self.waiting -= 1
+                if self.idle:
+                    # Most recently used first: it is the least likely to have timed out
+                    connection = self.idle.pop()[0]
+                else:
+                    self.size += 1
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self._discard(None)
+                    raise
+                self._count('created')
+            elif self.check is not None and not self.check(connection):
+                self._count('failed_checks')
+                self._discard(connection)
+                continue
+
+            with self.condition:
+                self.stats['checkouts'] += 1
+                self.wait_histogram.observe(perf_counter() - started)
+            return connection
+
+    def putconn(self, connection, reusable=True):
+        """Hands a connection back, or closes it when it is not `reusable`."""
+        if not reusable:
+            self._discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, monotonic()))
+            self.condition.notify()
+
+    def _discard(self, connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self.condition:
+            self.size -= 1
+            if connection is not None:
+                self.stats['closed'] += 1
+            self.condition.notify()
+
+    def _count(self, name):
+        with self.condition:
+            self.stats[name] += 1
+
+    def _close_expired(self):
+        """Closes connections idle for over max_idle, keeping min_size open. Called with the lock held."""
+        cutoff = monotonic() - self.max_idle
+        # The least recently used connections are on the left
+        while self.idle and self.size > self.min_size and self.idle[0][1] < cutoff:
+            connection = self.idle.popleft()[0]
+            self.size -= 1
+            self.stats['closed'] += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'max_size': self.max_size,
+                'wait': (list(self.wait_histogram.counts), self.wait_histogram.sum, self.wait_histogram.count),
+                **self.stats,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    """The pool of `alias` in this process, created with `options` on first use."""
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                # Pools inherited through fork belong to the parent process
+                for stale in [k for k in _pools if k[1] != key[1]]:
+                    del _pools[stale]
+                pool = _pools[key] = ConnectionPool(alias, **options)
+    return pool
+
+
+GAUGES = (
+    ('db_pool_connections', 'size', 'Open pooled connections, idle or in use.'),
+    ('db_pool_connections_idle', 'idle', 'Pooled connections waiting to be used.'),
+    ('db_pool_connections_in_use', 'in_use', 'Pooled connections handed out to requests.'),
+    ('db_pool_max_connections', 'max_size', 'Configured maximum pool size.'),
+    ('db_pool_waiting', 'waiting', 'Requests waiting for a pooled connection.'),
+)
+COUNTERS = (
+    ('db_pool_checkouts_total', 'checkouts', 'Connections handed out.'),
+    ('db_pool_connections_created_total', 'created', 'Connections opened by the pool.'),
+    ('db_pool_connections_closed_total', 'closed', 'Connections closed by the pool (idle, broken or unusable).'),
+    ('db_pool_failed_checks_total', 'failed_checks', 'Connections discarded by the health check.'),
+    ('db_pool_timeouts_total', 'timeouts', 'Requests that gave up waiting for a connection.'),
+)
+
+
+def pool_metrics():
+    """Metric lines of every pool of this process, in the Prometheus text format."""
+    snapshots = {alias: pool.snapshot() for (alias, pid), pool in list(_pools.items()) if pid == os.getpid()}
+    if not snapshots:
+        return []
+    lines = []
+    for kind, metrics in (('gauge', GAUGES), ('counter', COUNTERS)):
+        for name, key, help_text in metrics:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            lines += [f'{name}{{database="{alias}"}} {stats[key]}' for alias, stats in sorted(snapshots.items())]
+    name = 'db_pool_wait_seconds'
+    lines += [f'# HELP {name} Time to get a pooled connection, including health checks.', f'# TYPE {name} histogram']
+    for alias, stats in sorted(snapshots.items()):
+        lines += histogram_lines(name, f'database="{alias}"', *stats['wait'], DURATION_BUCKETS)
+    return lines
+
+
+registry.add_collector(pool_metrics)
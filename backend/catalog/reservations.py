@@ -0,0 +1,210 @@
+"""
+Stock reservations for checkout.
+
+Stock is never read, modified and written back. Every change is a single
+conditional UPDATE evaluated by the database against the current row:
+
+    UPDATE product SET stock_quantity = stock_quantity - n
+    WHERE id = ... AND is_available AND stock_quantity >= n
+
+so concurrent buyers of the same product cannot oversell it or lose each
+other's updates, and a row lock is only held from that statement to the
+end of the (short) reservation transaction. The items of a multi-item
+order are updated in ascending product id order, so two orders sharing
+products always lock them in the same order and cannot deadlock.
+
+is_available follows the stock: it is cleared in the same UPDATE that takes
+the last unit, and the reservation item records it (sold_out). Stock coming
+back from zero makes the product available again only while that record
+stands: products made unavailable by other means (saved in the admin or
+the API, bulk writes, imports) drop it, so their availability is left
+alone (see forget_sold_out). Those flips invalidate the cached catalog data; plain stock changes do not, so stock
+counts in cached responses may lag by up to CATALOG_RESPONSE_CACHE_TIMEOUT.
+ETags are derived from the response content, not the cache version, so
+clients revalidating afterwards get the new counts rather than a 304.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.utils import timezone
+
+from .models import Product, StockReservation, StockReservationItem
+from .signals import stock_availability_changed
+
+
+class InsufficientStock(Exception):
+    """Raised when some products of an order cannot be reserved; nothing was reserved."""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for products {', '.join(map(str, product_ids))}.")
+
+
+class ReservationClosed(Exception):
+    """Raised when a reservation is no longer pending (or has expired)."""
+
+    def __init__(self, reservation):
+        self.reservation = reservation
+        super().__init__(f'Reservation {reservation.pk} is {reservation.status}.')
+
+
+def _merge_items(items):
+    """Sums (product_id, quantity) pairs per product."""
+    quantities = {}
+    for product_id, quantity in items:
+        if quantity < 1:
+            raise ValueError('Quantities must be positive.')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        raise ValueError('An order needs at least one item.')
+    return quantities
+
+
+def _unavailable(quantities, using):
+    """Products of an order that do not have enough purchasable stock."""
+    in_stock = dict(
+        Product.objects.using(using)
+        .filter(pk__in=quantities, is_available=True)
+        .values_list('pk', 'stock_quantity')
+    )
+    return sorted(pk for pk, quantity in quantities.items() if in_stock.get(pk, 0) < quantity)
+
+
+def reserve_stock(items, ttl=None, user=None, using=DEFAULT_DB_ALIAS):
+    """
+    Reserves every item of an order, or nothing, on behalf of `user`.
+    `items` is an iterable of (product_id, quantity); `ttl` is the number of
+    seconds the stock is held (default CATALOG_RESERVATION_TTL).
+    Returns the pending StockReservation; raises InsufficientStock.
+    """
+    quantities = _merge_items(items)
+    if ttl is None:
+        ttl = getattr(settings, 'CATALOG_RESERVATION_TTL', 900)
+    now = timezone.now()
+    products = Product.objects.using(using)
+
+    try:
+        with transaction.atomic(using=using):
+            # Ascending id order: orders sharing products lock them in the same order
+            for product_id in sorted(quantities):
+                quantity = quantities[product_id]
+                taken = products.filter(
+                    pk=product_id, is_available=True, stock_quantity__gte=quantity,
+                ).update(
+                    stock_quantity=F('stock_quantity') - quantity,
+                    is_available=Case(When(stock_quantity=quantity, then=Value(False)), default=Value(True)),
+                    updated_at=now,
+                )
+                if not taken:
+                    raise InsufficientStock([product_id])
+
+            reservation = StockReservation.objects.using(using).create(
+                user=user, expires_at=now + timedelta(seconds=ttl),
+            )
+            # The rows are locked by this transaction, so this sees the final stock
+            sold_out = set(products.filter(pk__in=quantities, stock_quantity=0).values_list('pk', flat=True))
+            StockReservationItem.objects.using(using).bulk_create([
+                StockReservationItem(
+                    reservation=reservation, product_id=product_id, quantity=quantity, sold_out=product_id in sold_out,
+                )
+                for product_id, quantity in sorted(quantities.items())
+            ])
+            if sold_out:
+                stock_availability_changed(using)
+    except InsufficientStock:
+        # Rolled back; report every short item, not only the first one hit
+        raise InsufficientStock(_unavailable(quantities, using) or sorted(quantities)) from None
+    return reservation
+
+
+def _return_stock(reservation, using, now):
+    """Gives the stock held by a reservation back to its products."""
+    products = Product.objects.using(using)
+    items = StockReservationItem.objects.using(using)
+    quantities = dict(items.filter(reservation=reservation).values_list('product_id', 'quantity'))
+    # Unavailable because a reservation took its last unit, not by hand
+    sold_out = Exists(items.filter(product=OuterRef('pk'), sold_out=True))
+    restocked = []
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        # A product sold out by a reservation becomes purchasable again
+        if products.filter(sold_out, pk=product_id, stock_quantity=0, is_available=False).update(
+            stock_quantity=F('stock_quantity') + quantity, is_available=True, updated_at=now,
+        ):
+            restocked.append(product_id)
+        else:
+            products.filter(pk=product_id).update(stock_quantity=F('stock_quantity') + quantity, updated_at=now)
+    if restocked:
+        forget_sold_out(restocked, using)
+        stock_availability_changed(using)
+
+
+def forget_sold_out(product_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Stops returned stock from making these products available again: call
+    it when products are made unavailable other than by a reservation.
+    """
+    StockReservationItem.objects.using(using).filter(product_id__in=product_ids, sold_out=True).update(sold_out=False)
+
+
+def _close(reservation_id, status, using, now, **conditions):
+    """
+    Moves a pending reservation to `status` with a conditional UPDATE, so
+    only one of confirm, release and expiry can ever win. Returns whether
+    this call closed it.
+    """
+    return bool(
+        StockReservation.objects.using(using)
+        .filter(pk=reservation_id, status=StockReservation.Status.PENDING, **conditions)
+        .update(status=status, updated_at=now)
+    )
+
+
+def confirm_reservation(reservation_id, using=DEFAULT_DB_ALIAS):
+    """
+    Checks out a pending, unexpired reservation; its stock stays taken.
+    Returns the reservation; raises StockReservation.DoesNotExist or ReservationClosed.
+    """
+    now = timezone.now()
+    confirmed = _close(reservation_id, StockReservation.Status.CONFIRMED, using, now, expires_at__gt=now)
+    if not confirmed:
+        # Still pending means it expired without being swept yet: expire it now
+        release_reservation(reservation_id, StockReservation.Status.EXPIRED, using=using)
+    reservation = StockReservation.objects.using(using).get(pk=reservation_id)
+    if not confirmed:
+        raise ReservationClosed(reservation)
+    return reservation
+
+
+def release_reservation(reservation_id, status=StockReservation.Status.RELEASED, using=DEFAULT_DB_ALIAS):
+    """
+    Cancels a pending reservation and returns its stock.
+    Returns whether the reservation was pending (and is now `status`).
+    """
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        if not _close(reservation_id, status, using, now):
+            return False
+        _return_stock(StockReservation(pk=reservation_id), using, now)
+    return True
+
+
+def release_expired_reservations(limit=None, using=DEFAULT_DB_ALIAS):
+    """
+    Expires pending reservations past their expiry time, oldest first, each
+    in its own short transaction. Returns the number expired.
+    """
+    expired = (
+        StockReservation.objects.using(using)
+        .filter(status=StockReservation.Status.PENDING, expires_at__lte=timezone.now())
+        .order_by('expires_at')
+        .values_list('pk', flat=True)
+    )
+    if limit:
+        expired = expired[:limit]
+    return sum(
+        release_reservation(reservation_id, StockReservation.Status.EXPIRED, using=using)
+        for reservation_id in list(expired)
+    )
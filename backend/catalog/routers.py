@@ -0,0 +1,196 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Writes always go to the primary ("default"). Reads go to the primary too,
+except in requests that opted into replicas: safe-method requests on the
+product and category views (ReplicaReadMixin, whose initial() the async
+catalog views run too, calls use_replica()). Each such request reads from one randomly chosen
+alias of DATABASE_REPLICAS.
+
+A client that wrote anything recently is pinned to the primary for
+CATALOG_REPLICA_PIN_SECONDS, so it reads its own writes even while the
+replicas lag. PrimaryPinningMiddleware notices the writes of a request
+through the router and pins its client with a cookie and, for clients
+sending an Authorization header (JWT), a cache entry keyed by a hash of it.
+
+Other clients may read replica data that lags behind the primary. The
+shared caches of derived data (responses, result counts, facets) follow
+the same rule through cache_variant(): entries computed from a replica may
+lag behind the version they are stored under, so they are kept apart from
+primary entries and only serve other replica reads, and pinned clients
+bypass these caches altogether.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import get_cache
+
+PIN_COOKIE = 'catalog_primary_pin'
+
+
+class _Routing:
+    __slots__ = ('pinned', 'replica', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+# Routing state of the request being handled (None outside requests, e.g. in commands)
+_current = ContextVar('catalog_db_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _pin_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'catalog:pin:' + hashlib.sha1(authorization.encode()).hexdigest()
+
+
+def is_pinned(request):
+    """Whether the client wrote within the last CATALOG_REPLICA_PIN_SECONDS."""
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = _pin_key(request)
+    return key is not None and get_cache().get(key) is not None
+
+
+async def ais_pinned(request):
+    """is_pinned() for async code."""
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = _pin_key(request)
+    return key is not None and await get_cache().aget(key) is not None
+
+
+def use_replica():
+    """
+    Sends the rest of the current request's reads to a replica, unless its
+    client is pinned to the primary. Returns the alias reads now go to.
+    """
+    routing = _current.get()
+    if routing is None or routing.pinned or routing.wrote or not replicas():
+        return DEFAULT_DB_ALIAS
+    if routing.replica is None:
+        routing.replica = random.choice(replicas())
+    return routing.replica
+
+
+def cache_variant():
+    """
+    Which entries of the shared catalog caches the current request may use:
+    '' for primary reads, 'replica' for replica reads, or None for requests
+    of pinned clients (or that wrote), which must neither read nor fill them.
+    """
+    routing = _current.get()
+    if routing is None or not replicas():
+        return ''
+    if routing.pinned or routing.wrote:
+        return None
+    return 'replica' if routing.replica is not None else ''
+
+
+class PrimaryReplicaRouter:
+    """Routes writes to the primary and, in opted-in requests, reads to a replica."""
+
+    def db_for_read(self, model, **hints):
+        routing = _current.get()
+        if routing is not None and routing.replica is not None and not routing.wrote:
+            return routing.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing is not None:
+            # Later reads of this request and the client's next requests see the write
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin reading safe-method requests from a replica (see
+    use_replica), placed before CachedResponseMixin.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permission checks still read from the primary
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            use_replica()
+
+    def response_cache_variant(self):
+        return cache_variant()
+
+
+class PrimaryPinningMiddleware:
+    """
+    Tracks the routing state of each request and pins clients that wrote to
+    the primary. Place it before any middleware that reads the database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = _Routing(pinned=bool(replicas()) and is_pinned(request))
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        key = self.pin(request, response, routing)
+        if key is not None:
+            get_cache().set(key, 1, self.pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        routing = _Routing(pinned=bool(replicas()) and await ais_pinned(request))
+        token = _current.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        key = self.pin(request, response, routing)
+        if key is not None:
+            await get_cache().aset(key, 1, self.pin_seconds())
+        return response
+
+    def pin_seconds(self):
+        return getattr(settings, 'CATALOG_REPLICA_PIN_SECONDS', 10)
+
+    def pin(self, request, response, routing):
+        """Sets the pin cookie after a write; returns the cache key to pin too, if any."""
+        if not routing.wrote or not replicas():
+            return None
+        response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds(), httponly=True, samesite='Lax')
+        return _pin_key(request)
@@ -0,0 +1,214 @@
+"""
+Full-text product search.
+
+Each product is indexed on its name (highest weight), category title and
+description (lowest weight):
+
+- PostgreSQL: a tsvector column (Product.search_vector) filled by a trigger
+  and served by a GIN index, ranked with ts_rank.
+- SQLite (USE_SQLITE): an FTS5 shadow table kept in sync by triggers,
+  joined through the ProductSearchDocument model and ranked with bm25.
+- Other databases fall back to case-insensitive substring matching.
+
+The indexes are maintained inside the database, so bulk_create, bulk_update
+and raw loads stay searchable without going through model signals.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Lookup, Q, Value
+
+from .models import ProductSearchDocument
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'catalog_product_fts'
+# bm25 column weights for (name, category_title, description)
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+POSTGRES_INSTALL_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+                (SELECT title FROM catalog_category WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product",
+    """
+    CREATE TRIGGER catalog_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION catalog_category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        -- Touching name re-runs the product trigger with the new category title
+        UPDATE catalog_product SET name = name WHERE category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS catalog_category_search_vector_trigger ON catalog_category",
+    """
+    CREATE TRIGGER catalog_category_search_vector_trigger
+    AFTER UPDATE OF title ON catalog_category
+    FOR EACH ROW WHEN (OLD.title IS DISTINCT FROM NEW.title)
+    EXECUTE FUNCTION catalog_category_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS catalog_product_search_gin ON catalog_product USING gin (search_vector)",
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS catalog_product_search_gin",
+    "DROP TRIGGER IF EXISTS catalog_category_search_vector_trigger ON catalog_category",
+    "DROP FUNCTION IF EXISTS catalog_category_search_vector_update()",
+    "DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product",
+    "DROP FUNCTION IF EXISTS catalog_product_search_vector_update()",
+]
+
+_FTS_ROW = f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, category_title, description)
+    VALUES (new.id, new.name, (SELECT title FROM catalog_category WHERE id = new.category_id), new.description);
+"""
+
+SQLITE_INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+    USING fts5(name, category_title, description, tokenize = 'porter unicode61')
+    """,
+    # The hidden rank column then returns bm25 with the column weights
+    f"""
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank)
+    VALUES ('rank', 'bm25({", ".join(str(weight) for weight in FTS_WEIGHTS)})')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_insert AFTER INSERT ON catalog_product BEGIN
+        {_FTS_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_update
+    AFTER UPDATE OF name, description, category_id ON catalog_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        {_FTS_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_product_fts_delete AFTER DELETE ON catalog_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_category_fts_update AFTER UPDATE OF title ON catalog_category BEGIN
+        UPDATE {FTS_TABLE} SET category_title = new.title
+        WHERE rowid IN (SELECT id FROM catalog_product WHERE category_id = new.id);
+    END
+    """,
+]
+
+SQLITE_UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS catalog_category_fts_update",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_delete",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_update",
+    "DROP TRIGGER IF EXISTS catalog_product_fts_insert",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install_search_index(connection):
+    """Creates the search triggers and index for the connection's database (idempotent)."""
+    statements = {'postgresql': POSTGRES_INSTALL_SQL, 'sqlite': SQLITE_INSTALL_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall_search_index(connection):
+    statements = {'postgresql': POSTGRES_UNINSTALL_SQL, 'sqlite': SQLITE_UNINSTALL_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def release_product_table(connection):
+    """
+    SQLite rebuilds a table to alter it and cannot rename the rebuilt
+    catalog_product while the category trigger refers to it. Migrations that
+    alter Product call this first; install_search_index() restores the trigger.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER IF EXISTS catalog_category_fts_update")
+
+
+def rebuild_search_index(connection):
+    """Recomputes the search data of every product from scratch."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Touching name fires the BEFORE UPDATE trigger for every row
+            cursor.execute("UPDATE catalog_product SET name = name")
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(f"""
+                INSERT INTO {FTS_TABLE}(rowid, name, category_title, description)
+                SELECT p.id, p.name, c.title, p.description
+                FROM catalog_product p JOIN catalog_category c ON c.id = p.category_id
+            """)
+
+
+class FullTextMatch(Lookup):
+    """`document__match=...` compiles to FTS5's `<table> MATCH <query>`."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+ProductSearchDocument._meta.get_field('document').register_lookup(FullTextMatch)
+
+
+def _fts5_query(term):
+    """Turns free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_products(queryset, term):
+    """
+    Filters a product queryset to the rows matching `term` and annotates
+    `search_rank` (higher is more relevant). The result is ordered by
+    relevance; a later OrderingFilter ordering takes precedence.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+        )
+    elif vendor == 'sqlite':
+        match = _fts5_query(term)
+        if not match:
+            return queryset.none()
+        # A join rather than a per-row subquery: FTS5 evaluates the match once
+        queryset = queryset.filter(search_document__document__match=match).annotate(
+            # bm25 scores are negative (lower is better); flip them to match ts_rank
+            search_rank=F('search_document__rank') * -1,
+        )
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(category__title__icontains=term) | Q(description__icontains=term)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by('-search_rank', 'pk')
@@ -0,0 +1,161 @@
+"""
+Deterministic generation of seed catalog data for seed_data.
+
+This module is plain Python with no Django imports, so seed_data can run it
+in worker processes under any multiprocessing start method. Every block of
+SEED_BLOCK_SIZE products, counted from the first one, draws from its own
+Random(f'{seed}:{block}') stream: the generated catalog depends only on the
+seed, never on the batch size, the number of workers or the order in which
+chunks finish.
+"""
+import math
+import random
+
+# --- Product names mapped to their category (for realistic seed data) ---
+# Each product is assigned to the category that best matches its type.
+
+PRODUCTS_BY_CATEGORY = {
+    "Electronics": [
+        "Wireless Mechanical Keyboard", "1TB NVMe SSD", "Noise Cancelling Headphones",
+        "4K Curved Monitor", "Smart Home Hub", "Portable Power Bank",
+        "Digital Drawing Tablet", "Professional DSLR Camera", "Bluetooth Speaker",
+    ],
+    "Home & Kitchen": [
+        "Ergonomic Office Chair", "High-Speed Blender", "Stainless Steel Water Bottle",
+    ],
+    "Fashion": [
+        "Organic Cotton T-Shirt", "Minimalist Leather Wallet",
+    ],
+    "Outdoors": [
+        "Hiking Backpack 50L",
+    ],
+}
+
+# (base product name, index of its category in PRODUCTS_BY_CATEGORY)
+PRODUCT_CHOICES = [
+    (name, category_index)
+    for category_index, names in enumerate(PRODUCTS_BY_CATEGORY.values())
+    for name in names
+]
+
+DEFAULT_REVIEW_DISTRIBUTION = 'uniform:0-5'
+
+# Products per random stream; chunks starting inside a block replay its first rows
+SEED_BLOCK_SIZE = 1000
+
+
+def generate_description(name):
+    """Generates a semi-realistic product description."""
+    return f"Experience the ultimate performance with the new {name}. Featuring cutting-edge technology and a sleek, durable design, it's perfect for both professional use and everyday tasks. Get yours today!"
+
+
+def review_comment(rating):
+    if rating >= 4:
+        return "Excellent product, highly recommend!"
+    if rating == 3:
+        return "It's decent, met expectations."
+    return "Needs improvement, especially in features."
+
+
+def _poisson(rng, mean):
+    if mean > 30:
+        # Normal approximation; Knuth's method gets slow for large means
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit, count, product = math.exp(-mean), 0, 1.0
+    while True:
+        product *= rng.random()
+        if product <= limit:
+            return count
+        count += 1
+
+
+def parse_distribution(spec):
+    """
+    Parses a --reviews-per-product spec into a function rng -> review count:
+
+    - "uniform:MIN-MAX", e.g. "uniform:0-5" (the default)
+    - "fixed:N"
+    - "poisson:MEAN", e.g. "poisson:3.5"
+    - "longtail:ALPHA:MAX", e.g. "longtail:1.2:5000": Pareto distributed,
+      so most products get a few reviews and a handful of hot products get
+      up to MAX. Smaller ALPHA means a heavier tail.
+
+    Raises ValueError for malformed specs.
+    """
+    kind, _, args = spec.partition(':')
+    try:
+        if kind == 'uniform':
+            low, high = (int(value) for value in args.split('-'))
+            if 0 <= low <= high:
+                return lambda rng: rng.randint(low, high)
+        elif kind == 'fixed':
+            count = int(args)
+            if count >= 0:
+                return lambda rng: count
+        elif kind == 'poisson':
+            mean = float(args)
+            if mean >= 0:
+                return lambda rng: _poisson(rng, mean)
+        elif kind == 'longtail':
+            alpha, maximum = args.split(':')
+            alpha, maximum = float(alpha), int(maximum)
+            if alpha > 0 and maximum >= 0:
+                return lambda rng: min(maximum, int(rng.paretovariate(alpha)) - 1)
+    except ValueError:
+        pass
+    raise ValueError(
+        f'Invalid review distribution "{spec}"; use uniform:MIN-MAX, fixed:N, '
+        'poisson:MEAN or longtail:ALPHA:MAX.'
+    )
+
+
+def generate_product(rng, number, reviews_for):
+    """Draws product number `number` from `rng`; returns (product, ratings)."""
+    base_name, category_index = rng.choice(PRODUCT_CHOICES)
+    name = base_name + f" #{number}"
+    stock = rng.randint(0, 500)
+    ratings = [rng.randint(1, 5) for _ in range(reviews_for(rng))]
+    product = {
+        'name': name,
+        'description': generate_description(name),
+        'price': f'{rng.uniform(9.99, 999.99):.2f}',
+        'stock_quantity': stock,
+        'category_index': category_index,
+        # Simple placeholder image URL
+        'image_url': f"https://placehold.co/400x300/{rng.choice(['000', '333', '666'])}/white?text={name.replace(' ', '+')}",
+        'is_available': stock > 0,
+        'review_count': len(ratings),
+        'rating_sum': sum(ratings),
+        **{f'rating_{star}_count': ratings.count(star) for star in range(1, 6)},
+    }
+    return product, ratings
+
+
+def generate_chunk(task):
+    """
+    Generates one chunk of products and their reviews.
+
+    `task` is (seed, first_number, count, review_distribution), products
+    being numbered from 1. Returns (products, reviews): products are dicts of
+    Product field values, with the category as `category_index` and the
+    rating aggregates already filled in; reviews are (product offset in the
+    chunk, review number, rating) tuples, to be attached once the product ids
+    are known.
+    """
+    seed, first_number, count, distribution = task
+    reviews_for = parse_distribution(distribution)
+
+    products, reviews = [], []
+    # Start at the beginning of the block holding the first product
+    block_start = first_number - (first_number - 1) % SEED_BLOCK_SIZE
+    for number in range(block_start, first_number + count):
+        if (number - 1) % SEED_BLOCK_SIZE == 0:
+            rng = random.Random(f'{seed}:{(number - 1) // SEED_BLOCK_SIZE}')
+        product, ratings = generate_product(rng, number, reviews_for)
+        if number < first_number:
+            # Generated by the previous chunk; drawn again only to advance the stream
+            continue
+        offset = number - first_number
+        products.append(product)
+        reviews.extend((offset, review_number, rating) for review_number, rating in enumerate(ratings, 1))
+    return products, reviews
@@ -1,17 +1,97 @@
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
-from .models import Category, Product, Review
+from rest_framework.permissions import SAFE_METHODS
+from .models import Category, Product, Review, StockReservation, StockReservationItem
+
+
+def _csv_param(request, name):
+    """Returns the comma separated values of a query parameter as a set."""
+    if request is None:
+        return set()
+    raw = request.query_params.get(name, '')
+    return {value.strip() for value in raw.split(',') if value.strip()}
+
+
+def select_fields(field_names, request, expandable=()):
+    """
+    Resolves which fields a read request asked for.
+    ?fields=a,b keeps only the listed fields; ?expand=x adds expandable fields,
+    which are otherwise left out.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return set(field_names)
+    requested = _csv_param(request, 'fields')
+    expanded = _csv_param(request, 'expand')
+    selected = set()
+    for name in field_names:
+        if requested:
+            if name in requested or name in expanded:
+                selected.add(name)
+        elif name not in expandable or name in expanded:
+            selected.add(name)
+    return selected
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin implementing the ?fields= / ?expand= sparse fieldsets.
+    Fields named in Meta.expandable_fields are only rendered when requested.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        selected = select_fields(fields, request, getattr(self.Meta, 'expandable_fields', ()))
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+# Renders category price ranges like product prices
+CATEGORY_PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
 
 
 class CategorySerializer(serializers.ModelSerializer):
     """
     Serializer for the Category model.
     Used for listing and creating categories.
+    The product stats come from the `category_stats` context (see
+    catalog.facets.category_stats), so a page of categories needs no
+    query per category.
     """
+    product_count = serializers.SerializerMethodField()
+    available_count = serializers.SerializerMethodField()
+    min_price = serializers.SerializerMethodField()
+    max_price = serializers.SerializerMethodField()
+    average_rating = serializers.SerializerMethodField()
+
     class Meta:
         model = Category
-        fields = ['id', 'title', 'slug', 'created_at']
+        fields = [
+            'id', 'title', 'slug', 'created_at',
+            'product_count', 'available_count', 'min_price', 'max_price', 'average_rating',
+        ]
         read_only_fields = ['created_at']
 
+    def _stats(self, obj):
+        return self.context.get('category_stats', {}).get(obj.pk, {})
+
+    def get_product_count(self, obj):
+        return self._stats(obj).get('product_count', 0)
+
+    def get_available_count(self, obj):
+        return self._stats(obj).get('available_count', 0)
+
+    def get_min_price(self, obj):
+        price = self._stats(obj).get('min_price')
+        return None if price is None else CATEGORY_PRICE_FIELD.to_representation(price)
+
+    def get_max_price(self, obj):
+        price = self._stats(obj).get('max_price')
+        return None if price is None else CATEGORY_PRICE_FIELD.to_representation(price)
+
+    def get_average_rating(self, obj):
+        return self._stats(obj).get('average_rating', 0)
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     """
@@ -29,16 +109,17 @@ class ReviewSerializer(serializers.ModelSerializer):
         return value
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Main serializer for the Product model.
-    Includes the category title and the average rating property.
+    Includes the category title and the stored rating aggregates.
     """
     # Use the string representation of the ForeignKey
     category_title = serializers.CharField(source='category.title', read_only=True)
     
-    # Read-only field from the Product model's @property method
+    # Derived from the denormalized rating columns, not the reviews relation
     average_rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
     # Nested serializer to include a few recent reviews (useful for product detail page)
     # Using a nested field is common for detail views.
@@ -48,15 +129,189 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'description', 'price', 'stock_quantity',
+            'id', 'sku', 'name', 'description', 'price', 'stock_quantity',
             'image_url', 'is_available', 'created_at', 'updated_at',
-            'category', 'category_title', 'average_rating', 'reviews'
+            'category', 'category_title', 'average_rating', 'review_count',
+            'rating_histogram', 'reviews'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'review_count']
 
     def get_average_rating(self, obj):
         """
         Custom method to retrieve the average rating, rounded to two decimal places.
-        This leverages the model's optimized property.
+        Reads the stored review_count/rating_sum columns, so no reviews are loaded.
         """
         return round(obj.average_rating, 2)
+
+    def get_rating_histogram(self, obj):
+        """Number of reviews per star rating ("1" to "5")."""
+        return {str(star): count for star, count in obj.rating_histogram.items()}
+
+
+class ProductListSerializer(ProductSerializer):
+    """
+    Compact representation used by the product list endpoint.
+    Heavy fields are left out unless requested, e.g. ?expand=reviews.
+    """
+    class Meta(ProductSerializer.Meta):
+        expandable_fields = ['description', 'rating_histogram', 'reviews']
+
+
+class ProductListValuesSerializer(ProductListSerializer):
+    """
+    ProductListSerializer for Product.objects.values() rows, used by the list
+    endpoint when CATALOG_FAST_LIST is on. Renders the same data without model
+    instances or per-field attribute lookups; nested reviews are not supported.
+    """
+    class Meta(ProductListSerializer.Meta):
+        fields = [name for name in ProductListSerializer.Meta.fields if name != 'reviews']
+        expandable_fields = [name for name in ProductListSerializer.Meta.expandable_fields if name != 'reviews']
+
+    # Columns read for fields that are not plain model fields
+    value_sources = {
+        'category': ('category_id',),
+        'category_title': ('category__title',),
+        'average_rating': ('rating_sum', 'review_count'),
+        'rating_histogram': tuple(f'rating_{star}_count' for star in range(1, 6)),
+    }
+    # Fields whose to_representation() returns database values unchanged
+    passthrough_fields = (
+        serializers.BooleanField, serializers.CharField, serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+    )
+    _getters = None
+
+    def value_lookups(self):
+        """Columns to pass to values() for the selected fields."""
+        lookups = []
+        for name in self.fields:
+            lookups.extend(self.value_sources.get(name, (name,)))
+        return list(dict.fromkeys(lookups))
+
+    def values_queryset(self, queryset):
+        """
+        The values() queryset this serializer renders. Ordering columns are
+        included too, as keyset pagination builds its cursors from them.
+        """
+        lookups = self.value_lookups()
+        for item in queryset.query.order_by or queryset.model._meta.ordering:
+            name = item.lstrip('-') if isinstance(item, str) else getattr(getattr(item, 'expression', None), 'name', None)
+            if name:
+                lookups.append(queryset.model._meta.pk.name if name == 'pk' else name)
+        lookups.append(queryset.model._meta.pk.name)
+        return queryset.values(*dict.fromkeys(lookups))
+
+    def _getter(self, name, field):
+        if name == 'average_rating':
+            return lambda row: round(row['rating_sum'] / row['review_count'], 2) if row['review_count'] else 0
+        if name == 'rating_histogram':
+            return lambda row: {str(star): row[f'rating_{star}_count'] for star in range(1, 6)}
+        source = self.value_sources.get(name, (name,))[0]
+        if isinstance(field, self.passthrough_fields):
+            return lambda row: row[source]
+        to_representation = field.to_representation
+        return lambda row: None if row[source] is None else to_representation(row[source])
+
+    def to_representation(self, row):
+        if self._getters is None:
+            # Built once per serializer; a many=True list reuses its child for every row
+            self._getters = [(name, self._getter(name, field)) for name, field in self.fields.items()]
+        return {name: getter(row) for name, getter in self._getters}
+
+
+class ProductBulkRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk product upsert.
+    Rows are matched by id or sku; the category is given by id or slug and
+    resolved for the whole batch at once (see catalog.bulk).
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    sku = serializers.CharField(required=False, max_length=64)
+    name = serializers.CharField(required=False, max_length=255)
+    description = serializers.CharField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    category = serializers.IntegerField(required=False, min_value=1)
+    category_slug = serializers.SlugField(required=False, max_length=255)
+    image_url = serializers.URLField(max_length=2000, required=False, allow_null=True, allow_blank=True)
+    is_available = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if 'category' in attrs and 'category_slug' in attrs:
+            raise serializers.ValidationError("Give either category or category_slug, not both.")
+        return attrs
+
+
+class StockReservationItemSerializer(serializers.ModelSerializer):
+    """
+    One product and quantity of a stock reservation.
+    """
+    product = serializers.IntegerField(source='product_id', min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = StockReservationItem
+        fields = ['product', 'quantity']
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    """
+    A stock reservation and its items.
+    Created with {"items": [{"product": 1, "quantity": 2}, ...]} (see catalog.reservations).
+    """
+    items = StockReservationItemSerializer(many=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'status', 'expires_at', 'created_at', 'items']
+        read_only_fields = ['id', 'status', 'expires_at', 'created_at']
+
+    def validate_items(self, value):
+        max_items = getattr(settings, 'CATALOG_RESERVATION_MAX_ITEMS', 100)
+        if not value:
+            raise serializers.ValidationError("An order needs at least one item.")
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per reservation.")
+        return value
+
+
+class CartItemInputSerializer(serializers.Serializer):
+    """
+    One product and quantity sent to the cart.
+    A quantity of 0 removes the product when quantities are replaced.
+    """
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+    def validate_quantity(self, value):
+        limit = getattr(settings, 'CATALOG_CART_MAX_QUANTITY', 100)
+        if value > limit:
+            raise serializers.ValidationError(f"At most {limit} of a product per cart.")
+        return value
+
+
+class CartUpdateSerializer(serializers.Serializer):
+    """
+    Items added to (POST) or replaced in (PATCH) the cart, in one request.
+    Pass context={'replace': True} for replacements.
+    """
+    items = CartItemInputSerializer(many=True)
+
+    def validate_items(self, value):
+        max_items = getattr(settings, 'CATALOG_RESERVATION_MAX_ITEMS', 100)
+        if not value:
+            raise serializers.ValidationError("Give at least one item.")
+        if len(value) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items per request.")
+        if not self.context.get('replace') and any(item['quantity'] == 0 for item in value):
+            raise serializers.ValidationError("Quantities added must be positive.")
+        return value
+
+    def get_quantities(self):
+        """{product_id: quantity}; repeated products are summed when adding, last one wins when replacing."""
+        quantities = {}
+        for item in self.validated_data['items']:
+            if self.context.get('replace'):
+                quantities[item['product']] = item['quantity']
+            else:
+                quantities[item['product']] = quantities.get(item['product'], 0) + item['quantity']
+        return quantities
@@ -0,0 +1,125 @@
+"""
+Signal handlers that keep denormalized catalog data in sync with its sources.
+Connected in CatalogConfig.ready().
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .aggregates import apply_review_delta
+from .authentication import invalidate_user
+from .cache import invalidate_responses
+from .facets import invalidate_facets
+from .models import Category, Product, Review
+from .pagination import invalidate_counts
+from .search import FTS_TABLE, install_search_index
+from .suggest import products_changed, products_removed
+
+
+def _invalidate_on_commit(using, *callbacks):
+    """
+    Cache versions are bumped once the write is committed, so a concurrent
+    reader cannot re-cache the old rows under the new version.
+    """
+    for callback in callbacks:
+        transaction.on_commit(callback, using=using)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    """Add the review to its product's aggregates, undoing the previous state on edits."""
+    if raw:
+        # Fixture loading: aggregates are rebuilt with rebuild_rating_aggregates
+        return
+    previous = None if created else getattr(instance, '_persisted', None)
+    current = (instance.product_id, instance.rating)
+    if previous != current:
+        if previous is not None:
+            apply_review_delta(*previous, sign=-1, using=using)
+        apply_review_delta(*current, sign=1, using=using)
+        instance._persisted = current
+        _invalidate_on_commit(using, invalidate_facets)
+    # Detail responses nest the review itself, so any edit expires them
+    _invalidate_on_commit(using, invalidate_responses)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, using='default', **kwargs):
+    """Remove the review from its product's aggregates."""
+    product_id, rating = getattr(instance, '_persisted', (instance.product_id, instance.rating))
+    apply_review_delta(product_id, rating, sign=-1, using=using)
+    _invalidate_on_commit(using, invalidate_facets, invalidate_responses)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_rows_changed(sender, using='default', **kwargs):
+    """Cached responses, result and facet counts depend on product and category rows."""
+    _invalidate_on_commit(using, invalidate_counts, invalidate_facets, invalidate_responses)
+
+
+def bulk_products_changed(using='default'):
+    """
+    Invalidation for bulk_create/bulk_update writes, which send no signals.
+    Updated rows must have updated_at set so workers' autocomplete indexes
+    pick them up.
+    """
+    _invalidate_on_commit(using, invalidate_counts, invalidate_facets, invalidate_responses, products_changed)
+
+
+def stock_availability_changed(using='default'):
+    """
+    Invalidation for conditional stock updates (see catalog.reservations) that
+    took a product to or from zero stock, flipping its availability.
+    """
+    _invalidate_on_commit(using, invalidate_counts, invalidate_facets, invalidate_responses)
+
+
+@receiver(post_save, sender=Product)
+def product_availability_set(sender, instance, created, raw=False, update_fields=None, using='default', **kwargs):
+    """A product saved as unavailable (e.g. in the admin) stays so when reserved stock is returned."""
+    if created or raw or instance.is_available or (update_fields is not None and 'is_available' not in update_fields):
+        return
+    # catalog.reservations sends its own signals through this module
+    from .reservations import forget_sold_out
+
+    forget_sold_out([instance.pk], using)
+
+
+@receiver(post_save, sender=Product)
+def refresh_suggestions(sender, using='default', **kwargs):
+    """Workers re-read recently updated products into their autocomplete index."""
+    _invalidate_on_commit(using, products_changed)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def rebuild_suggestions(sender, using='default', **kwargs):
+    """Deletions and category slug changes make workers rebuild their autocomplete index."""
+    _invalidate_on_commit(using, products_removed)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, using='default', **kwargs):
+    """Cached copies of the user and the trusted claims of their tokens are stale."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # Signing in changes nothing authentication relies on
+        return
+    _invalidate_on_commit(using, partial(invalidate_user, instance.pk))
+
+
+def restore_search_triggers(sender, using='default', **kwargs):
+    """
+    SQLite drops triggers when a migration rebuilds a table, so re-create the
+    FTS triggers after every migrate once the search index exists.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
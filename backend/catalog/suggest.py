@@ -0,0 +1,269 @@
+"""
+In-memory, typo-tolerant autocomplete for product names.
+
+Each worker process keeps a word-level index of product names:
+
+- a sorted vocabulary for prefix lookups ("head" -> "headphones"),
+- trigram postings over the vocabulary to find words within one or two
+  edits of a misspelled query word,
+- word -> product id postings.
+
+The index is built lazily on the first request and refreshed incrementally:
+product writes bump the "suggest" cache version (see catalog.signals), and a
+worker that sees a new version re-reads only the products updated since its
+last sync. Deletions and category changes bump "suggest-rebuild", which
+triggers a full rebuild.
+
+Searches run under the index lock, as incremental refreshes modify the
+index in place; they hold it only while applying the rows already read.
+Full rebuilds build a new index and swap it in, so searches keep using the
+old one meanwhile.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_version, get_version
+from .models import Product
+
+REFRESH_NAMESPACE = 'suggest'
+REBUILD_NAMESPACE = 'suggest-rebuild'
+# Re-read a little before the last sync to cover transactions that committed late
+SYNC_OVERLAP = timedelta(seconds=30)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def allowed_typos(word):
+    """Short words must match exactly; longer words tolerate one or two edits."""
+    if len(word) < 4:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions
+    and adjacent transpositions). Returns limit + 1 as soon as it is exceeded.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SuggestIndex:
+    """Word-level name index supporting prefix and fuzzy lookups."""
+
+    def __init__(self):
+        self.products = {}                    # id -> (name, category_slug, words)
+        self.word_products = defaultdict(set)  # word -> product ids
+        self.trigram_words = defaultdict(set)  # trigram -> words
+        self.vocabulary = []                   # sorted words, for prefix search
+
+    def __len__(self):
+        return len(self.products)
+
+    @classmethod
+    def build(cls, rows):
+        """Builds an index from (id, name, category_slug) rows, sorting the vocabulary once."""
+        index = cls()
+        for product_id, name, category_slug in rows:
+            index.add(product_id, name, category_slug, keep_sorted=False)
+        index.vocabulary.sort()
+        return index
+
+    def add(self, product_id, name, category_slug, keep_sorted=True):
+        self.remove(product_id)
+        words = tuple(dict.fromkeys(normalize(name)))
+        self.products[product_id] = (name, category_slug, words)
+        for word in words:
+            if not self.word_products[word]:
+                if keep_sorted:
+                    insort(self.vocabulary, word)
+                else:
+                    self.vocabulary.append(word)
+                for gram in trigrams(word):
+                    self.trigram_words[gram].add(word)
+            self.word_products[word].add(product_id)
+
+    def remove(self, product_id):
+        entry = self.products.pop(product_id, None)
+        if entry is None:
+            return
+        for word in entry[2]:
+            ids = self.word_products[word]
+            ids.discard(product_id)
+            if not ids:
+                del self.word_products[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+                for gram in trigrams(word):
+                    self.trigram_words[gram].discard(word)
+
+    def _matching_words(self, query_word, is_last):
+        """
+        Returns {vocabulary word: edits} for a query word. The last query
+        word is treated as a prefix, since the user is still typing it.
+        """
+        limit = allowed_typos(query_word)
+        matches = {}
+        if is_last:
+            start = bisect_left(self.vocabulary, query_word)
+            # Without copying the rest of the vocabulary
+            for word in islice(self.vocabulary, start, None):
+                if not word.startswith(query_word):
+                    break
+                matches[word] = 0
+
+        if limit:
+            grams = trigrams(query_word)
+            # Every edit changes at most three trigrams
+            needed = max(1, len(grams) - 3 * limit)
+            shared = defaultdict(int)
+            for gram in grams:
+                for word in self.trigram_words.get(gram, ()):
+                    shared[word] += 1
+            for word, count in shared.items():
+                if count < needed or word in matches:
+                    continue
+                if is_last:
+                    # The word being typed may still be a prefix of the name word
+                    lengths = range(max(1, len(query_word) - limit), len(query_word) + limit + 1)
+                    distance = min(edit_distance(query_word, word[:n], limit) for n in lengths)
+                else:
+                    distance = edit_distance(query_word, word, limit)
+                if distance <= limit:
+                    matches[word] = distance
+        elif not is_last and query_word in self.word_products:
+            matches[query_word] = 0
+        return matches
+
+    def search(self, query, limit=8):
+        query_words = normalize(query)
+        if not query_words:
+            return []
+
+        scores = None
+        for position, query_word in enumerate(query_words):
+            words = self._matching_words(query_word, is_last=position == len(query_words) - 1)
+            word_scores = {}
+            for word, edits in words.items():
+                for product_id in self.word_products[word]:
+                    if edits < word_scores.get(product_id, edits + 1):
+                        word_scores[product_id] = edits
+            if scores is None:
+                scores = word_scores
+            else:
+                # Every query word has to match some word of the name
+                scores = {pid: scores[pid] + edits for pid, edits in word_scores.items() if pid in scores}
+            if not scores:
+                return []
+
+        first_word = query_words[0]
+
+        def rank(product_id):
+            name, _, words = self.products[product_id]
+            return (scores[product_id], not (words and words[0].startswith(first_word)), len(name), name)
+
+        best = heapq.nsmallest(limit, scores, key=rank)
+        return [
+            {'id': pid, 'name': self.products[pid][0], 'category_slug': self.products[pid][1]}
+            for pid in best
+        ]
+
+
+class _IndexState:
+    def __init__(self):
+        # Serializes syncs
+        self.lock = threading.Lock()
+        # Guards the contents of the index: searches against in-place refreshes
+        self.index_lock = threading.Lock()
+        self.index = None
+        self.refresh_version = None
+        self.rebuild_version = None
+        self.synced_at = None
+
+
+_state = _IndexState()
+
+
+def _product_rows(queryset):
+    return queryset.annotate(category_slug=F('category__slug')).values_list('id', 'name', 'category_slug')
+
+
+def _versions():
+    return get_version(REFRESH_NAMESPACE), get_version(REBUILD_NAMESPACE)
+
+
+def _synced(versions):
+    return _state.index is not None and versions == (_state.refresh_version, _state.rebuild_version)
+
+
+def _sync():
+    """Brings this worker's index up to date with the catalog version counters."""
+    if _synced(_versions()):
+        return
+
+    with _state.lock:
+        # Requests that waited for the lock find the index brought up to date by the first one
+        refresh_version, rebuild_version = _versions()
+        if _synced((refresh_version, rebuild_version)):
+            return
+        started = timezone.now()
+        if _state.index is None or rebuild_version != _state.rebuild_version:
+            rows = _product_rows(Product.objects.order_by()).iterator(chunk_size=5000)
+            _state.index = SuggestIndex.build(rows)
+        elif refresh_version != _state.refresh_version:
+            changed = Product.objects.filter(updated_at__gte=_state.synced_at - SYNC_OVERLAP).order_by()
+            rows = list(_product_rows(changed))
+            with _state.index_lock:
+                for product_id, name, slug in rows:
+                    _state.index.add(product_id, name, slug)
+        _state.refresh_version = refresh_version
+        _state.rebuild_version = rebuild_version
+        _state.synced_at = started
+
+
+def suggest(query, limit=8):
+    """Returns up to `limit` products whose names best match the typed query."""
+    _sync()
+    index = _state.index
+    with _state.index_lock:
+        return index.search(query, limit)
+
+
+def products_changed():
+    bump_version(REFRESH_NAMESPACE)
+
+
+def products_removed():
+    bump_version(REBUILD_NAMESPACE)
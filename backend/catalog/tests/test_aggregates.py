@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Q
+from django.test import TestCase
+
+from catalog.aggregates import rebuild_rating_aggregates
+from catalog.models import Category, Product, Review
+
+
+class RatingAggregateTests(TestCase):
+    """The review counters on Product match the reviews they summarise after every kind of write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.products = [
+            Product.objects.create(
+                name=f'Item {index}', description='', price=Decimal('10.00'), stock_quantity=1, category=category,
+            )
+            for index in range(2)
+        ]
+
+    def assertAggregatesMatch(self):
+        """Compares the stored counters of every product with an aggregate() over its reviews."""
+        for product in Product.objects.all():
+            expected = Review.objects.filter(product=product).aggregate(
+                count=Count('id'), average=Avg('rating'),
+                **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+            )
+            with self.subTest(product=product.name):
+                self.assertEqual(product.review_count, expected['count'])
+                self.assertAlmostEqual(product.average_rating, expected['average'] or 0)
+                self.assertEqual(
+                    product.rating_histogram, {star: expected[f'stars_{star}'] for star in range(1, 6)},
+                )
+
+    def review(self, name, rating, product=None):
+        return Review.objects.create(product=product or self.products[0], name=name, rating=rating)
+
+    def test_created_reviews_are_counted(self):
+        self.assertAggregatesMatch()
+        for name, rating in (('a', 5), ('b', 4), ('c', 4), ('d', 1)):
+            self.review(name, rating)
+        self.review('e', 2, self.products[1])
+        self.assertAggregatesMatch()
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual(product.average_rating, 3.5)
+        self.assertEqual(product.rating_histogram, {1: 1, 2: 0, 3: 0, 4: 2, 5: 1})
+
+    def test_rating_changes_move_the_review(self):
+        review = self.review('a', 5)
+        self.review('b', 3)
+        review.rating = 2
+        review.save()
+        # Saving again without a change must not count it twice
+        review.save()
+        self.assertAggregatesMatch()
+
+        # Reloaded reviews know their stored rating too
+        loaded = Review.objects.get(pk=review.pk)
+        loaded.rating = 4
+        loaded.save()
+        self.assertAggregatesMatch()
+
+    def test_reassigned_reviews_move_between_products(self):
+        review = self.review('a', 5)
+        self.review('b', 1, self.products[1])
+        review.product = self.products[1]
+        review.rating = 3
+        review.save()
+        self.assertAggregatesMatch()
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).review_count, 0)
+
+    def test_deleted_reviews_are_removed(self):
+        kept = self.review('a', 4)
+        self.review('b', 2).delete()
+        self.assertAggregatesMatch()
+
+        # An edit that was never saved does not change what is removed
+        kept.rating = 1
+        kept.delete()
+        self.review('c', 3)
+        self.review('d', 5)
+        Review.objects.filter(rating=5).delete()
+        self.assertAggregatesMatch()
+
+    def test_rebuild_repairs_the_counters(self):
+        for name, rating in (('a', 5), ('b', 4)):
+            self.review(name, rating)
+        self.review('c', 3, self.products[1])
+        Product.objects.update(review_count=0, rating_sum=0, rating_5_count=7)
+        self.assertEqual(rebuild_rating_aggregates(batch_size=1), 2)
+        self.assertAggregatesMatch()
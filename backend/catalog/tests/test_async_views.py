@@ -0,0 +1,116 @@
+import importlib
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches
+from rest_framework.permissions import IsAuthenticated
+
+from catalog.models import Category, Product
+from catalog.throttling import SlidingWindowThrottle
+from catalog.views import CategoryViewSet, ProductViewSet
+
+
+class ReadRateThrottle(SlidingWindowThrottle):
+    scope = 'reads'
+
+
+def reload_urlconf():
+    import backend.urls
+    import catalog.urls
+
+    importlib.reload(catalog.urls)
+    importlib.reload(backend.urls)
+    clear_url_caches()
+
+
+@override_settings(CATALOG_ASYNC_VIEWS=True)
+class AsyncViewsTests(TestCase):
+    """The URLconf with CATALOG_ASYNC_VIEWS on: async reads, with the viewsets' actions and checks."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Cleanups run last first: the URLconf is reloaded again once the setting is restored
+        cls.addClassCleanup(reload_urlconf)
+        super().setUpClass()
+        reload_urlconf()
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        for index in (1, 2):
+            Product.objects.create(
+                pk=index, name=f'Item {index}', sku=f'SKU-{index}', description='', price=Decimal('10.00'),
+                stock_quantity=3, category=category,
+            )
+        cls.user = get_user_model().objects.create_user('editor')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_are_served_by_the_async_views(self):
+        for url, name in (
+            ('/api/products/', 'product_list'),
+            ('/api/products/1/', 'product_detail'),
+            ('/api/products/1/reviews/', 'product_reviews'),
+            ('/api/categories/', 'category_list'),
+        ):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.resolver_match.func.__name__, name)
+
+    def test_collection_actions_reach_the_router(self):
+        # Signed in for the export
+        self.client.force_login(self.user)
+        for url in (
+            '/api/products/suggest/?q=item',
+            '/api/products/facets/',
+            '/api/products/batch/?ids=1,2',
+            '/api/products/export/',
+        ):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.resolver_match.url_name, 'product-' + url.split('/')[3])
+
+        response = self.client.post(
+            '/api/products/bulk/', {'items': [{'sku': 'SKU-1', 'price': '12.00'}]}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Product.objects.get(pk=1).price, Decimal('12.00'))
+
+    def test_unknown_ids_are_not_found(self):
+        self.assertEqual(self.client.get('/api/products/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/999/reviews/').status_code, 404)
+
+    def test_invalid_cursors_are_bad_requests(self):
+        for url in ('/api/products/?cursor=not-a-cursor', '/api/products/1/reviews/?cursor=not-a-cursor'):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_throttles_apply_to_cached_reads(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'reads': '2/hour'}
+        with (
+            override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}),
+            mock.patch.object(ProductViewSet, 'throttle_classes', [ReadRateThrottle]),
+            mock.patch.object(CategoryViewSet, 'throttle_classes', [ReadRateThrottle]),
+        ):
+            for url in ('/api/products/1/', '/api/categories/'):
+                with self.subTest(url):
+                    cache.clear()
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    # The second request is a response cache hit, the third is over the limit
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 429)
+                    self.assertIn('Retry-After', response)
+
+    def test_permissions_apply(self):
+        with mock.patch.object(ProductViewSet, 'permission_classes', [IsAuthenticated]):
+            self.assertEqual(self.client.get('/api/products/').status_code, 401)
+            self.client.force_login(self.user)
+            self.assertEqual(self.client.get('/api/products/').status_code, 200)
@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.authentication import USER_CLAIMS, VERSION_CLAIM, _users
+from catalog.models import Category, Product
+
+USER_TABLE = get_user_model()._meta.db_table
+PASSWORD = 'correct horse battery staple'
+PRODUCTS_URL = '/api/products/?limit=1'
+CART_URL = '/api/cart/'
+
+
+@override_settings(CATALOG_RESPONSE_CACHE_TIMEOUT=0, CATALOG_AUTH_USER_CACHE_TIMEOUT=30)
+class CachedJWTAuthenticationTests(TestCase):
+    """JWT users come from the per-process user cache, or the token claims, until they change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        Product.objects.create(
+            name='Headphones', description='Over-ear', price=Decimal('99.00'), stock_quantity=5, category=category,
+        )
+        cls.user = get_user_model().objects.create_user('reader', password=PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        _users.clear()
+
+    def login(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'reader', 'password': PASSWORD}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def save(self, **kwargs):
+        # Users are invalidated once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(**kwargs)
+
+    def bearer(self, access):
+        return self.client_class(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def get(self, client, url):
+        """GETs `url`; returns (status code, number of queries on the user table)."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = client.get(url)
+        return response.status_code, sum(USER_TABLE in query['sql'] for query in queries)
+
+    @override_settings(CATALOG_AUTH_TRUST_CLAIMS=False)
+    def test_users_are_cached_until_they_change(self):
+        client = self.bearer(self.login()['access'])
+        self.assertEqual(self.get(client, PRODUCTS_URL), (200, 1))
+        self.assertEqual(self.get(client, PRODUCTS_URL), (200, 0))
+
+        # Signing in elsewhere only updates last_login
+        self.user.last_login = self.user.date_joined
+        self.save(update_fields=['last_login'])
+        self.assertEqual(self.get(client, PRODUCTS_URL), (200, 0))
+
+        self.user.first_name = 'Changed'
+        self.save()
+        self.assertEqual(self.get(client, PRODUCTS_URL), (200, 1))
+
+    @override_settings(CATALOG_AUTH_TRUST_CLAIMS=True)
+    def test_catalog_reads_trust_the_token_claims(self):
+        tokens = self.login()
+        client = self.bearer(tokens['access'])
+        self.assertEqual(self.get(client, PRODUCTS_URL), (200, 0))
+        self.assertEqual(self.get(client, '/api/categories/'), (200, 0))
+        # Views that did not opt in still load the user
+        self.assertEqual(self.get(client, CART_URL), (200, 1))
+
+        refreshed = self.client.post(
+            '/api/auth/token/refresh/', {'refresh': tokens['refresh']}, content_type='application/json',
+        ).json()['access']
+        self.assertEqual(self.get(self.bearer(refreshed), PRODUCTS_URL), (200, 0))
+
+    @override_settings(CATALOG_AUTH_TRUST_CLAIMS=True)
+    def test_password_changes_stop_trusting_the_claims(self):
+        client = self.bearer(self.login()['access'])
+        self.user.set_password('another password')
+        self.save()
+        self.assertEqual(self.get(client, PRODUCTS_URL)[1], 1)
+
+    @override_settings(CATALOG_AUTH_TRUST_CLAIMS=True)
+    def test_deactivated_users_are_rejected(self):
+        client = self.bearer(self.login()['access'])
+        self.get(client, CART_URL)
+        self.user.is_active = False
+        self.save()
+        for url in (PRODUCTS_URL, CART_URL):
+            with self.subTest(url):
+                self.assertEqual(self.get(client, url)[0], 401)
+
+    def test_access_tokens_carry_the_claims(self):
+        payload = AccessToken(self.login()['access']).payload
+        for claim in (*USER_CLAIMS, VERSION_CLAIM):
+            self.assertIn(claim, payload)
@@ -0,0 +1,132 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from catalog import bulk
+from catalog.bulk import bulk_upsert_products
+from catalog.models import Category, Product
+
+
+class BulkUpsertTests(TestCase):
+    """Bulk upserts report every row, write the valid ones in chunks and all or nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Audio', slug='audio')
+        cls.existing = [
+            Product.objects.create(
+                name=f'Item {index}', sku=f'SKU-{index}', description='', price=Decimal('10.00'),
+                stock_quantity=1, category=cls.category,
+            )
+            for index in range(3)
+        ]
+
+    def new_row(self, sku, **fields):
+        return {'sku': sku, 'name': sku, 'description': 'New', 'price': '5.00', 'category_slug': 'audio', **fields}
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = [
+            self.new_row('NEW-1'),
+            {'sku': 'SKU-0', 'price': '-1'},
+            {'sku': 'SKU-1', 'category_slug': 'video'},
+            {'id': 999, 'price': '1.00'},
+            {'sku': 'NEW-2', 'price': '1.00'},
+            {'sku': 'SKU-2', 'category': self.category.pk, 'category_slug': 'audio'},
+            {'sku': 'SKU-0', 'stock_quantity': 4},
+            {'sku': 'SKU-0', 'stock_quantity': 5},
+            'not a row',
+        ]
+        report = bulk_upsert_products(rows)
+        self.assertEqual((report['created'], report['updated'], report['errors']), (1, 1, 7))
+        self.assertEqual([result['index'] for result in report['results']], list(range(len(rows))))
+        self.assertEqual(
+            [result['status'] for result in report['results']],
+            ['created', 'error', 'error', 'error', 'error', 'error', 'updated', 'error', 'error'],
+        )
+        errors = [result.get('errors') for result in report['results']]
+        self.assertIn('price', errors[1])
+        self.assertEqual(errors[2], {'category_slug': ['Unknown category.']})
+        self.assertEqual(errors[3], {'id': ['Product not found.']})
+        self.assertEqual(set(errors[4]), {'name', 'description', 'category'})
+        self.assertIn('non_field_errors', errors[5])
+        self.assertEqual(errors[7], {'non_field_errors': ['Duplicate row for the same product in this batch.']})
+
+        self.assertEqual(Product.objects.get(sku='NEW-1').price, Decimal('5.00'))
+        self.assertEqual(Product.objects.get(sku='SKU-0').stock_quantity, 4)
+        self.assertEqual(Product.objects.get(sku='SKU-1').category, self.category)
+        self.assertFalse(Product.objects.filter(sku='NEW-2').exists())
+
+    def test_writes_are_chunked(self):
+        rows = [self.new_row(f'NEW-{index}') for index in range(5)]
+        rows += [{'id': product.pk, 'price': '7.50'} for product in self.existing]
+        with mock.patch.object(bulk, 'WRITE_BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            report = bulk_upsert_products(rows)
+        self.assertEqual((report['created'], report['updated'], report['errors']), (5, 3, 0))
+
+        statements = [query['sql'].split(None, 1)[0] for query in queries.captured_queries]
+        self.assertEqual(statements.count('INSERT'), 3)
+        self.assertEqual(statements.count('UPDATE'), 2)
+        # All of them in one transaction
+        self.assertEqual(statements.count('SAVEPOINT'), 1)
+
+        created = {result['id'] for result in report['results'] if result['status'] == 'created'}
+        self.assertEqual(set(Product.objects.filter(sku__startswith='NEW-').values_list('pk', flat=True)), created)
+        prices = Product.objects.filter(sku__startswith='SKU-').values_list('price', flat=True)
+        self.assertEqual(set(prices), {Decimal('7.50')})
+
+    def test_integrity_errors_write_nothing(self):
+        rows = [
+            self.new_row('NEW-1'),
+            {'id': self.existing[0].pk, 'price': '1.00'},
+            # Takes the SKU of another product
+            {'id': self.existing[1].pk, 'sku': 'SKU-2'},
+        ]
+        with self.assertRaises(IntegrityError):
+            bulk_upsert_products(rows)
+        self.assertFalse(Product.objects.filter(sku='NEW-1').exists())
+        self.assertEqual(Product.objects.get(pk=self.existing[0].pk).price, Decimal('10.00'))
+
+
+class BulkEndpointTests(TestCase):
+    """POST /api/products/bulk/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        for index in range(2):
+            Product.objects.create(
+                name=f'Item {index}', sku=f'SKU-{index}', description='', price=Decimal('10.00'),
+                stock_quantity=1, category=category,
+            )
+        cls.user = get_user_model().objects.create_user('feed')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, data):
+        return self.client.post('/api/products/bulk/', data, content_type='application/json')
+
+    def test_report(self):
+        response = self.post({'items': [{'sku': 'SKU-0', 'price': '12.00'}, {'sku': 'SKU-1', 'price': 'x'}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(response.json()['results'][1]['status'], 'error')
+
+    def test_conflicting_batches_are_rejected(self):
+        other = Product.objects.get(sku='SKU-1')
+        # Valid rows, but the second takes the SKU of the first product
+        response = self.post({'items': [{'sku': 'SKU-0', 'price': '1.00'}, {'id': other.pk, 'sku': 'SKU-0'}]})
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.json()['detail'].startswith('Batch rejected'))
+        self.assertEqual(Product.objects.get(sku='SKU-0').price, Decimal('10.00'))
+
+    @override_settings(CATALOG_BULK_MAX_ROWS=2)
+    def test_batch_shape(self):
+        self.assertEqual(self.post({'items': {'sku': 'SKU-0'}}).status_code, 400)
+        self.assertEqual(self.post({'items': [{'sku': 'SKU-0'}] * 3}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.post({'items': []}).status_code, 401)
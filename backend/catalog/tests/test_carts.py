@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from catalog.carts import QuantityLimitExceeded, update_items
+from catalog.models import Cart, Category, Product, StockReservation
+
+
+@override_settings(CATALOG_CART_MAX_QUANTITY=10)
+class CartTests(TestCase):
+    """Cart items of anonymous and signed-in clients, the merge on sign-in and checkout."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.products = [
+            Product.objects.create(
+                name=f'Item {index}', description='', price=Decimal('10.00'), stock_quantity=5, category=category,
+            )
+            for index in range(3)
+        ]
+        cls.user = get_user_model().objects.create_user('buyer')
+
+    def jwt(self):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def send(self, method, items, status=200, **headers):
+        response = getattr(self.client, method)(
+            '/api/cart/items/', {'items': items}, content_type='application/json', **headers,
+        )
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def quantities(self, cart):
+        return {line['product']: line['quantity'] for line in cart['items']}
+
+    def test_add_sums_quantities(self):
+        first, second = self.products[0].pk, self.products[1].pk
+        self.send('post', [{'product': first, 'quantity': 2}])
+        cart = self.send('post', [{'product': first, 'quantity': 1}, {'product': second, 'quantity': 3}])
+        self.assertEqual(self.quantities(cart), {first: 3, second: 3})
+        self.assertEqual(cart['subtotal'], '60.00')
+        self.assertTrue(cart['checkout_ready'])
+
+    def test_replace_sets_and_removes(self):
+        first, second = self.products[0].pk, self.products[1].pk
+        self.send('post', [{'product': first, 'quantity': 2}, {'product': second, 'quantity': 3}])
+        cart = self.send('patch', [{'product': first, 'quantity': 7}, {'product': second, 'quantity': 0}])
+        self.assertEqual(self.quantities(cart), {first: 7})
+        # More than in stock is reported, not rejected
+        self.assertEqual(cart['items'][0]['problems'], [{'code': 'insufficient_stock', 'available': 5}])
+        self.assertFalse(cart['checkout_ready'])
+
+    def test_unknown_products_change_nothing(self):
+        self.send('post', [{'product': self.products[0].pk, 'quantity': 1}])
+        self.send('post', [{'product': self.products[0].pk, 'quantity': 1}, {'product': 999, 'quantity': 1}], 400)
+        self.assertEqual(self.quantities(self.client.get('/api/cart/').json()), {self.products[0].pk: 1})
+
+    def test_quantities_are_bounded(self):
+        product = self.products[0].pk
+        self.send('post', [{'product': product, 'quantity': 11}], 400)
+        self.send('post', [{'product': product, 'quantity': 6}])
+        # The total would go over the limit: nothing is added
+        self.send('post', [{'product': product, 'quantity': 5}], 400)
+        self.assertEqual(self.quantities(self.client.get('/api/cart/').json()), {product: 6})
+
+    def test_update_items_writes_nothing_over_the_limit(self):
+        cart = Cart.objects.create(user=self.user)
+        first, second = self.products[0].pk, self.products[1].pk
+        update_items(cart, {first: 2})
+        update_items(cart, {first: 3})
+        with self.assertRaises(QuantityLimitExceeded) as raised:
+            update_items(cart, {first: 6, second: 1})
+        self.assertEqual(raised.exception.product_ids, [first])
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {first: 5})
+
+    def test_anonymous_cart_is_merged_on_sign_in(self):
+        first, second = self.products[0].pk, self.products[1].pk
+        self.send('post', [{'product': first, 'quantity': 1}, {'product': second, 'quantity': 8}])
+        user_cart = Cart.objects.create(user=self.user)
+        update_items(user_cart, {second: 4, self.products[2].pk: 1})
+
+        # Same session, now with a token
+        cart = self.client.get('/api/cart/', **self.jwt()).json()
+        self.assertEqual(cart['id'], str(user_cart.pk))
+        # Quantities add up, to at most CATALOG_CART_MAX_QUANTITY
+        self.assertEqual(self.quantities(cart), {first: 1, second: 10, self.products[2].pk: 1})
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_anonymous_cart_is_adopted_without_a_user_cart(self):
+        self.send('post', [{'product': self.products[0].pk, 'quantity': 2}])
+        anonymous = Cart.objects.get()
+        cart = self.client.get('/api/cart/', **self.jwt()).json()
+        self.assertEqual(cart['id'], str(anonymous.pk))
+        self.assertEqual(Cart.objects.get().user, self.user)
+
+    def test_anonymous_changes_need_the_csrf_token(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.post(
+            '/api/cart/items/', {'items': [{'product': self.products[0].pk, 'quantity': 1}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+        response = client.post(
+            '/api/cart/items/', {'items': [{'product': self.products[0].pk, 'quantity': 1}]},
+            content_type='application/json', **self.jwt(),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_checkout_reserves_and_empties_the_cart(self):
+        product = self.products[0]
+        self.send('post', [{'product': product.pk, 'quantity': 2}], **self.jwt())
+        self.assertEqual(self.client.post('/api/cart/checkout/').status_code, 401)
+
+        response = self.client.post('/api/cart/checkout/', **self.jwt())
+        self.assertEqual(response.status_code, 201)
+        reservation = StockReservation.objects.get(pk=response.json()['id'])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(response.json()['items'], [{'product': product.pk, 'quantity': 2}])
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 3)
+
+        # The cart is empty now: a repeated checkout reserves nothing
+        self.assertEqual(self.client.post('/api/cart/checkout/', **self.jwt()).status_code, 400)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_checkout_keeps_the_cart_when_stock_is_short(self):
+        short, fine = self.products[0], self.products[1]
+        self.send('post', [{'product': short.pk, 'quantity': 6}, {'product': fine.pk, 'quantity': 1}], **self.jwt())
+        response = self.client.post('/api/cart/checkout/', **self.jwt())
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['products'], [short.pk])
+        self.assertEqual(self.quantities(response.json()['cart']), {short.pk: 6, fine.pk: 1})
+        self.assertEqual(Product.objects.get(pk=fine.pk).stock_quantity, 5)
+        self.assertFalse(StockReservation.objects.exists())
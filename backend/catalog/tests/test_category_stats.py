@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max, Min, Q, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from catalog.models import Category, Product, Review
+
+
+@override_settings(CATALOG_RESPONSE_CACHE_TIMEOUT=0)
+class CategoryStatsTests(TestCase):
+    """GET /api/categories/ reports product stats per category from one cached query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(title=f'Category {index}', slug=f'category-{index}') for index in range(4)]
+        # The last category has no products
+        for index in range(15):
+            product = Product.objects.create(
+                name=f'Product {index}', description='', price=Decimal('5.25') * (index + 1),
+                stock_quantity=index % 4, category=cls.categories[index % 3], is_available=index % 4 != 0,
+            )
+            for rating in range(1, index % 5 + 1):
+                Review.objects.create(product=product, name=f'Reviewer {rating}', rating=rating)
+
+    def setUp(self):
+        cache.clear()
+
+    def fetch(self):
+        response = self.client.get('/api/categories/', {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row for row in response.json()['results']}
+
+    def expected(self, category):
+        totals = Product.objects.filter(category=category).aggregate(
+            count=Count('id'), available=Count('id', filter=Q(is_available=True)),
+            min_price=Min('price'), max_price=Max('price'), reviews=Sum('review_count'), ratings=Sum('rating_sum'),
+        )
+        return {
+            'product_count': totals['count'],
+            'available_count': totals['available'],
+            'min_price': None if totals['min_price'] is None else f"{totals['min_price']:.2f}",
+            'max_price': None if totals['max_price'] is None else f"{totals['max_price']:.2f}",
+            'average_rating': round(totals['ratings'] / totals['reviews'], 2) if totals['reviews'] else 0,
+        }
+
+    def assertStatsMatch(self, stats):
+        for category in self.categories:
+            with self.subTest(category.slug):
+                expected = self.expected(category)
+                self.assertEqual({key: stats[category.pk][key] for key in expected}, expected)
+
+    def test_stats_match_per_category_queries(self):
+        self.assertStatsMatch(self.fetch())
+
+    def test_stats_cost_one_query_whatever_the_number_of_categories(self):
+        # Count, page and stats
+        with self.assertNumQueries(3):
+            self.fetch()
+        Category.objects.bulk_create([Category(title=f'Extra {index}', slug=f'extra-{index}') for index in range(20)])
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.fetch()
+
+    def test_cached_stats_cost_no_product_query(self):
+        self.fetch()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/categories/', {'limit': 100, 'ordering': '-title'})
+        self.assertFalse([query for query in queries if 'catalog_product' in query['sql']])
+
+    def test_product_changes_show_up_at_once(self):
+        self.fetch()
+        product = Product.objects.filter(category=self.categories[0], is_available=True).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price, product.is_available = Decimal('999.99'), False
+            product.save(update_fields=['price', 'is_available', 'updated_at'])
+        stats = self.fetch()
+        self.assertEqual(stats[self.categories[0].pk]['max_price'], '999.99')
+        self.assertStatsMatch(stats)
+
+    def test_review_changes_show_up_at_once(self):
+        self.fetch()
+        product = Product.objects.filter(category=self.categories[1]).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=product, name='Late reviewer', rating=5)
+        self.assertStatsMatch(self.fetch())
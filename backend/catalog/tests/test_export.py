@@ -0,0 +1,72 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from catalog.models import Category, Product
+
+
+@override_settings(
+    CATALOG_CONCURRENCY_LIMITS={'export': 1},
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'export': '3/hour'}},
+)
+class ExportTests(TestCase):
+    """Streaming exports: signed-in users only, rate limited per user and capped in number."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        for index in range(3):
+            Product.objects.create(
+                name=f'Item {index}', sku=f'SKU-{index}', description='', price=Decimal('10.00'),
+                stock_quantity=1, category=category,
+            )
+        users = get_user_model().objects
+        cls.user, cls.other = users.create_user('exporter'), users.create_user('other')
+
+    def setUp(self):
+        cache.clear()
+
+    def export(self, user, url='/api/products/export/'):
+        client = self.client_class()
+        client.force_login(user)
+        return client.get(url)
+
+    def test_requires_a_user(self):
+        self.assertEqual(self.client.get('/api/products/export/').status_code, 401)
+
+    def test_streams_the_products(self):
+        response = self.export(self.user, '/api/products/export/?fields=sku,price')
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, [{'sku': f'SKU-{index}', 'price': '10.00'} for index in range(3)])
+
+    def test_one_stream_at_a_time(self):
+        running = self.export(self.user)
+        # The first stream is still open
+        response = self.export(self.other)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        running.close()
+        self.assertEqual(self.export(self.other).status_code, 200)
+
+    def test_consumed_streams_give_their_slot_back(self):
+        for user in (self.user, self.other):
+            response = self.export(user)
+            self.assertEqual(response.status_code, 200)
+            # The test client closes a streaming response once it is read to the end
+            b''.join(response.streaming_content)
+
+    def test_exports_per_user(self):
+        statuses = []
+        for _ in range(4):
+            response = self.export(self.user)
+            statuses.append(response.status_code)
+            response.close()
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        response = self.export(self.other)
+        self.assertEqual(response.status_code, 200)
+        response.close()
@@ -0,0 +1,76 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.importer import load_chunk
+from catalog.models import Category, Product
+
+HEADER = ['sku', 'name', 'description', 'price', 'stock_quantity', 'category_slug']
+# Every other record is rejected (no price)
+RECORDS = [
+    ['A', 'Item A', 'x', '1.00', '1', 'audio'],
+    ['B', 'Item B', 'x', '', '1', 'audio'],
+    ['C', 'Item C', 'x', '2.00', '1', 'audio'],
+    ['D', 'Item D', 'x', '', '1', 'audio'],
+    ['E', 'Item E', 'x', '3.00', '1', 'audio'],
+    ['F', 'Item F', 'x', '', '1', 'audio'],
+    ['G', 'Item G', 'x', '4.00', '1', 'audio'],
+]
+
+
+class ImportCatalogTests(TestCase):
+    """import_catalog commits chunk by chunk and resumes from its checkpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.create(title='Audio', slug='audio')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'products.csv')
+        with open(self.path, 'w', encoding='utf-8', newline='') as source:
+            csv.writer(source).writerows([HEADER, *RECORDS])
+
+    def run_import(self, *args):
+        call_command('import_catalog', self.path, '--chunk-size=2', *args, stdout=StringIO())
+
+    def rejected_lines(self):
+        with open(f'{self.path}.rejects.csv', encoding='utf-8', newline='') as rejects:
+            return [row[0] for row in csv.reader(rejects)]
+
+    def test_import(self):
+        self.run_import()
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['A', 'C', 'E', 'G'])
+        self.assertEqual(self.rejected_lines(), ['line', '3', '5', '7'])
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+        # A fresh run starts a new report
+        self.run_import()
+        self.assertEqual(self.rejected_lines(), ['line', '3', '5', '7'])
+
+    def test_resume_after_a_failed_chunk(self):
+        calls = []
+
+        def fail_second_chunk(rows, connection):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return load_chunk(rows, connection)
+
+        target = 'catalog.management.commands.import_catalog.load_chunk'
+        with mock.patch(target, side_effect=fail_second_chunk), self.assertRaises(RuntimeError):
+            self.run_import()
+        # The first chunk (A, C) is committed; E and G were not
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['A', 'C'])
+        self.assertEqual(self.rejected_lines(), ['line', '3', '5', '7'])
+
+        self.run_import('--resume')
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['A', 'C', 'E', 'G'])
+        # Records read again after the checkpoint are not reported twice
+        self.assertEqual(self.rejected_lines(), ['line', '3', '5', '7'])
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
@@ -0,0 +1,19 @@
+from django.test import SimpleTestCase, override_settings
+
+
+class MetricsEndpointTests(SimpleTestCase):
+    """/metrics is never public in production."""
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='')
+    def test_forbidden_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='')
+    def test_served_without_a_token_in_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='s3cret')
+    def test_requires_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
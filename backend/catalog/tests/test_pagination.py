@@ -0,0 +1,124 @@
+import json
+from base64 import urlsafe_b64encode
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework.request import Request
+
+from catalog.models import Category, Product
+from catalog.pagination import KeysetPagination
+
+# Several products per price, so pages end in the middle of a tie
+PRICES = ['5.00', '10.00', '10.00', '10.00', '20.00', '20.00', '30.00']
+
+
+def cursor_token(payload):
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode('ascii')
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages of the product list: seeks past ties, links both ways and rejects bad cursors."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.products = [
+            Product.objects.create(
+                name=f'Item {index}', description='', price=Decimal(price), stock_quantity=1, category=category,
+            )
+            for index, price in enumerate(PRICES)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, page):
+        return [product['id'] for product in page['results']]
+
+    def walk(self, params):
+        """Follows next links from the first page; returns the ids of every page."""
+        pages = []
+        page = self.get('/api/products/', {'pagination': 'cursor', **params})
+        while True:
+            pages.append(self.ids(page))
+            if page['next'] is None:
+                return pages
+            page = self.get(page['next'])
+
+    def expected(self, *ordering):
+        return list(Product.objects.order_by(*ordering).values_list('pk', flat=True))
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        paginator.base_url = 'http://testserver/api/products/?ordering=created_at'
+        paginator.model = Product
+        paginator.ordering = [('created_at', False), ('id', False)]
+        product = self.products[2]
+        link = paginator.encode_cursor([product.created_at, product.pk], reverse=True)
+        query = parse_qs(urlparse(link).query)
+        self.assertEqual(query['ordering'], ['created_at'])
+
+        request = Request(RequestFactory().get('/api/products/', {'cursor': query['cursor'][0]}))
+        self.assertEqual(paginator.decode_cursor(request), {'v': [product.created_at, product.pk], 'r': True})
+
+    def test_pages_cover_every_row_once(self):
+        for ordering in ('price', '-price', 'name', '-created_at'):
+            with self.subTest(ordering=ordering):
+                pages = self.walk({'ordering': ordering, 'limit': 2})
+                self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+                # The primary key breaks ties in the direction of the last ordering field
+                pk = '-pk' if ordering.startswith('-') else 'pk'
+                self.assertEqual(sum(pages, []), self.expected(ordering, pk))
+
+    def test_previous_links(self):
+        first = self.get('/api/products/', {'pagination': 'cursor', 'ordering': 'price', 'limit': 3})
+        self.assertIsNone(first['previous'])
+        second = self.get(first['next'])
+        third = self.get(second['next'])
+        self.assertIsNone(third['next'])
+
+        back = self.get(third['previous'])
+        self.assertEqual(self.ids(back), self.ids(second))
+        back = self.get(back['previous'])
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertIsNone(back['previous'])
+        # And forward again from a page reached backwards
+        self.assertEqual(self.ids(self.get(back['next'])), self.ids(second))
+
+    def test_limit_offset_by_default(self):
+        page = self.get('/api/products/', {'ordering': 'price', 'limit': 2, 'offset': 2})
+        self.assertEqual(page['count'], len(PRICES))
+        self.assertEqual(self.ids(page), self.expected('price', 'pk')[2:4])
+        self.assertIn('offset=4', page['next'])
+
+    def test_invalid_cursors_are_bad_requests(self):
+        pk = self.products[0].pk
+        for cursor in (
+            'not-a-cursor',
+            '%%%',
+            cursor_token([1, 2]),
+            cursor_token({'v': ['10.00', pk]}),
+            cursor_token({'v': ['10.00'], 'r': 0}),
+            cursor_token({'v': ['ten', pk], 'r': 0}),
+            cursor_token({'v': [None, pk], 'r': 0}),
+            cursor_token({'v': [{'a': 1}, pk], 'r': 0}),
+            cursor_token({'v': 5, 'r': 0}),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/products/', {'ordering': 'price', 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+    def test_tampered_search_cursor(self):
+        for value in ('high', None, [1]):
+            with self.subTest(value=value):
+                token = cursor_token({'v': [value, self.products[0].pk], 'r': 0})
+                response = self.client.get('/api/products/', {'search': 'item', 'cursor': token})
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.test_settings import TEST_REPLICA_ALIAS
+from catalog.metrics import registry
+from catalog.models import Category, Product
+from catalog.routers import PIN_COOKIE
+
+ALIASES = (DEFAULT_DB_ALIAS, TEST_REPLICA_ALIAS)
+
+
+@override_settings(DATABASE_REPLICAS=[TEST_REPLICA_ALIAS], CATALOG_RESPONSE_CACHE_TIMEOUT=0)
+class ReplicaRoutingTests(TestCase):
+    """
+    Reads against two databases: the replica holds the catalog but never
+    receives later writes, so reading a write proves it came from the primary.
+    """
+    databases = set(ALIASES)
+
+    @classmethod
+    def setUpTestData(cls):
+        for alias in ALIASES:
+            category = Category.objects.using(alias).create(pk=1, title='Audio', slug='audio')
+            Product.objects.using(alias).create(
+                pk=1, name='Headphones', description='Over-ear', price=Decimal('99.00'),
+                stock_quantity=5, category=category,
+            )
+        cls.user = get_user_model().objects.create_user('buyer')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, client, url):
+        """GETs `url`; returns (response, {alias: number of queries})."""
+        contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in ALIASES}
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            response = client.get(url)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        self.assertEqual(response.status_code, 200, url)
+        return response, {alias: len(context) for alias, context in contexts.items() if len(context)}
+
+    def post_review(self, client, name):
+        response = client.post(
+            '/api/products/1/reviews/', {'name': name, 'rating': 5, 'comment': ''}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def review_names(self, response):
+        return [review['name'] for review in response.json()['results']]
+
+    def test_catalog_reads_use_the_replica(self):
+        for url in ('/api/products/', '/api/products/1/', '/api/categories/', '/api/products/1/reviews/'):
+            with self.subTest(url):
+                _, queries = self.get(self.client, url)
+                self.assertEqual(set(queries), {TEST_REPLICA_ALIAS})
+
+    def test_writes_pin_the_session_client(self):
+        self.client.force_login(self.user)
+        response = self.post_review(self.client, 'Mine')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        response, queries = self.get(self.client, '/api/products/1/reviews/')
+        self.assertEqual(set(queries), {DEFAULT_DB_ALIAS})
+        self.assertEqual(self.review_names(response), ['Mine'])
+
+        response, queries = self.get(self.client_class(), '/api/products/1/reviews/')
+        self.assertEqual(set(queries), {TEST_REPLICA_ALIAS})
+        self.assertEqual(self.review_names(response), [])
+
+    def test_writes_pin_jwt_clients_without_cookies(self):
+        token = RefreshToken.for_user(self.user).access_token
+        client = self.client_class(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.post_review(client, 'Mine')
+        client.cookies.clear()
+        _, queries = self.get(client, '/api/products/1/')
+        self.assertEqual(set(queries), {DEFAULT_DB_ALIAS})
+
+    @override_settings(CATALOG_RESPONSE_CACHE_TIMEOUT=60)
+    def test_pinned_clients_read_their_writes_with_the_response_cache(self):
+        self.client.force_login(self.user)
+        self.post_review(self.client, 'Mine')
+        # Another client caches the lagging replica's page under the new version
+        other = self.client_class()
+        for _ in range(2):
+            response, _ = self.get(other, '/api/products/1/reviews/')
+            self.assertEqual(self.review_names(response), [])
+            response, _ = self.get(other, '/api/products/1/')
+            self.assertEqual(response.json()['review_count'], 0)
+
+        response, _ = self.get(self.client, '/api/products/1/reviews/')
+        self.assertEqual(self.review_names(response), ['Mine'])
+        response, _ = self.get(self.client, '/api/products/1/')
+        self.assertEqual(response.json()['review_count'], 1)
+
+    @override_settings(CATALOG_RESPONSE_CACHE_TIMEOUT=60)
+    def test_replica_responses_are_not_served_to_primary_reads(self):
+        response, _ = self.get(self.client, '/api/products/1/')
+        with override_settings(DATABASE_REPLICAS=[]):
+            Product.objects.filter(pk=1).update(name='Renamed')
+            response, queries = self.get(self.client, '/api/products/1/')
+        self.assertEqual(set(queries), {DEFAULT_DB_ALIAS})
+        self.assertEqual(response.json()['name'], 'Renamed')
+
+    def test_query_metrics_per_alias(self):
+        self.get(self.client, '/api/products/')
+        self.client.force_login(self.user)
+        self.post_review(self.client, 'Mine')
+        metrics = registry.render()
+        for alias in ALIASES:
+            self.assertIn(f'database="{alias}"', metrics)
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from catalog.bulk import bulk_upsert_products
+from catalog.models import Category, Product, StockReservation
+from catalog.reservations import (
+    InsufficientStock, ReservationClosed, confirm_reservation, release_expired_reservations, release_reservation,
+    reserve_stock,
+)
+
+
+class ReservationTests(TestCase):
+    """Stock taken and returned by reservations, all or nothing and exactly once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.products = [
+            Product.objects.create(
+                name=f'Item {index}', sku=f'SKU-{index}', description='', price=Decimal('10.00'),
+                stock_quantity=stock, category=category,
+            )
+            for index, stock in enumerate((1, 5, 2))
+        ]
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock_quantity, product.is_available
+
+    def test_the_last_unit_is_reserved_once(self):
+        last = self.products[0]
+        reservation = reserve_stock([(last.pk, 1)])
+        self.assertEqual(self.stock(last), (0, False))
+        self.assertTrue(reservation.items.get().sold_out)
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock([(last.pk, 1)])
+        self.assertEqual(raised.exception.product_ids, [last.pk])
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_orders_are_all_or_nothing(self):
+        first, second, third = self.products
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock([(third.pk, 3), (second.pk, 2), (first.pk, 2)])
+        # Every short product is reported, not only the first one hit
+        self.assertEqual(raised.exception.product_ids, [first.pk, third.pk])
+        self.assertEqual([self.stock(product) for product in self.products], [(1, True), (5, True), (2, True)])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_returns_stock_and_availability(self):
+        first, second = self.products[:2]
+        reservation = reserve_stock([(first.pk, 1), (second.pk, 2)])
+        self.assertTrue(release_reservation(reservation.pk))
+        self.assertEqual(self.stock(first), (1, True))
+        self.assertEqual(self.stock(second), (5, True))
+        # Released once: a second release and a confirm change nothing
+        self.assertFalse(release_reservation(reservation.pk))
+        with self.assertRaises(ReservationClosed):
+            confirm_reservation(reservation.pk)
+        self.assertEqual(self.stock(second), (5, True))
+
+    def test_stock_returned_by_another_reservation_restores_availability(self):
+        third = self.products[2]
+        first_unit, last_unit = reserve_stock([(third.pk, 1)]), reserve_stock([(third.pk, 1)])
+        self.assertEqual(self.stock(third), (0, False))
+        release_reservation(first_unit.pk)
+        self.assertEqual(self.stock(third), (1, True))
+        release_reservation(last_unit.pk)
+        self.assertEqual(self.stock(third), (2, True))
+
+    def test_products_disabled_by_hand_stay_unavailable(self):
+        last = self.products[0]
+        reservation = reserve_stock([(last.pk, 1)])
+        last.refresh_from_db()
+        last.is_available = False
+        last.save()
+        release_reservation(reservation.pk)
+        self.assertEqual(self.stock(last), (1, False))
+
+    def test_products_disabled_by_a_bulk_write_stay_unavailable(self):
+        last = self.products[0]
+        reservation = reserve_stock([(last.pk, 1)])
+        bulk_upsert_products([{'sku': last.sku, 'is_available': False}])
+        release_reservation(reservation.pk)
+        self.assertEqual(self.stock(last), (1, False))
+
+    def test_confirmed_stock_stays_taken(self):
+        second = self.products[1]
+        reservation = reserve_stock([(second.pk, 2)])
+        self.assertEqual(confirm_reservation(reservation.pk).status, StockReservation.Status.CONFIRMED)
+        self.assertFalse(release_reservation(reservation.pk))
+        self.assertEqual(self.stock(second), (3, True))
+
+    def test_expiry_returns_stock_exactly_once(self):
+        first, second = self.products[:2]
+        expired = reserve_stock([(first.pk, 1), (second.pk, 1)], ttl=60)
+        pending = reserve_stock([(second.pk, 1)], ttl=600)
+        StockReservation.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stock(first), (1, True))
+        self.assertEqual(self.stock(second), (4, True))
+        with self.assertRaises(ReservationClosed) as raised:
+            confirm_reservation(expired.pk)
+        self.assertEqual(raised.exception.reservation.status, StockReservation.Status.EXPIRED)
+        self.assertEqual(StockReservation.objects.get(pk=pending.pk).status, StockReservation.Status.PENDING)
+
+    def test_confirming_after_expiry_returns_the_stock(self):
+        second = self.products[1]
+        reservation = reserve_stock([(second.pk, 2)], ttl=60)
+        StockReservation.objects.filter(pk=reservation.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(ReservationClosed):
+            confirm_reservation(reservation.pk)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stock(second), (5, True))
+
+
+class ReservationApiTests(TestCase):
+    """Reservations belong to the user who made them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.product = Product.objects.create(
+            name='Item', description='', price=Decimal('10.00'), stock_quantity=3, category=category,
+        )
+        users = get_user_model().objects
+        cls.owner, cls.other = users.create_user('owner'), users.create_user('other')
+        cls.staff = users.create_user('staff', is_staff=True)
+
+    def reserve(self, quantity):
+        return self.client.post(
+            '/api/reservations/', {'items': [{'product': self.product.pk, 'quantity': quantity}]},
+            content_type='application/json',
+        )
+
+    def test_requires_a_user(self):
+        self.assertEqual(self.reserve(1).status_code, 401)
+
+    def test_short_orders_are_conflicts(self):
+        self.client.force_login(self.owner)
+        response = self.reserve(4)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['products'], [self.product.pk])
+
+    def test_only_the_owner_and_staff_see_a_reservation(self):
+        self.client.force_login(self.owner)
+        response = self.reserve(2)
+        self.assertEqual(response.status_code, 201)
+        url = f'/api/reservations/{response.json()["id"]}/'
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url + 'release/').status_code, 404)
+        self.assertEqual(self.client.post(url + 'confirm/').status_code, 404)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_login(self.owner)
+        response = self.client.post(url + 'release/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'released')
+        self.assertEqual(self.client.post(url + 'release/').status_code, 409)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 3)
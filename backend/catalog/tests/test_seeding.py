@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from catalog.seeding import generate_chunk
+
+
+class GenerateChunkTests(SimpleTestCase):
+    """Seed data depends on the seed and the product number only."""
+
+    def generate(self, seed, sizes):
+        """Generates consecutive chunks of the given sizes; returns every product with its ratings."""
+        products, first = [], 1
+        for size in sizes:
+            chunk, reviews = generate_chunk((seed, first, size, 'uniform:0-5'))
+            ratings = [[] for _ in chunk]
+            for offset, _, rating in reviews:
+                ratings[offset].append(rating)
+            products.extend(zip(chunk, ratings))
+            first += size
+        return products
+
+    def test_batch_size_does_not_change_the_data(self):
+        expected = self.generate(42, [2500])
+        for sizes in ([1000, 1000, 500], [700, 1100, 700], [1, 2498, 1]):
+            with self.subTest(sizes=sizes):
+                self.assertEqual(self.generate(42, sizes), expected)
+        self.assertEqual(expected[1200][0]['name'].rsplit('#', 1)[1], '1201')
+
+    def test_seeds_differ(self):
+        self.assertNotEqual(self.generate(1, [50]), self.generate(2, [50]))
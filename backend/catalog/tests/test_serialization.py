@@ -0,0 +1,118 @@
+import datetime
+import decimal
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from catalog.models import Category, Product, Review
+from catalog.renderers import ORJSONRenderer
+
+# Values orjson encodes differently from DRF's encoder by default
+EDGE_CASES = {
+    'decimal': decimal.Decimal('19.90'),
+    'datetime': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'naive_datetime': datetime.datetime(2024, 5, 1, 12, 30),
+    'date': datetime.date(2024, 5, 1),
+    'time': datetime.time(8, 15, 30, 500),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Not found.'),
+    'separators': 'line\u2028paragraph\u2029',
+    'unicode': 'Café – 東京',
+    'float': [0.1, 4.35, 0.0001, 9999999999999998.0, -0.0],
+    'exponent_float': [1e16, 2.5e-7, 1e-05, -5.5e-05, -1.5e300],
+    'exponent_text': ['[1e5', ':0.00001'],
+    'big_int': 2 ** 70,
+    'int_keys': {1: 'one'},
+    'nested': [{'a': None, 'b': True}, ()],
+}
+
+LIST_URLS = [
+    '/api/products/?limit=100',
+    '/api/products/?limit=100&expand=description,rating_histogram',
+    '/api/products/?fields=id,name,price,category_title,average_rating,updated_at',
+    '/api/products/?pagination=cursor&ordering=-price&limit=5',
+    '/api/products/?pagination=cursor&ordering=created_at&limit=5',
+    '/api/products/?category_slug=audio&min_price=20&ordering=name',
+    '/api/products/?limit=5&expand=reviews',
+]
+
+
+class RendererTests(TestCase):
+    """ORJSONRenderer writes the same bytes as JSONRenderer."""
+
+    def assertSameBytes(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_edge_cases(self):
+        for name, value in EDGE_CASES.items():
+            with self.subTest(name):
+                self.assertSameBytes({name: value})
+
+    def test_edge_cases_together(self):
+        self.assertSameBytes(EDGE_CASES)
+
+    def test_plain_floats_use_orjson(self):
+        # Floats both write the same way do not force the fallback
+        data = {'average_rating': 4.35, 'ratings': [0.1, 1.0, 12345.678]}
+        with mock.patch.object(JSONRenderer, 'render', side_effect=AssertionError('fell back')):
+            self.assertEqual(ORJSONRenderer().render(data), b'{"average_rating":4.35,"ratings":[0.1,1.0,12345.678]}')
+
+    def test_top_level_values(self):
+        for value in (1e16, 1e-05, 4.35, 'text', [1e-07]):
+            with self.subTest(value):
+                self.assertSameBytes(value)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE_TIMEOUT=0)
+class FastListTests(TestCase):
+    """The values() list serializer (CATALOG_FAST_LIST) renders the same data as the regular one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        audio = Category.objects.create(title='Audio', slug='audio')
+        books = Category.objects.create(title='Books – Café', slug='books')
+        for index in range(12):
+            product = Product.objects.create(
+                name=f'Product {index} \u2028',
+                sku=f'SKU-{index}' if index % 3 else None,
+                description=f'Description {index}',
+                price=decimal.Decimal('9.99') * (index + 1),
+                stock_quantity=index,
+                category=audio if index % 2 else books,
+                image_url=None if index % 4 else f'https://example.com/{index}.png',
+                is_available=index % 5 != 0,
+            )
+            for rating in range(1, index % 6):
+                Review.objects.create(product=product, name=f'Reviewer {rating}', rating=rating, comment='Good')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, fast):
+        with self.settings(CATALOG_FAST_LIST=fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_list_pages_match(self):
+        for url in LIST_URLS:
+            with self.subTest(url):
+                regular, fast = self.get(url, False), self.get(url, True)
+                self.assertEqual(JSONRenderer().render(fast.data), JSONRenderer().render(regular.data))
+                self.assertEqual(ORJSONRenderer().render(regular.data), JSONRenderer().render(regular.data))
+
+    def test_next_cursor_pages_match(self):
+        url = '/api/products/?pagination=cursor&ordering=-price&limit=5'
+        next_link = self.get(url, False).data['next'].replace('http://testserver', '')
+        self.assertEqual(
+            JSONRenderer().render(self.get(next_link, True).data),
+            JSONRenderer().render(self.get(next_link, False).data),
+        )
+
+    def test_nested_reviews_use_regular_serializer(self):
+        response = self.get('/api/products/?limit=5&expand=reviews', True)
+        self.assertIn('reviews', response.data['results'][0])
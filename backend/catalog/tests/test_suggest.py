@@ -0,0 +1,129 @@
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from catalog import suggest
+from catalog.models import Category, Product
+from catalog.suggest import SuggestIndex, edit_distance
+
+NAMES = [
+    'Wireless Headphones', 'Headphone Stand', 'Wired Earbuds', 'Studio Monitor Headphones',
+    'Bluetooth Speaker', 'Portable Speaker Dock',
+]
+
+
+class SuggestIndexTests(SimpleTestCase):
+    """Prefix and typo-tolerant lookups of the in-memory index."""
+
+    def setUp(self):
+        self.index = SuggestIndex.build((pk, name, 'audio') for pk, name in enumerate(NAMES, 1))
+
+    def names(self, query, limit=8):
+        return [match['name'] for match in self.index.search(query, limit)]
+
+    def test_prefix_of_the_last_word(self):
+        self.assertEqual(self.names('head'), ['Headphone Stand', 'Wireless Headphones', 'Studio Monitor Headphones'])
+        self.assertEqual(self.names('spea'), ['Bluetooth Speaker', 'Portable Speaker Dock'])
+        self.assertEqual(self.names('zzz'), [])
+
+    def test_earlier_words_match_whole(self):
+        self.assertEqual(self.names('wireless head'), ['Wireless Headphones'])
+        self.assertEqual(self.names('wire head'), [])
+
+    def test_typos(self):
+        # One edit from "headphones", two from "headphone"
+        self.assertEqual(self.names('headphnes'), ['Wireless Headphones', 'Studio Monitor Headphones', 'Headphone Stand'])
+        self.assertEqual(self.names('speeker'), ['Bluetooth Speaker', 'Portable Speaker Dock'])
+        # A typo in the word being typed
+        self.assertEqual(self.names('bluetoth sp'), ['Bluetooth Speaker'])
+        # Short words must match exactly
+        self.assertEqual(self.names('spk'), [])
+
+    def test_ranking(self):
+        # Fewer edits first, then names starting with the query, then shorter names
+        self.assertEqual(self.names('wired'), ['Wired Earbuds', 'Wireless Headphones'])
+        self.assertEqual(self.names('headphones', limit=2), ['Wireless Headphones', 'Studio Monitor Headphones'])
+        self.assertEqual(self.names('w'), ['Wired Earbuds', 'Wireless Headphones'])
+
+    def test_updates_keep_the_vocabulary_sorted(self):
+        self.index.add(1, 'Noise Cancelling Headset', 'audio')
+        self.index.add(7, 'Acoustic Panel', 'studio')
+        self.index.remove(5)
+        self.assertEqual(self.index.vocabulary, sorted(self.index.vocabulary))
+        self.assertNotIn('wireless', self.index.vocabulary)
+        self.assertNotIn('bluetooth', self.index.vocabulary)
+        self.assertEqual(self.names('headse'), ['Noise Cancelling Headset'])
+        self.assertEqual(self.index.search('acous'), [{'id': 7, 'name': 'Acoustic Panel', 'category_slug': 'studio'}])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('speaker', 'speakre', 2), 1)
+        self.assertEqual(edit_distance('speaker', 'sepaker', 2), 1)
+        self.assertEqual(edit_distance('headphones', 'hedphnes', 2), 2)
+        self.assertEqual(edit_distance('speaker', 'station', 2), 3)
+
+
+class SuggestEndpointTests(TestCase):
+    """The worker index behind /api/products/suggest/ follows product writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='Audio', slug='audio')
+        cls.products = [
+            Product.objects.create(
+                name=name, description='', price=Decimal('10.00'), stock_quantity=1, category=cls.category,
+            )
+            for name in NAMES
+        ]
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(suggest, '_state', suggest._IndexState())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def names(self, query):
+        response = self.client.get('/api/products/suggest/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [match['name'] for match in response.json()]
+
+    def test_suggestions(self):
+        self.assertEqual(self.names('speeker'), ['Bluetooth Speaker', 'Portable Speaker Dock'])
+        self.assertEqual(self.names('s'), [])
+
+    def test_saved_products_are_picked_up(self):
+        self.assertEqual(self.names('amp'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.products[0]
+            product.name = 'Wireless Amplifier'
+            product.save()
+            Product.objects.create(
+                name='Tube Amp', description='', price=Decimal('99.00'), stock_quantity=1, category=self.category,
+            )
+        self.assertEqual(self.names('amp'), ['Tube Amp', 'Wireless Amplifier'])
+        self.assertEqual(self.names('wireless head'), [])
+
+    def test_deleted_products_are_dropped(self):
+        self.assertEqual(self.names('portable'), ['Portable Speaker Dock'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[-1].delete()
+        self.assertEqual(self.names('portable'), [])
+
+    def test_concurrent_requests_build_the_index_once(self):
+        built = []
+
+        def build(rows):
+            built.append(threading.get_ident())
+            time.sleep(0.05)
+            return SuggestIndex()
+
+        with mock.patch.object(SuggestIndex, 'build', side_effect=build):
+            threads = [threading.Thread(target=suggest._sync) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(built), 1)
@@ -0,0 +1,131 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.request import Request
+
+from catalog.metrics import registry
+from catalog.models import Category, Product, Review
+from catalog.throttling import SignupRateThrottle, limit_concurrency
+
+RATES = {'signup': '3/hour', 'signup_total': '5/hour', 'reviews': '2/hour'}
+
+
+def throttle_rates(rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+@throttle_rates({'signup': '10/minute'})
+class SlidingWindowTests(SimpleTestCase):
+    """The weighted count of the current and previous windows, and Retry-After."""
+
+    def setUp(self):
+        cache.clear()
+
+    def allow(self, at):
+        """Checks a signup request at `at` seconds; returns the throttle and whether it was allowed."""
+        request = Request(RequestFactory().post('/api/auth/admin/signup/', REMOTE_ADDR='192.0.2.1'))
+        throttle = SignupRateThrottle()
+        with mock.patch.object(throttle, 'timer', return_value=at):
+            return throttle, throttle.allow_request(request, None)
+
+    def fill(self, at, count):
+        for _ in range(count):
+            self.assertTrue(self.allow(at)[1])
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.fill(100 * 60, 8)
+        # Half into the next minute: 8 * 0.5 + 6 = 10 fits, a 7th would not
+        self.fill(101 * 60 + 30, 6)
+        self.assertFalse(self.allow(101 * 60 + 30)[1])
+
+    def test_retry_after_is_when_the_retry_fits(self):
+        self.fill(100 * 60, 8)
+        self.fill(101 * 60 + 30, 6)
+        throttle, allowed = self.allow(101 * 60 + 30)
+        self.assertFalse(allowed)
+        # 8 * (1 - x) + 7 <= 10 from x = 0.625 of the minute on, 7.5 seconds later
+        self.assertAlmostEqual(throttle.wait(), 7.5)
+        self.assertFalse(self.allow(101 * 60 + 37.4)[1])
+        self.assertTrue(self.allow(101 * 60 + 37.6)[1])
+
+    def test_retry_after_past_the_window(self):
+        self.fill(101 * 60, 10)
+        throttle, allowed = self.allow(101 * 60 + 45)
+        self.assertFalse(allowed)
+        # The next minute starts with 10 previous requests: 10 * (1 - x) + 1 <= 10 from x = 0.1
+        self.assertAlmostEqual(throttle.wait(), 15 + 6)
+        self.assertFalse(self.allow(102 * 60 + 5.9)[1])
+        self.assertTrue(self.allow(102 * 60 + 6.1)[1])
+
+
+@override_settings(CATALOG_CONCURRENCY_LIMITS={'signup': 1, 'reviews': 1})
+@throttle_rates(RATES)
+class RateLimitTests(TestCase):
+    """Rate limits answer 429 with Retry-After, concurrency limits 503; both show on /metrics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(title='Audio', slug='audio')
+        cls.product = Product.objects.create(
+            name='Headphones', description='Over-ear', price=Decimal('99.00'), stock_quantity=5, category=category,
+        )
+        User = get_user_model()
+        cls.users = [User.objects.create_user(f'reviewer-{index}') for index in range(2)]
+        cls.reviews_url = f'/api/products/{cls.product.pk}/reviews/'
+
+    def setUp(self):
+        cache.clear()
+
+    def signup(self, address):
+        return self.client_class(REMOTE_ADDR=address).post('/api/auth/admin/signup/')
+
+    def review(self, user, name):
+        client = self.client_class()
+        client.force_login(user)
+        return client.post(self.reviews_url, {'name': name, 'rating': 4, 'comment': ''}, content_type='application/json')
+
+    def test_signups_per_client(self):
+        statuses = [self.signup('192.0.2.1').status_code for _ in range(4)]
+        self.assertEqual(statuses, [201, 201, 201, 429])
+        response = self.signup('192.0.2.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_signups_overall(self):
+        for _ in range(5):
+            self.signup('192.0.2.1')
+        # Rejected requests do not count towards the overall limit
+        statuses = [self.signup(f'192.0.2.{index}').status_code for index in (2, 3, 4)]
+        self.assertEqual(statuses, [201, 201, 429])
+
+    def test_reviews_per_user(self):
+        statuses = [self.review(self.users[0], f'Review {index}').status_code for index in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+        self.assertEqual(self.client.get(self.reviews_url).status_code, 200)
+        self.assertEqual(self.review(self.users[1], 'Other').status_code, 201)
+
+    @throttle_rates({})
+    def test_requests_beyond_the_concurrency_limit_are_shed(self):
+        # Occupy the only slot, as a request still running would
+        with limit_concurrency('signup'):
+            response = self.signup('198.51.100.1')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.signup('198.51.100.1').status_code, 201)
+
+        with limit_concurrency('reviews'):
+            self.assertEqual(self.review(self.users[1], 'Shed').status_code, 503)
+        self.assertFalse(Review.objects.filter(name='Shed').exists())
+
+    def test_rejections_are_reported(self):
+        for _ in range(6):
+            self.signup('192.0.2.1')
+        with limit_concurrency('signup'):
+            self.signup('198.51.100.1')
+        metrics = registry.render()
+        self.assertIn('reason="rate_limit",scope="signup"', metrics)
+        self.assertIn('reason="overload",scope="signup"', metrics)
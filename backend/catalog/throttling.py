@@ -0,0 +1,240 @@
+"""
+Rate limiting and load shedding for expensive endpoints.
+
+SlidingWindowThrottle is a DRF throttle whose counters live in the catalog
+cache, so every worker shares them when that cache is shared (Redis). It
+approximates a sliding window from two fixed windows: the count of the
+current window plus the previous window's count weighted by how much of it
+still overlaps the sliding window. Counters are bumped with atomic
+cache.incr, so concurrent requests cannot slip past the limit together.
+Rejected requests give their count back, and throttles listed after the
+one that rejected a request do not count it, so a client hammering its own
+limit does not use up an endpoint-wide one. Rates come from
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] by scope.
+
+limit_concurrency() sheds load instead: at most
+CATALOG_CONCURRENCY_LIMITS[name] requests of a kind run at once across all
+workers, and the others get an immediate 503 rather than queueing for CPU.
+Each running request holds one of `limit` lease keys in the cache, taken
+with cache.add; leases expire after CATALOG_CONCURRENCY_LEASE_SECONDS, so a
+killed worker cannot hold its slot forever. Streaming responses, which run
+after the view returns, take their slot with acquire_slot() and give it
+back once the response is closed.
+
+Rejected requests are counted on /metrics by reason and scope.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import get_cache
+from .metrics import registry
+
+_rejections = {}  # (reason, scope) -> count
+_rejections_lock = threading.Lock()
+
+
+def _count_rejection(reason, scope):
+    with _rejections_lock:
+        _rejections[reason, scope] = _rejections.get((reason, scope), 0) + 1
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding-window rate limit of `scope`, per client IP ('ip'), per user with
+    the IP for anonymous requests ('user'), or for all clients ('endpoint').
+    """
+    key_by = 'ip'
+    # Only requests with these methods are throttled; None throttles all
+    methods = None
+
+    def get_rate(self):
+        # Read on every request rather than at import, so settings overrides apply
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if self.key_by == 'endpoint':
+            ident = 'all'
+        elif self.key_by == 'user' and request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'catalog:throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if self.rate is None or (self.methods is not None and request.method not in self.methods):
+            return True
+        if getattr(request, '_throttled', False):
+            # Already rejected by a throttle checked before this one
+            return True
+        key = self.get_cache_key(request, view)
+        cache = get_cache()
+        now = self.timer()
+        window, self.elapsed = divmod(now / self.duration, 1)
+        current_key = f'{key}:{int(window)}'
+        # Counters outlive their window by one, while they still weigh on the next
+        cache.add(current_key, 0, self.duration * 2)
+        try:
+            self.current = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(current_key, 1, self.duration * 2)
+            self.current = 1
+        self.previous = cache.get(f'{key}:{int(window) - 1}', 0)
+        if self.previous * (1 - self.elapsed) + self.current <= self.num_requests:
+            return True
+        try:
+            cache.decr(current_key)
+        except ValueError:
+            pass
+        request._throttled = True
+        _count_rejection('rate_limit', self.scope)
+        return False
+
+    def wait(self):
+        """Seconds until a retry fits under the limit, if no other request comes (a hint for Retry-After)."""
+        # self.current includes the rejected request, as the retry's count would
+        if self.current <= self.num_requests:
+            # The previous window's weight has to fall until previous * (1 - elapsed) + current fits
+            fits_at = 1 - (self.num_requests - self.current) / self.previous
+            return max(fits_at - self.elapsed, 0) * self.duration
+        # Not before the next window, where this one's requests weigh in as the previous count
+        previous = max(self.current - 1, 1)
+        fits_at = max(1 - (self.num_requests - 1) / previous, 0)
+        return (1 - self.elapsed + fits_at) * self.duration
+
+
+class SignupRateThrottle(SlidingWindowThrottle):
+    scope = 'signup'
+
+
+class SignupTotalRateThrottle(SlidingWindowThrottle):
+    """Caps signups from all clients together, whatever addresses they come from."""
+    scope = 'signup_total'
+    key_by = 'endpoint'
+
+
+class ReviewRateThrottle(SlidingWindowThrottle):
+    scope = 'reviews'
+    key_by = 'user'
+    methods = ('POST',)
+
+
+class CheckoutRateThrottle(SlidingWindowThrottle):
+    """Caps how often a user can hold stock by checking out carts."""
+    scope = 'checkout'
+    key_by = 'user'
+
+
+class ExportRateThrottle(SlidingWindowThrottle):
+    """Caps how often a user can stream the whole catalog."""
+    scope = 'export'
+    key_by = 'user'
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy, please retry shortly.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait=1):
+        super().__init__()
+        # DRF's exception handler turns it into a Retry-After header
+        self.wait = wait
+
+
+def acquire_slot(name, lease=None):
+    """
+    Takes one of the CATALOG_CONCURRENCY_LIMITS[name] slots for `lease`
+    seconds at most (default CATALOG_CONCURRENCY_LEASE_SECONDS), or raises
+    Overloaded (503) when all are in use. Returns a function giving it back,
+    which may be called more than once.
+    """
+    limit = getattr(settings, 'CATALOG_CONCURRENCY_LIMITS', {}).get(name)
+    if not limit:
+        return lambda: None
+    cache = get_cache()
+    if lease is None:
+        lease = getattr(settings, 'CATALOG_CONCURRENCY_LEASE_SECONDS', 30)
+    # Start from a random slot so requests do not all probe the first ones
+    start = random.randrange(limit)
+    for offset in range(limit):
+        key = f'catalog:inflight:{name}:{(start + offset) % limit}'
+        if cache.add(key, 1, lease):
+            break
+    else:
+        _count_rejection('overload', name)
+        raise Overloaded()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            # Only once: the slot may belong to another request by then
+            released = True
+            cache.delete(key)
+
+    return release
+
+
+class SlotReleasingStream:
+    """
+    The content of a streaming response that gives its slot (see
+    acquire_slot) back when the response is closed, streamed or not.
+    """
+
+    def __init__(self, iterable, release):
+        self.iterable = iterable
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        # Django closes the content of a streaming response along with the response
+        try:
+            close = getattr(self.iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.release()
+
+
+@contextmanager
+def limit_concurrency(name):
+    """
+    Runs the block in one of the CATALOG_CONCURRENCY_LIMITS[name] slots or
+    raises Overloaded (503) when all are in use. Works as a decorator too.
+    """
+    release = acquire_slot(name)
+    try:
+        yield
+    finally:
+        release()
+
+
+def rejection_metrics():
+    """Metric lines of the requests rejected by this process, in the Prometheus text format."""
+    with _rejections_lock:
+        rejections = dict(_rejections)
+    if not rejections:
+        return []
+    name = 'http_requests_rejected_total'
+    lines = [
+        f'# HELP {name} Requests rejected by rate limits (429) or load shedding (503), by scope.',
+        f'# TYPE {name} counter',
+    ]
+    lines += [
+        f'{name}{{reason="{reason}",scope="{scope}"}} {count}'
+        for (reason, scope), count in sorted(rejections.items())
+    ]
+    return lines
+
+
+registry.add_collector(rejection_metrics)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -6,14 +7,41 @@ from . import views
 router = DefaultRouter()
 router.register(r'products', views.ProductViewSet, basename='product')
 router.register(r'categories', views.CategoryViewSet, basename='category')
+router.register(r'reservations', views.StockReservationViewSet, basename='reservation')
+router.register(r'cart', views.CartViewSet, basename='cart')
 
 # The API URLs are now determined automatically by the router.
 # The URL structure will be:
 # /products/
+# /products/suggest/ (Custom action)
+# /products/facets/ (Custom action)
+# /products/batch/ (Custom action)
+# /products/bulk/ (Custom action, POST)
+# /products/export/ (Custom action, streaming)
 # /products/{pk}/
 # /products/{pk}/reviews/ (Custom action)
 # /categories/
+# /reservations/ (POST)
+# /reservations/{id}/
+# /reservations/{id}/confirm/ (Custom action, POST)
+# /reservations/{id}/release/ (Custom action, POST)
+# /cart/
+# /cart/items/ (Custom action, POST/PATCH/DELETE)
+# /cart/checkout/ (Custom action, POST)
 
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+# ASGI deployments can serve the hot reads from async views (catalog.async_views);
+# writes on the same URLs still reach the viewsets above. Product ids are matched
+# as integers, so the collection actions (suggest/, facets/, ...) still reach the router.
+if settings.CATALOG_ASYNC_VIEWS:
+    from . import async_views
+
+    urlpatterns = [
+        path('products/', async_views.product_list, name='product-list'),
+        path('products/<int:pk>/', async_views.product_detail, name='product-detail'),
+        path('products/<int:pk>/reviews/', async_views.product_reviews, name='product-reviews'),
+        path('categories/', async_views.category_list, name='category-list'),
+    ] + urlpatterns
@@ -2,69 +2,459 @@ from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 
-from .models import Category, Product, Review
-from .serializers import CategorySerializer, ProductSerializer, ReviewSerializer
-from .filters import ProductFilter
+from .authentication import CachedJWTAuthentication
+from .models import Cart, Category, Product, Review, StockReservation
+from .serializers import (
+    CartUpdateSerializer, CategorySerializer, ProductListSerializer, ProductListValuesSerializer, ProductSerializer,
+    ReviewSerializer, StockReservationSerializer, select_fields,
+)
+from .filters import ProductFilter, ProductSearchFilter
+from .bulk import bulk_upsert_products
+from .carts import QuantityLimitExceeded, get_cart, price_cart, update_items
+from .cache import (
+    RESPONSE_CACHE_NAMESPACE, CachedResponseMixin, cached_many, filter_signature, get_version, variant_key,
+)
+from .export import EXPORT_FORMATS, resolve_columns, stream_export
+from .facets import cached_facets, category_stats
+from .pagination import CatalogPagination, KeysetPagination
+from .reservations import (
+    InsufficientStock, ReservationClosed, confirm_reservation, release_reservation, reserve_stock,
+)
+from .routers import ReplicaReadMixin, cache_variant
+from .suggest import suggest
+from .throttling import (
+    CheckoutRateThrottle, ExportRateThrottle, ReviewRateThrottle, SlotReleasingStream, acquire_slot, limit_concurrency,
+)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+# Review orderings, each matching one of the Review indexes
+REVIEW_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    '-rating': ('-rating', '-created_at', '-id'),
+    'rating': ('rating', 'created_at', 'id'),
+}
+
+def filter_reviews(product_id, params):
+    """
+    Reviews of a product filtered by ?rating= and ordered by ?ordering=.
+    Newest first by default; every option is served by a (product, ...) index.
+    """
+    reviews = Review.objects.filter(product_id=product_id)
+    rating = params.get('rating')
+    if rating:
+        if rating not in {'1', '2', '3', '4', '5'}:
+            raise ValidationError({'rating': 'Rating must be between 1 and 5.'})
+        reviews = reviews.filter(rating=int(rating))
+    ordering = params.get('ordering', '-created_at')
+    if ordering not in REVIEW_ORDERINGS:
+        raise ValidationError({'ordering': f'Choose one of: {", ".join(REVIEW_ORDERINGS)}.'})
+    return reviews.order_by(*REVIEW_ORDERINGS[ordering])
+
+class CategoryViewSet(ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     CRUD ViewSet for product categories.
     Public can read; write operations require authentication.
+    Each category carries its product and available counts, price range and
+    average rating, from one cached GROUP BY over the products.
+    Reads are served from the versioned response cache, or a read replica.
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Reads only need to know whether the user is authenticated (see catalog.authentication)
+    trust_token_claims = True
     filter_backends = [OrderingFilter]
     ordering_fields = ['title', 'created_at']
+    # Preloaded by the async views, which cannot query from get_serializer_context()
+    preloaded_stats = None
+
+    def get_serializer_context(self):
+        """Adds the cached product stats of every category (one query on a cache miss)."""
+        context = super().get_serializer_context()
+        context['category_stats'] = self.preloaded_stats if self.preloaded_stats is not None else category_stats()
+        return context
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     A ViewSet for listing, retrieving, creating, updating, and deleting products.
     Includes filtering, searching, and custom actions for reviews.
+    List and detail reads are served from the versioned response cache.
+    Safe-method requests read from a replica when DATABASE_REPLICAS are set.
     """
-    # Prefetch related reviews to avoid N+1 query problem, especially for detail view
-    queryset = Product.objects.select_related('category').prefetch_related(
-        Prefetch('reviews', queryset=Review.objects.all().order_by('-created_at'))
-    )
+    queryset = Product.objects.select_related('category')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # Reads only need to know whether the user is authenticated (see catalog.authentication)
+    trust_token_claims = True
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
-    # Search and ordering leverage DRF's built-in filters
-    search_fields = ['name', 'description', 'category__title']
+    # ?search= uses the full-text index (name > category title > description);
+    # ordering leverages DRF's built-in filter
     ordering_fields = ['name', 'price', 'stock_quantity', 'created_at']
+    # Limit/offset by default; ?pagination=cursor opts into keyset pagination
+    pagination_class = CatalogPagination
+
+    def get_serializer_class(self):
+        # The list and batch endpoints use the compact representation without nested reviews
+        if self.action in ('list', 'batch'):
+            return ProductListValuesSerializer if self.use_values_serializer() else ProductListSerializer
+        return ProductSerializer
+
+    def use_values_serializer(self):
+        """Whether the list renders values() rows (CATALOG_FAST_LIST), which is not done for nested reviews."""
+        if self.action != 'list' or not getattr(settings, 'CATALOG_FAST_LIST', False):
+            return False
+        meta = ProductListSerializer.Meta
+        return 'reviews' not in select_fields(meta.fields, self.request, meta.expandable_fields)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_values_serializer():
+            queryset = self.get_serializer().values_queryset(queryset)
+        return queryset
+
+    def get_last_modified(self):
+        # Detail responses carry Last-Modified from the product's updated_at
+        if self.action != 'retrieve':
+            return None
+        try:
+            return Product.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        except (ValueError, DjangoValidationError):
+            return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Prefetch reviews only when the response actually renders them
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(serializer_class.Meta, 'expandable_fields', ())
+        if self.action != 'reviews' and 'reviews' in select_fields(serializer_class.Meta.fields, self.request, expandable):
+            queryset = queryset.prefetch_related(
+                Prefetch('reviews', queryset=Review.objects.all().order_by('-created_at'))
+            )
+        return queryset
+
+    # --- Multi-get ---
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        Fetches many products by id, in the requested order, in the list
+        representation (?fields= and ?expand= apply).
+        GET: /api/products/batch/?ids=3,1,2
+        Products are cached per id; only cache misses are read, in one query.
+        Ids without a product are returned in "missing".
+        """
+        max_ids = getattr(settings, 'CATALOG_BATCH_MAX_IDS', 250)
+        try:
+            ids = list(dict.fromkeys(
+                int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()
+            ))
+        except ValueError:
+            raise ValidationError({'ids': 'Expected comma separated product ids.'})
+        if not ids:
+            raise ValidationError({'ids': 'Give at least one product id.'})
+        if len(ids) > max_ids:
+            raise ValidationError({'ids': f'At most {max_ids} ids per request.'})
+
+        def load(missing):
+            products = list(self.get_queryset().in_bulk(missing).values())
+            serializer = self.get_serializer(products, many=True)
+            # Keyed by the instances, as ?fields= may leave out the id
+            return {product.pk: dict(item) for product, item in zip(products, serializer.data)}
+
+        timeout = getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 60)
+        variant = cache_variant()
+        if timeout and variant is not None:
+            # Entries expire with the response cache version; the representation depends on ?fields=/?expand=
+            prefix = 'catalog:product:{}:{}'.format(
+                variant_key(get_version(RESPONSE_CACHE_NAMESPACE), variant),
+                filter_signature(request, ignore=set(request.query_params) - {'fields', 'expand'}),
+            )
+            found = cached_many(prefix, ids, load, timeout)
+        else:
+            found = load(ids)
+        return Response({
+            'results': [found[pk] for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    # --- Autocomplete ---
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Typo-tolerant product name suggestions for the search box.
+        GET: /api/products/suggest/?q=headphnes&limit=8
+        Served from an in-memory index, so no list query or serializer runs.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        if len(query) < 2:
+            return Response([])
+        return Response(suggest(query, limit))
+
+    # --- Facets ---
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Category, price range, availability and rating counts for the current
+        filters and search, computed in two aggregated queries and cached.
+        GET: /api/products/facets/?search=...&category_slug=...&min_price=...
+        """
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        search_term = request.query_params.get(ProductSearchFilter.search_param, '').replace('\x00', '')
+        return Response(cached_facets(request, Product.objects.all(), filterset.form.cleaned_data, search_term))
+
+    # --- Streaming Export ---
+
+    @action(
+        detail=False, methods=['get'],
+        permission_classes=[IsAuthenticated], throttle_classes=[ExportRateThrottle],
+    )
+    def export(self, request):
+        """
+        Streams every product matching the list filters as NDJSON or CSV.
+        GET: /api/products/export/?output=csv&fields=sku,name,price&category_slug=...
+        Rows are read in chunks and written as they arrive, so memory stays
+        flat and neither pagination nor a count query runs.
+        Signed-in users only, rate limited per user, and at most
+        CATALOG_CONCURRENCY_LIMITS["export"] streams hold a cursor at once (503).
+        """
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Choose one of: {", ".join(EXPORT_FORMATS)}.'})
+        requested = [name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()]
+        try:
+            columns = resolve_columns(requested)
+        except ValueError as exc:
+            raise ValidationError({'fields': str(exc)})
+
+        # Same filters, search and ordering as the list endpoint, without its joins
+        queryset = self.filter_queryset(Product.objects.all())
+        _, content_type, extension = EXPORT_FORMATS[export_format]
+        # Held until the stream is closed, which is after this view returns
+        release = acquire_slot('export', lease=getattr(settings, 'CATALOG_EXPORT_LEASE_SECONDS', 900))
+        response = StreamingHttpResponse(
+            SlotReleasingStream(stream_export(queryset, columns, export_format), release), content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{extension}"'
+        return response
+
+    # --- Bulk Upsert (Catalog Sync) ---
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates or updates many products in one request.
+        POST: /api/products/bulk/ with {"items": [{"sku": "...", "price": "9.99", ...}, ...]}
+        Rows are matched by id or sku and categories given by id or slug.
+        Returns a per-row report; invalid rows are skipped, the rest is written.
+        """
+        rows = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'items': 'Expected a list of product rows.'})
+        max_rows = getattr(settings, 'CATALOG_BULK_MAX_ROWS', 5000)
+        if len(rows) > max_rows:
+            raise ValidationError({'items': f'At most {max_rows} rows per request.'})
+
+        try:
+            report = bulk_upsert_products(rows)
+        except IntegrityError as exc:
+            # e.g. a SKU taken by a concurrent writer; nothing was written
+            return Response({'detail': f'Batch rejected: {exc}'}, status=status.HTTP_409_CONFLICT)
+        return Response(report)
 
     # --- Custom Action for Reviews (Nested Route) ---
 
-    @action(detail=True, methods=['get', 'post'])
+    @action(detail=True, methods=['get', 'post'], throttle_classes=[ReviewRateThrottle])
     def reviews(self, request, pk=None):
         """
         Custom endpoint to list or create reviews for a specific product.
-        GET: /api/products/{pk}/reviews/
-        POST: /api/products/{pk}/reviews/
+        GET: /api/products/{pk}/reviews/?rating=5&ordering=-rating (cursor paginated)
+        POST: /api/products/{pk}/reviews/ (rate limited per user, or IP, and load shed)
         """
-        product = self.get_object()
+        # Only the primary key is needed; skip the viewset queryset and its joins
+        product = get_object_or_404(Product.objects.only('pk'), pk=pk)
+        self.check_object_permissions(request, product)
 
         if request.method == 'GET':
-            # List all reviews for the product, sorted by newest first (default in model)
-            reviews = product.reviews.all()
-            serializer = ReviewSerializer(reviews, many=True)
-            return Response(serializer.data)
+            reviews = filter_reviews(product.pk, request.query_params)
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(reviews, request, view=self)
+            serializer = ReviewSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
         elif request.method == 'POST':
             # Create a new review for this product
             serializer = ReviewSerializer(data=request.data)
             if serializer.is_valid():
-                # Associate the review with the product
-                serializer.save(product=product)
+                # Associate the review with the product; the aggregates update locks its row
+                with limit_concurrency('reviews'):
+                    serializer.save(product=product)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         # Fallback for unexpected request methods
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class StockReservationViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Stock reservations for checkout (see catalog.reservations).
+    POST reserves every item of an order or nothing; the reservation holds
+    the stock until it is confirmed, released, or expires. Users only see,
+    confirm and release their own reservations; staff see all of them.
+    """
+    queryset = StockReservation.objects.prefetch_related('items')
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """
+        POST: /api/reservations/ with {"items": [{"product": 1, "quantity": 2}, ...]}
+        Returns 409 with the short products when the order cannot be filled.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['product_id'], item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            reservation = reserve_stock(items, user=request.user)
+        except InsufficientStock as exc:
+            return Response(
+                {'detail': 'Insufficient stock.', 'products': exc.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        """
+        Checks out the reservation: its stock stays taken for good.
+        POST: /api/reservations/{id}/confirm/ (409 once released or expired)
+        """
+        reservation = self.get_object()
+        try:
+            reservation = confirm_reservation(reservation.pk)
+        except ReservationClosed as exc:
+            return Response(
+                {'detail': f'Reservation is {exc.reservation.status}.', 'status': exc.reservation.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(reservation).data)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """
+        Cancels a pending reservation and gives its stock back.
+        POST: /api/reservations/{id}/release/ (409 once confirmed or expired)
+        """
+        reservation = self.get_object()
+        if not release_reservation(reservation.pk):
+            reservation.refresh_from_db(fields=['status'])
+            return Response(
+                {'detail': f'Reservation is {reservation.status}.', 'status': reservation.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+class CartViewSet(viewsets.ViewSet):
+    """
+    The server-side cart of the current user, or of the anonymous session.
+    Every response is the priced cart: current unit prices, line totals and
+    availability problems, resolved with one query for all products.
+    Changes to carts not authenticated by a JWT need the CSRF token, since
+    the session cookie identifies them.
+    """
+    permission_classes = [AllowAny]
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        # DRF only checks CSRF for signed-in session users; anonymous carts ride on the session cookie too
+        if request.method not in SAFE_METHODS and not isinstance(request.successful_authenticator, CachedJWTAuthentication):
+            SessionAuthentication().enforce_csrf(request)
+
+    def list(self, request):
+        """
+        GET: /api/cart/ reprices the whole cart.
+        """
+        return Response(price_cart(get_cart(request)))
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def items(self, request):
+        """
+        POST: /api/cart/items/ adds {"items": [{"product": 1, "quantity": 2}, ...]}
+        PATCH: /api/cart/items/ sets those quantities (0 removes the product)
+        DELETE: /api/cart/items/ empties the cart
+        """
+        if request.method == 'DELETE':
+            cart = get_cart(request)
+            if cart is not None:
+                cart.items.all().delete()
+            return Response(price_cart(cart))
+
+        replace = request.method == 'PATCH'
+        serializer = CartUpdateSerializer(data=request.data, context={'replace': replace})
+        serializer.is_valid(raise_exception=True)
+        cart = get_cart(request, create=True)
+        try:
+            products, unknown = update_items(cart, serializer.get_quantities(), replace=replace)
+        except QuantityLimitExceeded as exc:
+            raise ValidationError({'items': [
+                f'At most {exc.limit} of a product per cart: {", ".join(map(str, exc.product_ids))}.'
+            ]})
+        if unknown:
+            raise ValidationError({'items': [f'Unknown products: {", ".join(map(str, unknown))}.']})
+        return Response(price_cart(cart, products))
+
+    @action(
+        detail=False, methods=['post'],
+        permission_classes=[IsAuthenticated], throttle_classes=[CheckoutRateThrottle],
+    )
+    def checkout(self, request):
+        """
+        Reserves the stock of every cart item (see catalog.reservations) for
+        the signed-in user and empties the cart. POST: /api/cart/checkout/
+        Returns 409 with the priced cart when some items cannot be reserved.
+        """
+        cart = get_cart(request)
+        try:
+            with transaction.atomic():
+                # Locks the cart, so a concurrent checkout of it waits and then finds it empty
+                locked = Cart.objects.select_for_update().filter(pk=cart.pk).first() if cart is not None else None
+                items = list(locked.items.values_list('product_id', 'quantity')) if locked is not None else []
+                if not items:
+                    raise ValidationError({'items': ['The cart is empty.']})
+                reservation = reserve_stock(items, user=request.user)
+                locked.items.all().delete()
+        except InsufficientStock as exc:
+            return Response(
+                {'detail': 'Insufficient stock.', 'products': exc.product_ids, 'cart': price_cart(cart)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(StockReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
@@ -88,7 +88,10 @@ const FilterSidebar: React.FC<FilterSidebarProps> = ({ isSidebarOpen, onApplyFil
             : 'text-gray-700 hover:bg-gray-100'
         }`}
       >
-        <span>{category.title}</span>
+        <span>
+          {category.title}
+          <span className="ml-1 text-xs opacity-75">({category.product_count.toLocaleString()})</span>
+        </span>
         <ChevronRight className="w-4 h-4" />
       </button>
     </li>
@@ -100,7 +100,7 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
             {numericRating > 0 ? formattedRating : "N/A"}
           </span>
           <span className="text-sm text-gray-500 ml-2">
-            ({product.reviews.length} reviews)
+            ({product.review_count} reviews)
           </span>
         </div>
 
@@ -3,7 +3,9 @@ import {
   Category, 
   Product, 
   PaginatedResponse, 
+  ProductFacets,
   ProductQueryParams,
+  ProductSuggestion,
   Review
 } from '../../types';
 
@@ -53,6 +55,29 @@ export const productsApi = baseApi.injectEndpoints({
       providesTags: (result, error, id) => [{ type: 'Product', id }],
     }),
 
+    /**
+     * Endpoint to fetch typo-tolerant name suggestions for the search box.
+     * Corresponds to: GET /api/products/suggest/?q=
+     */
+    getSuggestions: builder.query<ProductSuggestion[], { q: string; limit?: number }>({
+      query: ({ q, limit }) => ({
+        url: 'products/suggest/',
+        params: { q, limit },
+      }),
+    }),
+
+    /**
+     * Endpoint to fetch sidebar facet counts for the current filters.
+     * Corresponds to: GET /api/products/facets/
+     */
+    getProductFacets: builder.query<ProductFacets, Omit<ProductQueryParams, 'limit' | 'offset' | 'ordering'>>({
+      query: (params) => ({
+        url: 'products/facets/',
+        params,
+      }),
+      providesTags: [{ type: 'Product', id: 'FACETS' }],
+    }),
+
     /**
      * Endpoint to fetch all categories.
      * Corresponds to: GET /api/categories/
@@ -134,6 +159,8 @@ export const productsApi = baseApi.injectEndpoints({
 export const {
   useGetProductsQuery,
   useGetProductByIdQuery,
+  useGetSuggestionsQuery,
+  useGetProductFacetsQuery,
   useGetCategoriesQuery,
   useSubmitReviewMutation,
   useCreateProductMutation,
@@ -23,6 +23,11 @@ export interface Category {
   title: string;
   slug: string;
   created_at: string;
+  product_count: number;
+  available_count: number;
+  min_price: string | null; // Decimal strings, null without products
+  max_price: string | null;
+  average_rating: number;
 }
 
 /**
@@ -31,7 +36,6 @@ export interface Category {
 export interface Product {
   id: number;
   name: string;
-  description: string;
   // DRF may serialize Decimal as string; accept both to keep types honest
   price: number | string;
   stock_quantity: number;
@@ -44,7 +48,33 @@ export interface Product {
   category: number; // Category ID
   category_title: string;
   average_rating: number | string;
-  reviews: Review[]; // Nested reviews only in detail view
+  review_count: number;
+
+  // Detail-only fields; the list endpoint returns them with ?expand=
+  description?: string;
+  rating_histogram?: Record<'1' | '2' | '3' | '4' | '5', number>;
+  reviews?: Review[];
+}
+
+/**
+ * Defines a single autocomplete suggestion from /api/products/suggest/.
+ */
+export interface ProductSuggestion {
+  id: number;
+  name: string;
+  category_slug: string;
+}
+
+/**
+ * Defines the facet counts returned by /api/products/facets/.
+ * Each facet ignores its own filter, so sibling options keep their counts.
+ */
+export interface ProductFacets {
+  count: number;
+  categories: { slug: string; title: string; count: number }[];
+  price_ranges: { min: number; max: number | null; count: number }[];
+  availability: { available: number; unavailable: number };
+  ratings: { min_rating: number; count: number }[];
 }
 
 // ====================================================================